@@ -0,0 +1,122 @@
+import os
+import csv
+import copy
+import glob
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import monte_carlo_calculator as mcc
+import convergence_checker as cvc
+import excel_helpers as xh
+
+# The columns of the summary table, one row per workbook ($ millions for the NPVs)
+SUMMARY_COLUMNS = ['workbook', 'simulations', 'mean_npv_millions', 'p10_npv_millions', 'p50_npv_millions', 'p90_npv_millions',
+                   'mean_years_to_break_even', 'p50_years_to_break_even', 'mean_ros', 'p10_ros', 'p90_ros', 'error']
+
+# The workbooks of a directory, or the ones matching a glob pattern, in name order (skipping the lock files of open workbooks)
+def workbook_paths(pattern):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.xlsx')
+    return sorted(path for path in glob.glob(pattern) if not os.path.basename(path).startswith('~$'))
+
+# Value many workbooks across a pool of processes, one workbook per process at a time, and write a summary table
+# Each workbook runs with streaming statistics, and only as many workbooks as there are workers are in flight,
+# so memory stays bounded however many workbooks there are. Plots are rendered by a separate process, while the valuations go on;
+# a plot that fails records its error in the row of its workbook, and the summary is still written
+class BatchRunner:
+    def __init__(self, simulation_settings, workers = 1, plot_directory = ''):
+        self.simulation_settings = copy.copy(simulation_settings)
+        self.simulation_settings.workers = 1 # the workbooks run in parallel instead
+        self.simulation_settings.streaming = True
+        self.simulation_settings.keep_monthly_series = False
+        self.workers = workers
+        self.plot_directory = plot_directory
+
+    # Value the workbooks, returning the summary rows in the order of the workbooks (and writing them to the summary file, if given)
+    # The callback, if given, is called with each row as its workbook finishes
+    def run(self, workbook_paths, summary_file_path = '', callback = None):
+        rows = [None] * len(workbook_paths)
+        plot_executor = ProcessPoolExecutor(1) if self.plot_directory != '' else None
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        plots = []
+        try:
+            tasks = [(workbook_path, self.simulation_settings, self.plot_directory != '') for workbook_path in workbook_paths]
+            for index, (row, monte_carlo_results) in self.map_bounded(executor, tasks):
+                rows[index] = row
+                if monte_carlo_results is not None:
+                    os.makedirs(self.plot_directory, exist_ok=True)
+                    plot_file_path = os.path.join(self.plot_directory, os.path.splitext(os.path.basename(workbook_paths[index]))[0] + '.png')
+                    plots.append((index, plot_executor.submit(plot_results, (monte_carlo_results, plot_file_path))))
+                if callback is not None:
+                    callback(row)
+            for index, plot in plots:
+                try:
+                    plot.result()
+                except Exception as error:
+                    rows[index]['error'] = f'plot {type(error).__name__}: {error}'
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if plot_executor is not None:
+                plot_executor.shutdown()
+
+        if summary_file_path != '':
+            write_summary(rows, summary_file_path)
+        return rows
+
+    # Run the tasks with at most one in flight per worker, yielding (index, result) as each one finishes
+    def map_bounded(self, executor, tasks):
+        if executor is None:
+            for index, task in enumerate(tasks):
+                yield index, value_workbook(task)
+            return
+        pending = {}
+        next_task = 0
+        while next_task < len(tasks) or len(pending) > 0:
+            while next_task < len(tasks) and len(pending) < self.workers:
+                pending[executor.submit(value_workbook, tasks[next_task])] = next_task
+                next_task += 1
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+# Value one workbook, returning its summary row and (if it is to be plotted) its results
+# A workbook that cannot be read or valued gets a row with the error, so one bad workbook does not stop the batch
+def value_workbook(task):
+    workbook_path, simulation_settings, keep_results = task
+    try:
+        company_constants, mix_variables_ranges = xh.ExcelHelpers().read_excel_data(workbook_path)
+        monte_carlo_results = mcc.MonteCarloCalculator().calculate(company_constants, mix_variables_ranges, simulation_settings)
+    except Exception as error:
+        return {'workbook': workbook_path, 'error': f'{type(error).__name__}: {error}'}, None
+    return summary_row(workbook_path, monte_carlo_results), monte_carlo_results if keep_results else None
+
+# The key metrics of a run
+def summary_row(workbook_path, monte_carlo_results):
+    simulation_tracker = monte_carlo_results.simulation_tracker
+    return {
+        'workbook': workbook_path,
+        'simulations': monte_carlo_results.simulations,
+        'mean_npv_millions': cvc.mean(simulation_tracker.npvs_millions),
+        'p10_npv_millions': cvc.quantile(simulation_tracker.npvs_millions, 0.1),
+        'p50_npv_millions': cvc.quantile(simulation_tracker.npvs_millions, 0.5),
+        'p90_npv_millions': cvc.quantile(simulation_tracker.npvs_millions, 0.9),
+        'mean_years_to_break_even': cvc.mean(simulation_tracker.years_to_break_even),
+        'p50_years_to_break_even': cvc.quantile(simulation_tracker.years_to_break_even, 0.5),
+        'mean_ros': cvc.mean(simulation_tracker.ros),
+        'p10_ros': cvc.quantile(simulation_tracker.ros, 0.1),
+        'p90_ros': cvc.quantile(simulation_tracker.ros, 0.9),
+        'error': ''}
+
+# Write the summary rows as a CSV table
+def write_summary(rows, summary_file_path):
+    with open(summary_file_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_COLUMNS, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Render the plot of a run to an image file (in the plotting process, with a non-interactive backend)
+def plot_results(task):
+    monte_carlo_results, plot_file_path = task
+    import matplotlib
+    matplotlib.use('Agg')
+    import monte_carlo_plotter as mcp
+    mcp.MonteCarloPlotter().plot(monte_carlo_results, plot_file_path)
@@ -0,0 +1,74 @@
+# Compare the mix delay searches with the month by month search they replaced, on large synthetic mixes
+# Run from the repository root with: python -m benchmarks.benchmark_mix_delay
+import time
+import numpy as np # linear algebra library
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+import triangle_sampler as ts
+from benchmarks import synthetic_portfolio as sp
+
+# The month by month search that calculate_years_mix_delay replaced
+def month_by_month_years_mix_delay(maximum_development_ftes, minimum_years_mix_delay, allocated_ftes_by_month, new_ftes_by_month):
+    months_mix_delay = round(minimum_years_mix_delay * 12)
+    maximum_development_ftes = max(maximum_development_ftes, max(new_ftes_by_month))
+    allocated_ftes_by_month.extend([0] * len(new_ftes_by_month))
+    while(True):
+        overallocated = False
+        for month in range(len(new_ftes_by_month)):
+            if allocated_ftes_by_month[month + months_mix_delay] + new_ftes_by_month[month] > maximum_development_ftes:
+                overallocated = True
+                break
+        if not overallocated:
+            return months_mix_delay / 12
+        months_mix_delay += 1
+
+# Create the snapshots of a synthetic mix
+def snapshots(mix_variables_ranges, simulations):
+    mix_samples = ts.TriangleSampler(0).sample_mix(mix_variables_ranges, simulations)
+    return [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(simulations)]
+
+# Schedule every product of every simulation, one at a time, returning the elapsed time and the delays (by simulation, then product)
+def schedule(calculate_years_mix_delay, mix_variables_snapshots, maximum_development_ftes):
+    delays = []
+    start = time.perf_counter()
+    for mix_variables_snapshot in mix_variables_snapshots:
+        allocated_ftes_by_month = []
+        for product_variables_snapshot in mix_variables_snapshot.mix_variables_snapshots:
+            years_mix_delay = calculate_years_mix_delay(maximum_development_ftes, 0, allocated_ftes_by_month, product_variables_snapshot.ftes_by_month)
+            delays.append(years_mix_delay)
+            months_mix_delay = round(years_mix_delay * 12)
+            allocated_ftes_by_month.extend([0] * (months_mix_delay + len(product_variables_snapshot.ftes_by_month) - len(allocated_ftes_by_month)))
+            for month, ftes in enumerate(product_variables_snapshot.ftes_by_month):
+                allocated_ftes_by_month[month + months_mix_delay] += ftes
+    return time.perf_counter() - start, delays
+
+# Schedule every product of every simulation at once, returning the elapsed time and the delays (by simulation, then product)
+def schedule_batch(mix_variables_snapshots, maximum_development_ftes):
+    products = len(mix_variables_snapshots[0].mix_variables_snapshots)
+    delays = np.zeros((len(mix_variables_snapshots), products))
+    allocated_ftes_by_month = np.zeros((len(mix_variables_snapshots), 0))
+    start = time.perf_counter()
+    for product in range(products):
+        new_ftes_by_month = [mix_variables_snapshot.mix_variables_snapshots[product].ftes_by_month for mix_variables_snapshot in mix_variables_snapshots]
+        delays[:, product] = mc.MixCalculator().calculate_years_mix_delays(maximum_development_ftes, np.zeros(len(mix_variables_snapshots)), allocated_ftes_by_month, new_ftes_by_month)
+        months_mix_delay = np.round(delays[:, product] * 12).astype(int)
+        width = max(allocated_ftes_by_month.shape[1], max(months_mix_delay[i] + len(new_ftes_by_month[i]) for i in range(len(new_ftes_by_month))))
+        allocated_ftes_by_month = np.pad(allocated_ftes_by_month, ((0, 0), (0, width - allocated_ftes_by_month.shape[1])))
+        for i, ftes_by_month in enumerate(new_ftes_by_month):
+            allocated_ftes_by_month[i, months_mix_delay[i]:months_mix_delay[i] + len(ftes_by_month)] += ftes_by_month
+    return time.perf_counter() - start, delays.flatten().tolist()
+
+def main():
+    simulations = 200
+    print(f"{'products':>8} {'max ftes':>8} {'month by month (s)':>19} {'skip ahead (s)':>15} {'batch (s)':>10} {'speedups':>12}")
+    for products in [5, 20, 50]:
+        for maximum_development_ftes in [10, 30]:
+            mix_variables_snapshots = snapshots(sp.synthetic_mix(products), simulations)
+            old_time, old_delays = schedule(month_by_month_years_mix_delay, mix_variables_snapshots, maximum_development_ftes)
+            skip_time, skip_delays = schedule(mc.MixCalculator().calculate_years_mix_delay, mix_variables_snapshots, maximum_development_ftes)
+            batch_time, batch_delays = schedule_batch(mix_variables_snapshots, maximum_development_ftes)
+            assert old_delays == skip_delays == batch_delays
+            print(f"{products:>8} {maximum_development_ftes:>8} {old_time:>19.3f} {skip_time:>15.3f} {batch_time:>10.3f} {old_time / skip_time:>5.1f} {old_time / batch_time:>6.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# Compare how fast the NPV estimates of each sampling design converge, on a synthetic mix
+# Run from the repository root with: python -m benchmarks.compare_sampling
+# Each design is run many times with different seeds; the error of a run is its distance from a reference run with many more random simulations
+import argparse
+import numpy as np # linear algebra library
+import sobol_calculator as sc
+import triangle_sampler as ts
+from benchmarks import synthetic_portfolio as sp
+
+# The NPVs ($ millions) of the rows of a design
+def design_npvs(company_constants, mix_variables_ranges, design, seed, simulations):
+    mix_samples, randoms = ts.fixed_mix(mix_variables_ranges, 0)
+    uniforms = ts.design_uniforms(design, seed, len(randoms), 0, simulations, simulations)
+    return np.concatenate([sc.calculate_npvs((company_constants, mix_variables_ranges, uniforms[start:start + sc.BATCH_EVALUATIONS])) for start in range(0, simulations, sc.BATCH_EVALUATIONS)])
+
+# The estimates compared: the mean NPV and its P10 and P90
+def estimates(npvs_millions):
+    return np.array([np.mean(npvs_millions), np.percentile(npvs_millions, 10), np.percentile(npvs_millions, 90)])
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the convergence of the sampling designs')
+    parser.add_argument('--products', type=int, default=10, help='The size of the synthetic portfolio')
+    parser.add_argument('--simulations', type=int, nargs='*', default=[64, 256, 1024], help='The run sizes to compare')
+    parser.add_argument('--runs', type=int, default=20, help='How many runs (seeds) of each design and size')
+    parser.add_argument('--reference-simulations', type=int, default=50000, help='The size of the random reference run')
+    args = parser.parse_args()
+
+    company_constants = sp.synthetic_company_constants(100)
+    mix_variables_ranges = sp.synthetic_mix(args.products)
+    reference = estimates(design_npvs(company_constants, mix_variables_ranges, 'random', 0, args.reference_simulations))
+
+    # the root mean square error of each estimate, and how many random simulations reach the same errors (errors shrink as 1 / sqrt(simulations),
+    # and the estimate that gains the least decides)
+    print(f"{'design':<16} {'simulations':>11} {'mean error':>11} {'P10 error':>10} {'P90 error':>10} {'random equivalent':>18}")
+    for simulations in args.simulations:
+        random_errors = None
+        for design in ts.DESIGNS:
+            runs = np.array([estimates(design_npvs(company_constants, mix_variables_ranges, design, seed, simulations)) for seed in range(1, args.runs + 1)])
+            errors = np.sqrt(np.mean((runs - reference) ** 2, axis=0))
+            if design == 'random':
+                random_errors = errors
+            equivalent = simulations * np.min(random_errors ** 2 / errors ** 2)
+            print(f"{design:<16} {simulations:>11} {errors[0]:>11.4f} {errors[1]:>10.4f} {errors[2]:>10.4f} {equivalent:>18.0f}")
+
+if __name__ == '__main__':
+    main()
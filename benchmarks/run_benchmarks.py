@@ -0,0 +1,146 @@
+# Time each stage of the valuation pipeline on synthetic portfolios, and compare the throughput with a stored baseline
+# Run from the repository root with: python -m benchmarks.run_benchmarks [--update-baseline]
+# Throughputs are stored and compared relative to a calibration workload timed in the same run, so the baseline carries over between
+# machines of different speeds. A stage is a regression (and the run fails) when its relative throughput drops below the baseline by more
+# than the tolerance
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np # linear algebra library
+import mix_calculator as mc
+import npv_calculator as nc
+import simulation_tracker as st
+import mix_variable_snapshot as mvs
+import triangle_sampler as ts
+import excel_helpers as xh
+from benchmarks import synthetic_portfolio as sp
+from benchmarks import benchmark_mix_delay as bmd
+
+BASELINE_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# The synthetic portfolios: (products, consumable tail, FTE cap) with the years of consumable sales and maximum development FTEs they stand for
+PRODUCTS = [1, 10, 100]
+TAILS = {'short': 1, 'long': 10}
+CAPS = {'tight': 10, 'loose': 100}
+
+# The simulations to run for a portfolio (fewer for larger mixes, so each stage takes a similar time)
+def simulations(products):
+    return max(10, 1000 // products)
+
+# A fixed workload that stands for the speed of the machine: a Python loop and a numpy sort, as the stages mix both
+def calibration_workload():
+    total = 0.0
+    for i in range(500000):
+        total += i * 0.5
+    np.sort(np.random.default_rng(0).random(2000000))
+    return total
+
+# Each timing runs a stage over and over for at least this long (in seconds), so stages that take microseconds are timed as precisely as
+# slow ones, and the best of at least this many timings counts
+MINIMUM_SECONDS = 0.2
+MINIMUM_REPEAT = 5
+
+# The elapsed time of one run of a stage, run over and over for at least the minimum time
+def elapsed_time(stage):
+    runs = 0
+    start = time.perf_counter()
+    while runs == 0 or time.perf_counter() - start < MINIMUM_SECONDS:
+        stage()
+        runs += 1
+    return (time.perf_counter() - start) / runs
+
+# Time a stage a few times, alternating with the calibration workload so both see the same machine load, returning the best time of
+# one run of the stage in calibration workloads
+def relative_time(stage, repeat):
+    stage_times = []
+    calibration_times = []
+    for i in range(max(repeat, MINIMUM_REPEAT)):
+        calibration_times.append(elapsed_time(calibration_workload))
+        stage_times.append(elapsed_time(stage))
+    return min(stage_times) / min(calibration_times)
+
+# Time every stage on one portfolio, returning the throughput of each stage (per calibration workload)
+def run_portfolio(products, tail, cap, repeat):
+    company_constants = sp.synthetic_company_constants(CAPS[cap])
+    mix_variables_ranges = sp.synthetic_mix(products, TAILS[tail])
+    count = simulations(products)
+    mix_samples = ts.TriangleSampler(0).sample_mix(mix_variables_ranges, count)
+    mix_variables_snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(count)]
+    mix_results = [mc.MixCalculator().calculate_mix_npv(mix_variables_snapshot, company_constants) for mix_variables_snapshot in mix_variables_snapshots]
+    mix_batch_result = mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants)
+    product_variables_snapshots = [s for mix_variables_snapshot in mix_variables_snapshots for s in mix_variables_snapshot.mix_variables_snapshots]
+
+    def add_to_tracker():
+        simulation_tracker = st.SimulationTracker()
+        for mix_result in mix_results:
+            simulation_tracker.add(mix_result)
+
+    def add_batch_to_tracker():
+        st.SimulationTracker().add_batch(mix_batch_result)
+
+    stages = {
+        'product_npv': (lambda: [nc.NpvCalculator().calculate_product_npv(s, company_constants) for s in product_variables_snapshots], count),
+        'years_mix_delay': (lambda: bmd.schedule(mc.MixCalculator().calculate_years_mix_delay, mix_variables_snapshots, company_constants.maximum_development_ftes), count),
+        'mix_npv': (lambda: [mc.MixCalculator().calculate_mix_npv(s, company_constants) for s in mix_variables_snapshots], count),
+        'mix_npv_batch': (lambda: mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants), count),
+        'tracker_add': (add_to_tracker, count),
+        'tracker_add_batch': (add_batch_to_tracker, count)}
+
+    # the workbook reader does not depend on the FTE cap, so it is only timed once per mix (in workbooks per second)
+    if cap == 'tight':
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'portfolio.xlsx')
+            sp.write_workbook(company_constants, mix_variables_ranges, file_path)
+            throughputs = {'read_excel_data': 1 / relative_time(lambda: xh.ExcelHelpers().read_excel_data(file_path, use_cache = False), repeat)}
+    else:
+        throughputs = {}
+
+    for name, (stage, count) in stages.items():
+        throughputs[name] = count / relative_time(stage, repeat)
+    return throughputs
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark each stage of the valuation pipeline')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE_FILE_PATH, help='The baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='The largest acceptable drop in throughput (0.3 is 30%%)')
+    parser.add_argument('--repeat', type=int, default=3, help='How many times to time each stage (the best time counts, and at least MINIMUM_REPEAT are taken)')
+    parser.add_argument('--products', type=int, nargs='*', default=PRODUCTS, help='The portfolio sizes to run')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<50} {'relative':>12} {'baseline':>12} {'change':>8}")
+    for products in args.products:
+        for tail in TAILS:
+            for cap in CAPS:
+                for stage, throughput in run_portfolio(products, tail, cap, args.repeat).items():
+                    key = f'{stage}/{products}-products/{tail}-tail/{cap}-cap'
+                    results[key] = throughput
+                    if key in baseline:
+                        change = throughput / baseline[key] - 1
+                        if change < -args.tolerance:
+                            regressions.append(key)
+                        print(f"{key:<50} {throughput:>12.3f} {baseline[key]:>12.3f} {change:>+8.0%}{'  REGRESSION' if change < -args.tolerance else ''}")
+                    else:
+                        print(f"{key:<50} {throughput:>12.3f} {'':>12} {'':>8}")
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f'Updated the baseline in {args.baseline}')
+    elif len(regressions) > 0:
+        print(f'{len(regressions)} benchmarks are more than {args.tolerance:.0%} slower than the baseline')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
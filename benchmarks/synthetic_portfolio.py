@@ -0,0 +1,85 @@
+import numpy as np # linear algebra library
+import company_constants as cc
+import product_variable_ranges as pvr
+
+# A likely value with a range around it
+def spread(likely, low = 0.8, high = 1.3):
+    return [likely * low, likely, likely * high]
+
+# Create a reproducible portfolio of products with randomized (but typical) ranges
+def synthetic_mix(products, years_of_consumable_sales = 3, seed = 0):
+    random = np.random.default_rng(seed)
+    mix_variables_ranges = []
+    for product in range(products):
+        mix_variables_ranges.append(pvr.ProductVariablesRanges(
+            name = f"Product {product + 1}",
+            type = "Product",
+            years_of_development_growth = spread(random.uniform(0.25, 1)),
+            years_of_development_maturity = spread(random.uniform(1, 3)),
+            years_of_development_decline = spread(random.uniform(0.25, 1)),
+            years_of_pilot = spread(random.uniform(0.25, 1)),
+            years_of_sales_growth = spread(random.uniform(0.5, 2)),
+            years_of_sales_maturity = spread(random.uniform(2, 6)),
+            years_of_sales_decline = spread(random.uniform(1, 3)),
+            development_ftes = spread(random.uniform(2, 8)),
+            maintenance_ftes = spread(random.uniform(0.5, 2)),
+            years_of_maintenance = spread(random.uniform(1, 4)),
+            unit_cost_pv = spread(random.uniform(5000, 50000)),
+            unit_margin = spread(random.uniform(0.3, 0.6), 0.9, 1.1),
+            sga_factor = spread(random.uniform(0.1, 0.2), 0.9, 1.1),
+            yearly_unit_sales = spread(random.uniform(20, 200)),
+            yearly_unit_consumable_sales = spread(random.uniform(500, 5000)),
+            years_of_consumable_sales = spread(years_of_consumable_sales),
+            consumable_margin = spread(random.uniform(0.5, 0.7), 0.9, 1.1)))
+    return mix_variables_ranges
+
+# Company constants with a tight (few developers) or loose cap on development FTEs
+def synthetic_company_constants(maximum_development_ftes = 10):
+    return cc.CompanyConstants(
+        market_return = 0.08,
+        yearly_development_fte_cost_pv = 150000,
+        maximum_development_ftes = maximum_development_ftes,
+        development_cost_trend = 0.03,
+        product_cost_trend = 0.02,
+        product_price_trend = 0.02)
+
+# The workbook label of each product variable (see ExcelHelpers.read_excel_data)
+WORKBOOK_LABELS = [
+    ('years_of_development_growth', "Years of Development Growth"),
+    ('years_of_development_maturity', "Years of Development Maturity"),
+    ('years_of_development_decline', "Years of Development Decline"),
+    ('years_of_pilot', "Years of Pilot"),
+    ('years_of_sales_growth', "Years of Sales Growth"),
+    ('years_of_sales_maturity', "Years of Sales Maturity"),
+    ('years_of_sales_decline', "Years of Sales Decline"),
+    ('development_ftes', "Development FTEs"),
+    ('maintenance_ftes', "Maintenance FTEs"),
+    ('years_of_maintenance', "Years of Maintenance"),
+    ('unit_cost_pv', "Unit Cost"),
+    ('unit_margin', "Unit Margin"),
+    ('sga_factor', "SG&A"),
+    ('yearly_unit_sales', "Yearly Unit Sales"),
+    ('yearly_unit_consumable_sales', "Yearly Unit Consumable Sales"),
+    ('years_of_consumable_sales', "Years of Consumable Sales"),
+    ('consumable_margin', "Consumable Margin")]
+
+# Write a workbook in the layout ExcelHelpers.read_excel_data reads
+def write_workbook(company_constants, mix_variables_ranges, file_path):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    company_constants_sheet = workbook.active
+    company_constants_sheet.title = 'Company Constants'
+    for row, value in enumerate([company_constants.market_return, company_constants.yearly_development_fte_cost_pv, company_constants.maximum_development_ftes,
+                                 company_constants.development_cost_trend, company_constants.product_cost_trend, company_constants.product_price_trend], start=2):
+        company_constants_sheet.cell(row=row, column=2, value=value)
+    products_sheet = workbook.create_sheet('Products')
+    mix_sheet = workbook.create_sheet('Mix')
+    mix_sheet.append(['Sheet', 'Name', 'Type', 'Exclude'])
+    for product_variables_ranges in mix_variables_ranges:
+        products_sheet.append([product_variables_ranges.name])
+        for name, label in WORKBOOK_LABELS:
+            a = getattr(product_variables_ranges, name)
+            products_sheet.append([label] + (list(a) if isinstance(a, list) else [a, a, a]))
+        products_sheet.append([None])
+        mix_sheet.append(['Products', product_variables_ranges.name, product_variables_ranges.type])
+    workbook.save(file_path)
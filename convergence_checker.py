@@ -0,0 +1,65 @@
+import math
+import numpy as np # linear algebra library
+
+# Check the precision of the NPV estimates: the half-widths of the confidence intervals of the mean NPV and of NPV percentiles
+# With a variance reducer, the estimates are the variance reduced ones, and their precision comes from their effective simulations
+# In streaming mode, a percentile is only known to the width of its sketch bin, so its half-width is never reported below that width
+class ConvergenceChecker:
+    def __init__(self, tolerance = None, percentiles = (10, 90), z = 1.96, variance_reducer = None):
+        self.tolerance = tolerance # the largest acceptable half-width ($ millions)
+        self.percentiles = percentiles
+        self.z = z # the standard normal quantile of the confidence level (1.96 for 95%)
+        self.variance_reducer = variance_reducer
+
+    # the confidence interval half-width of each estimate ($ millions), by name ('Mean', 'P10', ...)
+    def precision(self, simulation_tracker):
+        npvs_millions = simulation_tracker.npvs_millions
+        simulations = len(npvs_millions)
+        if simulations < 2:
+            return {name: float('inf') for name in ['Mean'] + [f'P{percentile}' for percentile in self.percentiles]}
+        if self.variance_reducer is None:
+            effective_simulations = {name: simulations for name in ['Mean'] + [f'P{percentile}' for percentile in self.percentiles]}
+            quantile_of = lambda fraction: quantile(npvs_millions, fraction)
+        else:
+            estimate = self.variance_reducer.estimate(simulation_tracker, self.percentiles)
+            effective_simulations = estimate.effective_simulations
+            quantile_of = estimate.quantile
+        precision = {'Mean': self.z * standard_deviation(npvs_millions) / math.sqrt(effective_simulations['Mean'])}
+        for percentile in self.percentiles:
+            # the order statistics that bracket the percentile with the given confidence (binomial normal approximation)
+            fraction = percentile / 100
+            spread = self.z * math.sqrt(fraction * (1 - fraction) / effective_simulations[f'P{percentile}'])
+            precision[f'P{percentile}'] = max((quantile_of(min(fraction + spread, 1)) - quantile_of(max(fraction - spread, 0))) / 2, resolution(npvs_millions, fraction))
+        return precision
+
+    # the estimates whose half-width is the sketch bin width rather than the sampling error (streaming mode)
+    def resolution_limited(self, simulation_tracker):
+        precision = self.precision(simulation_tracker)
+        return [f'P{percentile}' for percentile in self.percentiles if precision[f'P{percentile}'] == resolution(simulation_tracker.npvs_millions, percentile / 100) > 0]
+
+    def converged(self, simulation_tracker):
+        return self.tolerance is not None and max(self.precision(simulation_tracker).values()) <= self.tolerance
+
+# The mean of a list or array of values, or of a streaming statistic
+def mean(values):
+    if isinstance(values, (list, np.ndarray)):
+        return float(np.mean(values))
+    return values.mean()
+
+# The standard deviation of a list or array of values, or of a streaming statistic
+def standard_deviation(values):
+    if isinstance(values, (list, np.ndarray)):
+        return float(np.std(values, ddof=1))
+    return values.standard_deviation()
+
+# The quantile of a list or array of values, or of a streaming statistic
+def quantile(values, fraction):
+    if isinstance(values, (list, np.ndarray)):
+        return float(np.quantile(values, fraction))
+    return values.quantile(fraction)
+
+# The finest difference the quantile of a list or array of values (exact), or of a streaming statistic (its sketch bin), can resolve
+def resolution(values, fraction):
+    if isinstance(values, (list, np.ndarray)) or len(values) == 0:
+        return 0.0
+    return values.quantile_resolution(fraction)
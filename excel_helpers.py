@@ -1,55 +1,106 @@
-from openpyxl import load_workbook
-from openpyxl.drawing.image import Image
+import os
+import json
+import bisect
+import hashlib
 import company_constants as cc
 import product_variable_ranges as pvr
 
+# Parsed workbooks are cached here, keyed by a hash of the file contents (bump the version when the parsed model changes)
+# The cache is private to the user, and holds the plain values of the constants and ranges as JSON, so reading it never runs code
+CACHE_DIRECTORY = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'ppm')
+CACHE_VERSION = 2
+
+# Setting this environment variable (to anything but an empty string) turns the cache off, in this process and the processes it starts
+NO_CACHE_VARIABLE = 'PPM_NO_CACHE'
+
+# The values of a sheet, read in one pass, with an index of the rows of each label in column A
+class SheetIndex():
+    def __init__(self, sheet, columns = 4):
+        self.rows = [None] # the values of each row (padded to the given number of columns), numbered from 1 like the sheet
+        self.label_rows = {} # the rows of each label, in order
+        self.blank_rows = [] # the rows without a label, in order
+        for row, values in enumerate(sheet.iter_rows(max_col=columns, values_only=True), start=1):
+            values = tuple(values) + (None,) * (columns - len(values))
+            self.rows.append(values)
+            if values[0] == None:
+                self.blank_rows.append(row)
+            else:
+                self.label_rows.setdefault(values[0], []).append(row)
+
+    def value(self, row, column):
+        return self.rows[row][column - 1] if row < len(self.rows) else None
+
 class ExcelHelpers():
     
-    def row_from_label(self, sheet, start_row, label):
-        for row in range(start_row, sheet.max_row + 1):
-            cell_value = sheet.cell(row=row, column=1).value
-            if cell_value == label:
-                return row
-        return 0
-
-    def range_from_label(self, sheet, start_row, label):
-        for row in range(start_row, sheet.max_row + 1):
-            cell_value = sheet.cell(row=row, column=1).value
-            if cell_value == None:
-                return None
-            if cell_value == label:
-                return [
-                    sheet.cell(row=row, column=2).value,
-                    sheet.cell(row=row, column=3).value,
-                    sheet.cell(row=row, column=4).value
-                ]
-
-    def read_excel_data(self, file_path):
-        # Load the workbook and select the sheets
+    # the first row with the label, starting at a row (0 if there is none)
+    def row_from_label(self, sheet_index, start_row, label):
+        rows = sheet_index.label_rows.get(label, [])
+        position = bisect.bisect_left(rows, start_row)
+        return rows[position] if position < len(rows) else 0
+
+    # the range next to the first row with the label, starting at a row and stopping at the first row without a label (None if there is none)
+    def range_from_label(self, sheet_index, start_row, label):
+        row = self.row_from_label(sheet_index, start_row, label)
+        position = bisect.bisect_left(sheet_index.blank_rows, start_row)
+        if row == 0 or (position < len(sheet_index.blank_rows) and sheet_index.blank_rows[position] < row):
+            return None
+        return list(sheet_index.rows[row][1:4])
+
+    # read the company constants and the product mix, from the cache if this workbook was read before (and the cache is on)
+    def read_excel_data(self, file_path, use_cache = True):
+        with open(file_path, 'rb') as file:
+            cache_file_path = os.path.join(CACHE_DIRECTORY, f'{hashlib.sha256(file.read()).hexdigest()}.{CACHE_VERSION}.json')
+        use_cache = use_cache and os.environ.get(NO_CACHE_VARIABLE, '') == '' and private_directory(CACHE_DIRECTORY)
+        if use_cache and private_file(cache_file_path):
+            try:
+                with open(cache_file_path) as file:
+                    return from_json(json.load(file))
+            except (OSError, ValueError, TypeError, KeyError):
+                pass # an unreadable cache entry is parsed again
+
+        excel_data = self.parse_excel_data(file_path)
+
+        if use_cache:
+            try:
+                with open(cache_file_path + '.tmp', 'w') as file:
+                    json.dump(to_json(excel_data), file)
+                os.replace(cache_file_path + '.tmp', cache_file_path)
+            except (OSError, TypeError, ValueError):
+                pass # the cache is only an optimization
+        return excel_data
+
+    def parse_excel_data(self, file_path):
+        # Load the workbook and read each sheet (once, when it is first needed)
+        from openpyxl import load_workbook # loaded here so cached workbooks never load the workbook library
         workbook = load_workbook(file_path, data_only=True, read_only=True)
-        company_constants_sheet = workbook['Company Constants']
+        sheet_indexes = {}
+        def sheet_index(sheet_name):
+            if sheet_name not in sheet_indexes:
+                sheet_indexes[sheet_name] = SheetIndex(workbook[sheet_name])
+            return sheet_indexes[sheet_name]
+        company_constants_sheet = sheet_index('Company Constants')
 
         # Initialize the CompanyConstants instance
         company_constants = cc.CompanyConstants(
-            market_return = company_constants_sheet.cell(row=2, column=2).value,
-            yearly_development_fte_cost_pv = company_constants_sheet.cell(row=3, column=2).value,
-            maximum_development_ftes = company_constants_sheet.cell(row=4, column=2).value,
-            development_cost_trend = company_constants_sheet.cell(row=5, column=2).value,
-            product_cost_trend = company_constants_sheet.cell(row=6, column=2).value,
-            product_price_trend = company_constants_sheet.cell(row=7, column=2).value)
+            market_return = company_constants_sheet.value(2, 2),
+            yearly_development_fte_cost_pv = company_constants_sheet.value(3, 2),
+            maximum_development_ftes = company_constants_sheet.value(4, 2),
+            development_cost_trend = company_constants_sheet.value(5, 2),
+            product_cost_trend = company_constants_sheet.value(6, 2),
+            product_price_trend = company_constants_sheet.value(7, 2))
 
         mix_variables_ranges = []
-        mix_sheet = workbook['Mix']
+        mix_sheet = sheet_index('Mix')
         product_variables_ranges = pvr.ProductVariablesRanges()
 
-        for mix_sheet_row in range(2, mix_sheet.max_row + 1):
-            pvr_sheet_name = mix_sheet.cell(row=mix_sheet_row, column=1).value
+        for mix_sheet_row in range(2, len(mix_sheet.rows)):
+            pvr_sheet_name = mix_sheet.value(mix_sheet_row, 1)
             if( pvr_sheet_name == None ):
                 break
-            pvr_name = mix_sheet.cell(row=mix_sheet_row, column=2).value
-            pvr_type = mix_sheet.cell(row=mix_sheet_row, column=3).value
-            pvr_exclude = mix_sheet.cell(row=mix_sheet_row, column=4).value
-            pvr_sheet = workbook[pvr_sheet_name]
+            pvr_name = mix_sheet.value(mix_sheet_row, 2)
+            pvr_type = mix_sheet.value(mix_sheet_row, 3)
+            pvr_exclude = mix_sheet.value(mix_sheet_row, 4)
+            pvr_sheet = sheet_index(pvr_sheet_name)
             pvr_sheet_row = self.row_from_label(pvr_sheet, 1, pvr_name)
             if( pvr_sheet_row == 0):
                 continue
@@ -97,6 +148,8 @@ class ExcelHelpers():
 
     def insert_plot_into_excel(excel_file_path_in, excel_file_path_out, image_path):
         # Load the workbook and select the sheet
+        from openpyxl import load_workbook
+        from openpyxl.drawing.image import Image
         workbook = load_workbook(excel_file_path_in)
         sheet = workbook['Product Variables']
 
@@ -110,3 +163,36 @@ class ExcelHelpers():
         workbook.save(excel_file_path_out)
 
         workbook.close()
+
+# The plain values of the company constants and of each product's ranges
+def to_json(excel_data):
+    company_constants, mix_variables_ranges = excel_data
+    return {'company_constants': vars(company_constants), 'mix_variables_ranges': [vars(product_variables_ranges) for product_variables_ranges in mix_variables_ranges]}
+
+def from_json(values):
+    company_constants = cc.CompanyConstants()
+    vars(company_constants).update(values['company_constants'])
+    mix_variables_ranges = []
+    for product_values in values['mix_variables_ranges']:
+        product_variables_ranges = pvr.ProductVariablesRanges()
+        vars(product_variables_ranges).update(product_values)
+        mix_variables_ranges.append(product_variables_ranges)
+    return company_constants, mix_variables_ranges
+
+# Whether a cache directory belongs to this user and no one else can write to it (creating it if there is none)
+def private_directory(directory):
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        return private_file(directory)
+    except OSError:
+        return False
+
+# Whether a file belongs to this user and no one else can write to it
+def private_file(file_path):
+    try:
+        status = os.stat(file_path)
+    except OSError:
+        return False
+    if hasattr(os, 'getuid') and status.st_uid != os.getuid():
+        return False
+    return status.st_mode & 0o022 == 0
@@ -1,3 +1,6 @@
+import functools
+import numpy as np # linear algebra library
+
 # Present Value (PV) function
 def pv(future_value, rate, periods):
     return future_value / (1 + rate) ** periods
@@ -9,6 +12,20 @@ def fv(present_value, rate, periods):
 def fvpv( present_value, rate_to_future, rate_to_present, periods):
     return pv( fv(present_value, rate_to_future, periods), rate_to_present, periods)
 
+# Factor tables grow in steps of this many periods, so products of similar length share a table
+FACTOR_TABLE_PERIODS = 240
+
+# The fvpv factor of each period, covering at least the given number of periods
+# The tables are shared by every simulation and product, and only the most recently used ones are kept
+def fvpv_factors(rate_to_future, rate_to_present, periods):
+    return fvpv_factor_table(rate_to_future, rate_to_present, -(-periods // FACTOR_TABLE_PERIODS) * FACTOR_TABLE_PERIODS)
+
+@functools.lru_cache(maxsize=16)
+def fvpv_factor_table(rate_to_future, rate_to_present, periods):
+    factors = fvpv(1.0, rate_to_future, rate_to_present, np.arange(periods))
+    factors.flags.writeable = False
+    return factors
+
 # Relationship between margin and cost factor
 def cost_factor(margin):
     return 1 / (1 - margin)
@@ -4,6 +4,15 @@ def safe_index(range, i):
         return range
     return range[i]
 
+# Add each value of a list or array to the same index of the array, growing the array if needed
+def add_values(array, values):
+    if not isinstance(values, list):
+        values = values.tolist()
+    if len(values) > len(array):
+        array.extend([0] * (len(values) - len(array)))
+    for index, value in enumerate(values):
+        array[index] += value
+
 # Add a value to a given index in the array, growing the array if needed
 def add_value_to_index(array, index, value):
     # Extend the array if the index is out of bounds
@@ -1,23 +1,84 @@
+import numpy as np # linear algebra library
 import npv_calculation_result as ncr
+import npv_batch_result as nbr
 import npv_calculator as nc
+import npv_batch_calculator as nbc
+import stage_profiler as sp
 
 # Calculate the product mix
 class MixCalculator:
-    
-    # Calculate the years mix delay based on the maximum development FTEs
+
+    # Calculate the years mix delay based on the maximum development FTEs (the allocated FTEs, a list or an array, are not changed)
+    # When a start has an overallocated month, every later start that lines the same month up with at least as many new FTEs is overallocated
+    # too, so the search skips ahead to the first start that lines it up with fewer new FTEs (the previous smaller month of the new FTEs)
+    # Like calculate_years_mix_delays, it then only checks starts where the longest run of equal new FTEs has room: a single pass over the
+    # allocated months finds the months without room for the run, and the start moves past the last of them
     def calculate_years_mix_delay(self, maximum_development_ftes, minimum_years_mix_delay, allocated_ftes_by_month, new_ftes_by_month):
         months_mix_delay = round(minimum_years_mix_delay * 12)
-        maximum_development_ftes = max(maximum_development_ftes, max(new_ftes_by_month))
-        allocated_ftes_by_month.extend([0] * len(new_ftes_by_month))
+        new = python_values(new_ftes_by_month)
+        maximum_development_ftes = max(maximum_development_ftes, max(new))
+        allocated = python_values(allocated_ftes_by_month) # the months past the allocation have no FTEs, so every new month fits there
+        first = None
         while(True):
-            overallocated = False
-            for month in range(len(new_ftes_by_month)):
-                if allocated_ftes_by_month[month + months_mix_delay] + new_ftes_by_month[month] > maximum_development_ftes:
-                    overallocated = True
+            overallocated = -1
+            for month in range(min(len(new), len(allocated) - months_mix_delay)):
+                if allocated[month + months_mix_delay] + new[month] > maximum_development_ftes:
+                    overallocated = month
                     break
-            if not overallocated:
+            if overallocated < 0:
                 return months_mix_delay / 12
-            months_mix_delay += 1
+            if first is None:
+                first, last = longest_run(new)
+                room = maximum_development_ftes - new[first] # the most FTEs a month of the run can already have
+                scanned = 0 # the months before this one have been checked for room for the run
+                without_room = -1 # the last of them without room
+            months_mix_delay += overallocated - previous_smaller_month(new, overallocated)
+            while(True):
+                for month in range(scanned, min(months_mix_delay + last + 1, len(allocated))):
+                    if allocated[month] > room:
+                        without_room = month
+                scanned = max(scanned, months_mix_delay + last + 1)
+                if without_room < months_mix_delay + first:
+                    break
+                months_mix_delay = without_room - first + 1
+
+    # Calculate the years mix delay of many simulations at once (the vectorized equivalent of calculate_years_mix_delay)
+    # The allocated FTEs are a simulation x month array, and there is one list of new FTEs per simulation
+    # Each simulation jumps straight to the next start where the longest run of equal new FTEs (usually the development maturity) has room,
+    # and skips ahead past an overallocated month like calculate_years_mix_delay does
+    # The new FTEs can also be given as FtesProfiles, to reuse them across many schedules of the same snapshots
+    def calculate_years_mix_delays(self, maximum_development_ftes, minimum_years_mix_delays, allocated_ftes_by_month, new_ftes_by_month):
+        profiles = new_ftes_by_month if isinstance(new_ftes_by_month, FtesProfiles) else FtesProfiles(new_ftes_by_month)
+        new, in_profile, first, last = profiles.new, profiles.in_profile, profiles.first, profiles.last
+        simulations = len(new)
+        rows = np.arange(simulations)[:, np.newaxis]
+        months = np.arange(new.shape[1])
+        maximum_development_ftes = np.maximum(maximum_development_ftes, new.max(axis=1))[:, np.newaxis]
+        starts = np.array([round(minimum_years_mix_delay * 12) for minimum_years_mix_delay in minimum_years_mix_delays])
+
+        # months past the end of the allocation have no FTEs allocated, so a start there always fits
+        last_start = max(allocated_ftes_by_month.shape[1], starts.max())
+        allocated = np.zeros((simulations, last_start + len(months)))
+        allocated[:, :allocated_ftes_by_month.shape[1]] = allocated_ftes_by_month
+
+        # the next start (from each month on) where the longest run sees no month without room for it
+        months_without_room = np.zeros((simulations, allocated.shape[1] + 1), dtype=int)
+        np.cumsum(allocated + new[rows, first] > maximum_development_ftes, axis=1, out=months_without_room[:, 1:])
+        candidates = np.arange(last_start + 1)[np.newaxis, :]
+        room = months_without_room[rows, candidates + last + 1] == months_without_room[rows, candidates + first]
+        next_room = np.minimum.accumulate(np.where(room, candidates, last_start)[:, ::-1], axis=1)[:, ::-1]
+
+        searching = np.arange(simulations)
+        while len(searching) > 0:
+            starts[searching] = next_room[searching, starts[searching]]
+            window = allocated[searching[:, np.newaxis], starts[searching][:, np.newaxis] + months]
+            overallocated = (window + new[searching] > maximum_development_ftes[searching]) & in_profile[searching]
+            overallocated_starts = overallocated.any(axis=1)
+            searching = searching[overallocated_starts]
+            if len(searching) > 0:
+                starts[searching] += np.where(overallocated[overallocated_starts], profiles.skips()[searching], 0).max(axis=1)
+
+        return starts / 12
 
     # Calculate the NPV of a product mix
     def calculate_mix_npv(self, mix_variables_snapshot, company_constants):
@@ -26,9 +87,84 @@ class MixCalculator:
         for product_variables_snapshot in mix_variables_snapshot.mix_variables_snapshots:
             if( product_variables_snapshot.type == "Product"):
                 minimum_years_mix_delay = 0
-            product_variables_snapshot.years_mix_delay = self.calculate_years_mix_delay(company_constants.maximum_development_ftes, minimum_years_mix_delay, mix_result.ftes_by_month, product_variables_snapshot.ftes_by_month)
-            product_result = nc.NpvCalculator().calculate_product_npv(product_variables_snapshot, company_constants)
-            mix_result.add(product_result)
+            with sp.stage('scheduling'):
+                product_variables_snapshot.years_mix_delay = self.calculate_years_mix_delay(company_constants.maximum_development_ftes, minimum_years_mix_delay, mix_result.ftes_by_month, product_variables_snapshot.ftes_by_month)
+            with sp.stage('product_npv'):
+                product_result = nc.NpvCalculator().calculate_product_npv(product_variables_snapshot, company_constants)
+                mix_result.add(product_result)
             minimum_years_mix_delay = product_variables_snapshot.years_before_sales()
 
         return mix_result
+
+    # Calculate the NPV of many snapshots of a product mix at once (the vectorized equivalent of calculate_mix_npv)
+    def calculate_mix_npv_batch(self, mix_variables_snapshots, company_constants):
+        mix_result = nbr.NpvBatchResult(len(mix_variables_snapshots))
+        minimum_years_mix_delays = np.zeros(len(mix_variables_snapshots))
+        for product in range(len(mix_variables_snapshots[0].mix_variables_snapshots)):
+            product_variables_snapshots = [mix_variables_snapshot.mix_variables_snapshots[product] for mix_variables_snapshot in mix_variables_snapshots]
+            if( product_variables_snapshots[0].type == "Product"):
+                minimum_years_mix_delays = np.zeros(len(mix_variables_snapshots))
+            with sp.stage('scheduling'):
+                years_mix_delays = self.calculate_years_mix_delays(company_constants.maximum_development_ftes, minimum_years_mix_delays, mix_result.ftes_by_month, [s.ftes_by_month for s in product_variables_snapshots])
+                for product_variables_snapshot, years_mix_delay in zip(product_variables_snapshots, years_mix_delays.tolist()):
+                    product_variables_snapshot.years_mix_delay = years_mix_delay
+            with sp.stage('product_npv'):
+                product_result = nbc.NpvBatchCalculator().calculate_product_npv(product_variables_snapshots, company_constants)
+                mix_result.add(product_result)
+            minimum_years_mix_delays = np.array([s.years_before_sales() for s in product_variables_snapshots])
+
+        return mix_result
+
+# The new FTEs of many simulations, padded into a simulation x month array, with the parts of the search that only depend on them
+class FtesProfiles:
+    def __init__(self, new_ftes_by_month):
+        months = np.arange(max(len(ftes_by_month) for ftes_by_month in new_ftes_by_month))
+        self.new = np.zeros((len(new_ftes_by_month), len(months)))
+        for simulation, ftes_by_month in enumerate(new_ftes_by_month):
+            self.new[simulation, :len(ftes_by_month)] = ftes_by_month
+        self.in_profile = months < np.array([len(ftes_by_month) for ftes_by_month in new_ftes_by_month])[:, np.newaxis]
+        self.first, self.last = longest_runs(self.new, self.in_profile)
+        self.month_skips = None
+
+    # how far to skip ahead past an overallocated month (computed the first time a search needs it)
+    def skips(self):
+        if self.month_skips is None:
+            self.month_skips = np.arange(self.new.shape[1]) - previous_smaller_months(self.new)
+        return self.month_skips
+
+# Month values that index as Python floats: a numpy array becomes a list (indexing it gives slow numpy scalars), other sequences are kept
+def python_values(values):
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+# The latest month before the given one with fewer FTEs (-1 if there is none)
+def previous_smaller_month(ftes_by_month, month):
+    previous = month - 1
+    while previous >= 0 and ftes_by_month[previous] >= ftes_by_month[month]:
+        previous -= 1
+    return previous
+
+# For each month of every row of a simulation x month array, the latest earlier month with fewer FTEs (-1 if there is none)
+def previous_smaller_months(ftes_by_month):
+    previous_smaller = np.full(ftes_by_month.shape, -1)
+    for month in range(1, ftes_by_month.shape[1]):
+        smaller = ftes_by_month[:, :month] < ftes_by_month[:, month:month + 1]
+        previous_smaller[:, month] = np.where(smaller.any(axis=1), month - 1 - np.argmax(smaller[:, ::-1], axis=1), -1)
+    return previous_smaller
+
+# The first and last month of the longest run of equal FTEs in each row of a simulation x month array
+def longest_runs(ftes_by_month, in_profile):
+    first = np.zeros(len(ftes_by_month), dtype=int)
+    last = np.zeros(len(ftes_by_month), dtype=int)
+    for simulation, row in enumerate(ftes_by_month):
+        first[simulation], last[simulation] = longest_run(row[in_profile[simulation]].tolist())
+    return first[:, np.newaxis], last[:, np.newaxis]
+
+# The first and last month of the (earliest) longest run of equal FTEs in a list of FTEs
+def longest_run(ftes_by_month):
+    first = last = run_first = 0
+    for month in range(1, len(ftes_by_month)):
+        if ftes_by_month[month] != ftes_by_month[month - 1]:
+            run_first = month
+        if month - run_first > last - first:
+            first, last = run_first, month
+    return first, last
@@ -2,9 +2,13 @@ from tornado_enum import Tornado
 import product_variables_snapshot as pvs
 
 class MixVariablesSnapshot:
-    def __init__(self, mix_variables_ranges, tornado = Tornado.OFF):
+    def __init__(self, mix_variables_ranges, tornado = Tornado.OFF, mix_samples = None, simulation = 0):
         self.mix_variables_ranges = mix_variables_ranges
         self.mix_variables_snapshots = []
-        for product_variables_ranges in mix_variables_ranges:
-            product_variables_snapshot = pvs.ProductVariablesSnapshot(product_variables_ranges, tornado)
-            self.mix_variables_snapshots.append(product_variables_snapshot)
\ No newline at end of file
+        for product, product_variables_ranges in enumerate(mix_variables_ranges):
+            if mix_samples is None:
+                product_variables_snapshot = pvs.ProductVariablesSnapshot(product_variables_ranges, tornado)
+            else:
+                values = {name: samples[simulation] for name, samples in mix_samples[product].items()}
+                product_variables_snapshot = pvs.ProductVariablesSnapshot(product_variables_ranges, values = values)
+            self.mix_variables_snapshots.append(product_variables_snapshot)
@@ -1,29 +1,171 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np # linear algebra library
 import monte_carlo_results as mcr
+import simulation_tracker as st
+import tornado_tracker as tt
 import mix_calculator as mc
 import mix_variable_snapshot as mvs
+import simulation_settings as ss
+import triangle_sampler as ts
+import convergence_checker as cc
+import tornado_calculator as tc
+import sobol_calculator as sc
+import variance_reducer as vr
+import stage_profiler as sp
+
+# The simulations are split into chunks of this size, each with its own seed, so the results do not depend on the number of workers
+CHUNK_SIMULATIONS = 500
+
+# The tornado analyses (see SimulationSettings.tornado_mode)
+TORNADO_MODES = ['deterministic', 'random']
 
 class MonteCarloCalculator:
-    def calculate(self, company_constants, mix_variables_ranges):
-        monte_carlo_results = mcr.MonteCarloResults()
-                
-        # compute the monte carlo analysis
-        simulations = 4000
-        for i in range(simulations):
-            mix_variables_snapshot = mvs.MixVariablesSnapshot(mix_variables_ranges)
-            mix_result = mc.MixCalculator().calculate_mix_npv(mix_variables_snapshot, company_constants)
-            monte_carlo_results.simulation_tracker.add(mix_result)
-
-        # normalize the results
+    def calculate(self, company_constants, mix_variables_ranges, simulation_settings = None):
+        if simulation_settings is None:
+            simulation_settings = ss.SimulationSettings()
+        monte_carlo_results = mcr.MonteCarloResults(simulation_settings.streaming, simulation_settings.keep_monthly_series, simulation_settings.monthly_percentiles, simulation_settings.keep_samples)
+
+        if simulation_settings.sampling not in ts.DESIGNS:
+            raise ValueError(f'unknown sampling design {simulation_settings.sampling} (expected one of {", ".join(ts.DESIGNS)})')
+        if simulation_settings.tornado_mode not in TORNADO_MODES:
+            raise ValueError(f'unknown tornado mode {simulation_settings.tornado_mode} (expected one of {", ".join(TORNADO_MODES)})')
+        if simulation_settings.antithetic and simulation_settings.sampling != 'random':
+            raise ValueError('antithetic draws pair random samples (the sampling designs are already balanced)')
+        if (simulation_settings.antithetic or simulation_settings.control_variates) and simulation_settings.streaming:
+            raise ValueError('variance reduction reweights every simulation, which streaming does not keep')
+        variance_reducer = None
+        if simulation_settings.antithetic or simulation_settings.control_variates:
+            variance_reducer = vr.VarianceReducer(mix_variables_ranges, simulation_settings.simulations, simulation_settings.antithetic, simulation_settings.control_variates)
+        convergence_checker = cc.ConvergenceChecker(simulation_settings.tolerance, simulation_settings.tolerance_percentiles, variance_reducer = variance_reducer)
+
+        # derive a seed for each chunk of simulations, and for each tornado variable, from the run seed
+        simulation_seed, tornado_seed, sobol_seed = np.random.SeedSequence(simulation_settings.seed).spawn(3)
+        tornado_chunks = chunk_sizes(simulation_settings.tornado_simulations) if simulation_settings.tornado_mode == 'random' else []
+        tornado_tasks = []
+        for variable_seed, tornado_tracker in zip(tornado_seed.spawn(len(monte_carlo_results.tornado_trackers)), monte_carlo_results.tornado_trackers):
+            for seed, simulations in zip(variable_seed.spawn(len(tornado_chunks)), tornado_chunks):
+                tornado_tasks.append((company_constants, mix_variables_ranges, seed, simulations, tornado_tracker.tornado, tornado_tracker.name))
+
+        executor = ProcessPoolExecutor(simulation_settings.workers) if simulation_settings.workers > 1 else None
+        try:
+            # compute the monte carlo analysis, merging the chunks in order
+            # with a tolerance, rounds of chunks are added (and checked one chunk at a time) until the NPV estimates are precise enough
+            # (with variance reduction the estimates are refit to every simulation, so they are only checked once per round)
+            chunks = chunk_sizes(simulation_settings.simulations)
+            with sp.stage('simulations'):
+                while len(chunks) > 0:
+                    simulation_tasks = self.simulation_tasks(company_constants, mix_variables_ranges, simulation_seed, chunks, simulation_settings, variance_reducer)
+                    for simulation_tracker in map_tasks(executor, calculate_simulations, simulation_tasks):
+                        monte_carlo_results.simulation_tracker.merge(simulation_tracker)
+                        if variance_reducer is None and self.converged(monte_carlo_results.simulation_tracker, simulation_settings, convergence_checker):
+                            break
+                    chunks = self.next_chunks(monte_carlo_results.simulation_tracker, simulation_settings, convergence_checker)
+
+            # compute the random tornado analysis, merging the chunks of each variable
+            with sp.stage('tornado'):
+                tornado_trackers = {tornado_tracker.tornado: tornado_tracker for tornado_tracker in monte_carlo_results.tornado_trackers}
+                for tornado_tracker in map_tasks(executor, calculate_tornado, tornado_tasks):
+                    tornado_trackers[tornado_tracker.tornado].merge(tornado_tracker)
+
+            # compute the Sobol sensitivity indices
+            if simulation_settings.sobol_simulations > 0:
+                with sp.stage('sobol'):
+                    monte_carlo_results.sobol_indices = sc.SobolCalculator().calculate(company_constants, mix_variables_ranges, simulation_settings.sobol_simulations, sobol_seed, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        # report the precision reached, then normalize the results
+        monte_carlo_results.simulations = monte_carlo_results.simulation_tracker.simulations
+        monte_carlo_results.precision = convergence_checker.precision(monte_carlo_results.simulation_tracker)
+        monte_carlo_results.converged = convergence_checker.converged(monte_carlo_results.simulation_tracker)
+        monte_carlo_results.resolution_limited = convergence_checker.resolution_limited(monte_carlo_results.simulation_tracker)
+        if variance_reducer is not None:
+            estimate = variance_reducer.estimate(monte_carlo_results.simulation_tracker, simulation_settings.tolerance_percentiles)
+            monte_carlo_results.npv_estimates = {'Mean': estimate.mean()}
+            monte_carlo_results.npv_estimates.update({f'P{percentile}': estimate.quantile(percentile / 100) for percentile in simulation_settings.tolerance_percentiles})
+            monte_carlo_results.effective_simulations = estimate.effective_simulations
         monte_carlo_results.simulation_tracker.normalize()
-        
-        # compute the tornado analysis
-        for i in range(100):    
-            for tornado_tracker in monte_carlo_results.tornado_trackers:
-                mix_variables_snapshot = mvs.MixVariablesSnapshot(mix_variables_ranges, tornado_tracker.tornado)
-                mix_result = mc.MixCalculator().calculate_mix_npv(mix_variables_snapshot, company_constants)
-                tornado_tracker.add(mix_result.net() / 1000000)
+
+        # compute the deterministic tornado analysis
+        if simulation_settings.tornado_mode == 'deterministic':
+            with sp.stage('tornado'):
+                monte_carlo_results.tornado_trackers += tc.TornadoCalculator().calculate(company_constants, mix_variables_ranges, monte_carlo_results.tornado_trackers, simulation_settings.tornado_per_product)
 
         # Sort the tornado trackers by range
         monte_carlo_results.tornado_trackers.sort(key=lambda x: x.range())
     
         return monte_carlo_results
+
+    # The tasks of a round of chunks: with random sampling each chunk draws from its own seed, and with a sampling design
+    # the chunks are blocks of rows of one design of the whole round (a round cut short by convergence keeps the blocks it merged)
+    def simulation_tasks(self, company_constants, mix_variables_ranges, simulation_seed, chunks, simulation_settings, variance_reducer = None):
+        if simulation_settings.sampling == 'random':
+            seeds = simulation_seed.spawn(len(chunks))
+            designs = [None] * len(chunks)
+        else:
+            seeds = simulation_seed.spawn(1) * len(chunks)
+            starts = np.cumsum([0] + chunks[:-1]).tolist()
+            uniforms = None
+            if simulation_settings.sampling == 'latin_hypercube':
+                # a block of a Latin hypercube cannot be drawn without the whole design, so it is drawn once here and each chunk gets its rows
+                uniforms = ts.design_uniforms('latin_hypercube', seeds[0], len(ts.fixed_mix(mix_variables_ranges, 0)[1]), 0, sum(chunks), sum(chunks))
+            designs = [(simulation_settings.sampling, start, sum(chunks), uniforms[start:start + simulations] if uniforms is not None else None) for start, simulations in zip(starts, chunks)]
+        return [(company_constants, mix_variables_ranges, seed, simulations, simulation_settings.streaming, simulation_settings.keep_monthly_series, simulation_settings.monthly_percentiles, simulation_settings.keep_samples, design, variance_reducer) for seed, simulations, design in zip(seeds, chunks, designs)]
+
+    # With a tolerance, the run stops once the minimum simulations are done and the NPV estimates are precise enough
+    def converged(self, simulation_tracker, simulation_settings, convergence_checker):
+        return simulation_tracker.simulations >= simulation_settings.simulations and convergence_checker.converged(simulation_tracker)
+
+    # The next round of chunks: one chunk per worker, until the run converges or reaches the maximum simulations
+    def next_chunks(self, simulation_tracker, simulation_settings, convergence_checker):
+        if simulation_settings.tolerance is None or self.converged(simulation_tracker, simulation_settings, convergence_checker):
+            return []
+        remaining = simulation_settings.maximum_simulations - simulation_tracker.simulations
+        return chunk_sizes(max(0, min(remaining, simulation_settings.workers * CHUNK_SIMULATIONS)))
+
+# Split a number of simulations into chunks
+def chunk_sizes(simulations):
+    return [min(CHUNK_SIMULATIONS, simulations - start) for start in range(0, simulations, CHUNK_SIMULATIONS)]
+
+# Run the tasks in the worker processes, or in this process if there are no workers
+def map_tasks(executor, function, tasks):
+    if executor is None:
+        return list(map(function, tasks))
+    return list(executor.map(function, tasks))
+
+# Compute a chunk of the monte carlo analysis
+def calculate_simulations(task):
+    company_constants, mix_variables_ranges, seed, simulations, streaming, keep_monthly_series, monthly_percentiles, keep_samples, design, variance_reducer = task
+    simulation_tracker = st.SimulationTracker(streaming, keep_monthly_series, monthly_percentiles, keep_samples)
+    with sp.stage('sampling'):
+        if variance_reducer is not None and variance_reducer.antithetic:
+            mix_samples = ts.uniform_mix(mix_variables_ranges, variance_reducer.uniforms(seed, len(ts.fixed_mix(mix_variables_ranges, 0)[1]), simulations))
+        elif design is None:
+            mix_samples = ts.TriangleSampler(seed).sample_mix(mix_variables_ranges, simulations)
+        else:
+            sampling, start, total, uniforms = design
+            if uniforms is None:
+                mix_samples = ts.design_mix(mix_variables_ranges, sampling, seed, start, simulations, total)
+            else:
+                mix_samples = ts.uniform_mix(mix_variables_ranges, uniforms)
+        mix_variables_snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(simulations)]
+    mix_result = mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants)
+    with sp.stage('tracking'):
+        simulation_tracker.add_batch(mix_result)
+        if keep_samples:
+            simulation_tracker.add_samples(ts.mix_matrix(mix_variables_ranges, mix_samples, simulations), mix_result.net() / 1000000)
+        if variance_reducer is not None:
+            simulation_tracker.add_controls(variance_reducer.controls(ts.mix_matrix(mix_variables_ranges, mix_samples, simulations)), mix_result.net() / 1000000)
+    return simulation_tracker
+
+# Compute the tornado analysis of a single variable
+def calculate_tornado(task):
+    company_constants, mix_variables_ranges, seed, simulations, tornado, name = task
+    tornado_tracker = tt.TornadoTracker(tornado, name)
+    mix_samples = ts.TriangleSampler(seed).sample_mix(mix_variables_ranges, simulations, tornado)
+    for i in range(simulations):
+        mix_variables_snapshot = mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i)
+        mix_result = mc.MixCalculator().calculate_mix_npv(mix_variables_snapshot, company_constants)
+        tornado_tracker.add(mix_result.net() / 1000000)
+    return tornado_tracker
@@ -1,11 +1,16 @@
 import numpy as np # linear algebra library
 import matplotlib.pyplot as plt # plotting library
+import streaming_statistic as ss
 
 class MonteCarloPlotter:
-    # create a histogram
+    # create a histogram (of a list of values, or of the sketch bins of a streaming statistic)
     def create_histogram(self, data, bins, xlabel, subplot_position, rows, cols, color = 'blue'):
         plt.subplot(rows, cols, subplot_position)
-        plt.hist(data, bins=bins, edgecolor='black', color=color)
+        if isinstance(data, ss.StreamingStatistic):
+            values, counts = data.histogram()
+            plt.hist(values, bins=bins, weights=counts, edgecolor='black', color=color)
+        else:
+            plt.hist(data, bins=bins, edgecolor='black', color=color)
         plt.yticks([])
         plt.xlabel(xlabel)
 
@@ -15,9 +20,23 @@ class MonteCarloPlotter:
         plt.barh(names, ranges, left=min_values)
         plt.xlabel(xlabel)
     
-    # create a line chart
-    def create_line_chart(self, data, xlabel, ylabel, subplot_position, rows, cols, color = 'blue'):
+    # create a Sobol index chart (the first-order and total-order index of each variable side by side)
+    def create_sobol_chart(self, sobol_indices, xlabel, subplot_position, rows, cols):
         plt.subplot(rows, cols, subplot_position)
+        positions = np.arange(len(sobol_indices))
+        plt.barh(positions - 0.2, [sobol_index.first_order for sobol_index in sobol_indices], height=0.4, label='First order')
+        plt.barh(positions + 0.2, [sobol_index.total_order for sobol_index in sobol_indices], height=0.4, label='Total order')
+        plt.yticks(positions, [sobol_index.name for sobol_index in sobol_indices])
+        plt.xlabel(xlabel)
+        plt.legend(fontsize='small')
+
+    # create a line chart (with a fan of the P10 to P90 band and the P50 of each month, if given a MonthlyQuantileSketch)
+    def create_line_chart(self, data, xlabel, ylabel, subplot_position, rows, cols, color = 'blue', bands = None):
+        plt.subplot(rows, cols, subplot_position)
+        if bands is not None and len(bands) > 0:
+            band_years = np.arange(len(bands)) / 12
+            plt.fill_between(band_years, bands.quantiles(0.1), bands.quantiles(0.9), color=color, alpha=0.2, linewidth=0, label='P10-P90')
+            plt.plot(band_years, bands.quantiles(0.5), color=color, linestyle='--', linewidth=0.8, label='P50')
         years = np.arange(len(data)) / 12
         plt.plot(years, data, color=color)
         plt.xlabel(xlabel)
@@ -25,9 +44,11 @@ class MonteCarloPlotter:
 
     # plot the results
     def plot(self, monte_carlo_results, file_path = ""):
-        rows = 4
+        simulation_tracker = monte_carlo_results.simulation_tracker
+        cumulative_net_by_month_sketch = simulation_tracker.cumulative_net_by_month_sketch
+        rows = 5 if len(monte_carlo_results.sobol_indices) > 0 or cumulative_net_by_month_sketch is not None else 4
         cols = 3
-        plt.figure(figsize=(10, 5))
+        plt.figure(figsize=(10, 5 * rows / 4))
 
         tornado_names = [tornado_tracker.name for tornado_tracker in monte_carlo_results.tornado_trackers]
         tornado_ranges = [tornado_tracker.range() for tornado_tracker in monte_carlo_results.tornado_trackers]
@@ -45,10 +66,15 @@ class MonteCarloPlotter:
         self.create_histogram(monte_carlo_results.simulation_tracker.years_to_achieve_10pct_ros, 20, 'Years to 10% ROS', 8, rows, cols, 'pink')
         self.create_histogram(monte_carlo_results.simulation_tracker.years_to_break_even, 20, 'Years to Break Even', 9, rows, cols, 'teal')
 
-        self.create_line_chart(monte_carlo_results.simulation_tracker.ftes_by_month, 'Years', 'Ftes', 10, rows, cols, 'black')
-        self.create_line_chart(monte_carlo_results.simulation_tracker.sales_by_month, 'Years', 'Monthly Sales ($)', 11, rows, cols, 'black')
+        self.create_line_chart(simulation_tracker.ftes_by_month, 'Years', 'Ftes', 10, rows, cols, 'black', simulation_tracker.ftes_by_month_sketch)
+        self.create_line_chart(simulation_tracker.sales_by_month, 'Years', 'Monthly Sales ($)', 11, rows, cols, 'black', simulation_tracker.sales_by_month_sketch)
         self.create_line_chart(monte_carlo_results.simulation_tracker.consumable_sales_by_month, 'Years', 'Monthly Consumables ($)', 12, rows, cols, 'black')
 
+        if cumulative_net_by_month_sketch is not None:
+            self.create_line_chart(cumulative_net_by_month_sketch.quantiles(0.5), 'Years', 'Cumulative Net ($)', 13, rows, cols, 'black', cumulative_net_by_month_sketch)
+        if len(monte_carlo_results.sobol_indices) > 0:
+            self.create_sobol_chart(monte_carlo_results.sobol_indices, 'NPV Sobol Index', 14, rows, cols)
+
         plt.tight_layout( pad=0, w_pad=0, h_pad=0 )
 
         if( file_path != ""):
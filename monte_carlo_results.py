@@ -3,8 +3,15 @@ import simulation_tracker as st
 from tornado_enum import Tornado
 
 class MonteCarloResults:
-    def __init__(self):
-        self.simulation_tracker = st.SimulationTracker()
+    def __init__(self, streaming = False, keep_monthly_series = False, monthly_percentiles = False, keep_samples = False):
+        self.simulation_tracker = st.SimulationTracker(streaming, keep_monthly_series, monthly_percentiles, keep_samples)
+        self.simulations = 0 # the simulations run
+        self.precision = {} # the 95% confidence half-width of the mean NPV and NPV percentiles ($ millions), by name ('Mean', 'P10', ...)
+        self.converged = False # whether the precision met the tolerance
+        self.resolution_limited = [] # the percentiles whose precision is limited by the width of the streaming sketch bins, by name
+        self.npv_estimates = {} # the variance reduced mean NPV and NPV percentiles ($ millions), by name (with variance reduction)
+        self.effective_simulations = {} # how many simulations without variance reduction would give the precision of each estimate, by name (with variance reduction)
+        self.sobol_indices = [] # the Sobol sensitivity indices of the NPV, one per varying variable
         self.tornado_trackers = []
         self.tornado_trackers.append(tt.TornadoTracker(Tornado.Dev_Ftes, 'Dev FTEs'))
         self.tornado_trackers.append(tt.TornadoTracker(Tornado.Dev_Years, 'Dev Years'))
@@ -0,0 +1,94 @@
+import numpy as np # linear algebra library
+import financial_helpers as fh
+import npv_batch_result as nbr
+
+class NpvBatchCalculator:
+
+    # Calculate the NPV of many simulations of a product at once (the vectorized equivalent of NpvCalculator.calculate_product_npv)
+    def calculate_product_npv(self, product_variables_snapshots, company_constants):
+        snapshots = product_variables_snapshots
+        simulations = len(snapshots)
+
+        # gather the snapshot variables into one column per variable
+        years_mix_delay = column([s.years_mix_delay for s in snapshots])
+        years_before_sales = column([s.years_before_sales() for s in snapshots])
+        months_mix_delay = column([round(s.years_mix_delay * 12) for s in snapshots], int)
+        months = column([round(s.total_years() * 12) + 1 for s in snapshots], int)
+        consumable_window = column([round(s.years_of_consumable_sales * 12) for s in snapshots], int)
+        yearly_unit_consumable_sales = column([s.yearly_unit_consumable_sales for s in snapshots])
+        consumable_margin = column([s.consumable_margin for s in snapshots])
+        unit_cost_pv = column([s.unit_cost_pv for s in snapshots])
+        unit_price_pv = column([s.unit_price_pv for s in snapshots])
+        sga_factor = column([s.sga_factor for s in snapshots])
+
+        # one row per simulation, one column per product month (months past the end of a simulation are masked out)
+        month = np.arange(months.max())[np.newaxis, :]
+        active = month < months
+        mix_month = month + months_mix_delay
+
+        # development
+        development_ftes = lookup([s.ftes_by_month for s in snapshots], np.rint(mix_month - years_mix_delay * 12).astype(int)) * active
+        development_cost = development_ftes * company_constants.yearly_development_fte_cost_pv / 12
+
+        # compute the unit sales for each month
+        unit_sales = lookup([s.unit_sales_by_month for s in snapshots], np.rint(mix_month - years_before_sales * 12).astype(int)) * active
+
+        # consumables (the units sold during the preceding window of months, where a window of zero months keeps the whole history)
+        units_sold_before = np.zeros((simulations, month.shape[1] + 1))
+        np.cumsum(unit_sales, axis=1, out=units_sold_before[:, 1:])
+        window_start = np.where(consumable_window > 0, np.maximum(month - consumable_window, 0), 0)
+        units_needing_consumables = units_sold_before[:, :-1] - np.take_along_axis(units_sold_before, window_start, axis=1)
+        consumable_sales = units_needing_consumables * yearly_unit_consumable_sales / 12 * active
+        consumable_cost_of_goods = consumable_sales * (1 - consumable_margin)
+
+        cost_of_goods = unit_sales * unit_cost_pv + consumable_cost_of_goods
+        sales = unit_sales * unit_price_pv + consumable_sales
+
+        # compute the present value of everything
+        mix_months = mix_month.max() + 1
+        development_cost_pv = development_cost * fh.fvpv_factors(company_constants.development_cost_trend / 12, company_constants.market_return / 12, mix_months)[mix_month]
+        consumable_sales_pv = consumable_sales * fh.fvpv_factors(company_constants.product_price_trend / 12, company_constants.market_return / 12, mix_months)[mix_month]
+        cost_of_goods_pv = cost_of_goods * fh.fvpv_factors(company_constants.product_cost_trend / 12, company_constants.market_return / 12, mix_months)[mix_month]
+        sales_pv = sales * fh.fvpv_factors(company_constants.product_price_trend / 12, company_constants.market_return / 12, mix_months)[mix_month]
+
+        # compute the SGA for each month
+        sga_pv = sales_pv * sga_factor
+
+        # add up the months
+        npv_batch_result = nbr.NpvBatchResult(simulations)
+        npv_batch_result.development_cost = development_cost_pv.sum(axis=1)
+        npv_batch_result.sales = sales_pv.sum(axis=1)
+        npv_batch_result.consumable_sales = consumable_sales_pv.sum(axis=1)
+        npv_batch_result.cost_of_goods = cost_of_goods_pv.sum(axis=1)
+        npv_batch_result.sga = sga_pv.sum(axis=1)
+        npv_batch_result.unit_sales = unit_sales.sum(axis=1)
+        npv_batch_result.months = (months_mix_delay + months)[:, 0]
+
+        # shift the monthly series from product months to mix months
+        cumulative_net = np.cumsum(sales_pv - cost_of_goods_pv - sga_pv - development_cost_pv, axis=1) * active
+        width = npv_batch_result.months.max()
+        npv_batch_result.ftes_by_month = shift(development_ftes, months_mix_delay, width)
+        npv_batch_result.sales_by_month = shift(sales_pv + consumable_sales_pv, months_mix_delay, width)
+        npv_batch_result.consumable_sales_by_month = shift(consumable_sales_pv, months_mix_delay, width)
+        npv_batch_result.cumulative_net_by_month = shift(cumulative_net, months_mix_delay, width)
+
+        return npv_batch_result
+
+# Convert per-simulation values into a column vector
+def column(values, dtype = float):
+    return np.array(values, dtype=dtype).reshape(-1, 1)
+
+# Look up each simulation's per-month profile, returning zero outside the profile
+def lookup(profiles, index):
+    table = np.zeros((len(profiles), max(len(profile) for profile in profiles) + 1))
+    for row, profile in enumerate(profiles):
+        table[row, :len(profile)] = profile
+    index = np.where((index >= 0) & (index < table.shape[1]), index, table.shape[1] - 1)
+    return np.take_along_axis(table, index, axis=1)
+
+# Move each row right by its delay, into an array of the given width
+def shift(values, delays, width):
+    shifted = np.zeros((values.shape[0], delays.max() + values.shape[1]))
+    rows = np.arange(values.shape[0])[:, np.newaxis]
+    shifted[rows, delays + np.arange(values.shape[1])] = values
+    return shifted[:, :width]
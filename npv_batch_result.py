@@ -0,0 +1,85 @@
+import numpy as np # linear algebra library
+import npv_calculation_result as ncr
+
+# The NPV results of many simulations at once, one row per simulation (simulation x month for the monthly series)
+class NpvBatchResult:
+    def __init__(self, simulations = 0, months = 0):
+        self.development_cost = np.zeros(simulations)
+        self.sales = np.zeros(simulations) # includes consumable sales
+        self.consumable_sales = np.zeros(simulations) # special breakout of consumable sales
+        self.cost_of_goods = np.zeros(simulations) # includes consumable cost of goods
+        self.sga = np.zeros(simulations)
+        self.unit_sales = np.zeros(simulations)
+        self.months = np.zeros(simulations, dtype=int) # the length of the monthly series of each simulation
+        self.ftes_by_month = np.zeros((simulations, months))
+        self.sales_by_month = np.zeros((simulations, months)) # includes consumable sales
+        self.consumable_sales_by_month = np.zeros((simulations, months)) # special breakout of consumable sales
+        self.cumulative_net_by_month = np.zeros((simulations, months))
+
+    def simulations(self):
+        return len(self.development_cost)
+
+    def net(self):
+        return self.sales - self.cost_of_goods - self.sga - self.development_cost
+
+    def ros(self):
+        net = self.net()
+        return np.divide(net, self.sales, out=np.zeros_like(net), where=self.sales != 0)
+
+    def roi(self):
+        net = self.net()
+        return np.divide(net, self.development_cost, out=np.zeros_like(net), where=self.development_cost != 0)
+
+    # add another batch of the same simulations (for example, another product in the mix)
+    def add(self, result):
+        self.development_cost += result.development_cost
+        self.sales += result.sales
+        self.consumable_sales += result.consumable_sales
+        self.cost_of_goods += result.cost_of_goods
+        self.sga += result.sga
+        self.unit_sales += result.unit_sales
+        self.months = np.maximum(self.months, result.months)
+        self.ftes_by_month = add_by_month(self.ftes_by_month, result.ftes_by_month)
+        self.sales_by_month = add_by_month(self.sales_by_month, result.sales_by_month)
+        self.consumable_sales_by_month = add_by_month(self.consumable_sales_by_month, result.consumable_sales_by_month)
+        self.cumulative_net_by_month = add_by_month(self.cumulative_net_by_month, result.cumulative_net_by_month)
+
+    # replace the given simulations (rows) with a batch of the same number of simulations, padding the monthly series to the longer of the two
+    def replace(self, rows, result):
+        replaced = NpvBatchResult()
+        for name in ['development_cost', 'sales', 'consumable_sales', 'cost_of_goods', 'sga', 'unit_sales', 'months']:
+            values = getattr(self, name).copy()
+            values[rows] = getattr(result, name)
+            setattr(replaced, name, values)
+        for name in ['ftes_by_month', 'sales_by_month', 'consumable_sales_by_month', 'cumulative_net_by_month']:
+            a, b = getattr(self, name), getattr(result, name)
+            values = np.zeros((len(a), max(a.shape[1], b.shape[1])))
+            values[:, :a.shape[1]] = a
+            values[rows] = 0
+            values[rows, :b.shape[1]] = b
+            setattr(replaced, name, values)
+        return replaced
+
+    # extract a single simulation as a scalar result
+    def result(self, simulation):
+        months = self.months[simulation]
+        result = ncr.NpvCalculationResult()
+        result.development_cost = float(self.development_cost[simulation])
+        result.sales = float(self.sales[simulation])
+        result.consumable_sales = float(self.consumable_sales[simulation])
+        result.cost_of_goods = float(self.cost_of_goods[simulation])
+        result.sga = float(self.sga[simulation])
+        result.unit_sales = float(self.unit_sales[simulation])
+        result.ftes_by_month = self.ftes_by_month[simulation, :months].copy()
+        result.sales_by_month = self.sales_by_month[simulation, :months].copy()
+        result.consumable_sales_by_month = self.consumable_sales_by_month[simulation, :months].copy()
+        result.cumulative_net_by_month = self.cumulative_net_by_month[simulation, :months].copy()
+        return result
+
+# Add two simulation x month arrays, padding the shorter one with zero months
+def add_by_month(a, b):
+    if a.shape[1] < b.shape[1]:
+        a, b = b, a
+    total = a.copy()
+    total[:, :b.shape[1]] += b
+    return total
@@ -1,17 +1,21 @@
-import list_helpers as lh
+import array
+import numpy as np # linear algebra library
 
 class NpvCalculationResult:
-    def __init__(self):
+    __slots__ = ['development_cost', 'sales', 'consumable_sales', 'cost_of_goods', 'sga', 'unit_sales',
+                 'ftes_by_month', 'sales_by_month', 'consumable_sales_by_month', 'cumulative_net_by_month']
+
+    def __init__(self, months = 0):
         self.development_cost = 0
         self.sales = 0 # inlcudes consumable sales
         self.consumable_sales = 0 # special breakout of consumable sales
         self.cost_of_goods = 0 # includes consumable cost of goods
         self.sga = 0
         self.unit_sales = 0
-        self.ftes_by_month = []
-        self.sales_by_month = [] # includes consumable sales
-        self.consumable_sales_by_month = [] # special breakout of consumable sales
-        self.cumulative_net_by_month = []
+        self.ftes_by_month = np.zeros(months)
+        self.sales_by_month = np.zeros(months) # includes consumable sales
+        self.consumable_sales_by_month = np.zeros(months) # special breakout of consumable sales
+        self.cumulative_net_by_month = np.zeros(months)
 
     def net(self):
         return self.sales - self.cost_of_goods - self.sga - self.development_cost
@@ -26,16 +30,20 @@ class NpvCalculationResult:
         return (1 + self.roi()) ** (1 / years) - 1 if years != 0 else 0
     
     def record_ftes(self, month, ftes):
-        lh.add_value_to_index(self.ftes_by_month, month, ftes)
+        self.ftes_by_month = grow(self.ftes_by_month, month + 1)
+        self.ftes_by_month[month] += ftes
     
     def record_sales(self, month, sales):
-        lh.add_value_to_index(self.sales_by_month, month, sales)
+        self.sales_by_month = grow(self.sales_by_month, month + 1)
+        self.sales_by_month[month] += sales
     
     def record_consumable_sales(self, month, consumable_sales):
-        lh.add_value_to_index(self.consumable_sales_by_month, month, consumable_sales)
+        self.consumable_sales_by_month = grow(self.consumable_sales_by_month, month + 1)
+        self.consumable_sales_by_month[month] += consumable_sales
 
     def record_cumulative_net_by_month(self, month, npv):
-        lh.add_value_to_index(self.cumulative_net_by_month, month, npv)
+        self.cumulative_net_by_month = grow(self.cumulative_net_by_month, month + 1)
+        self.cumulative_net_by_month[month] += npv
 
     def add(self, result):
         self.development_cost += result.development_cost
@@ -44,11 +52,23 @@ class NpvCalculationResult:
         self.cost_of_goods += result.cost_of_goods
         self.sga += result.sga
         self.unit_sales += result.unit_sales
-        for month in range(len(result.ftes_by_month)):
-            lh.add_value_to_index(self.ftes_by_month, month, result.ftes_by_month[month])
-        for month in range(len(result.sales_by_month)):
-            lh.add_value_to_index(self.sales_by_month, month, result.sales_by_month[month])
-        for month in range(len(result.consumable_sales_by_month)):
-            lh.add_value_to_index(self.consumable_sales_by_month, month, result.consumable_sales_by_month[month])
-        for month in range(len(result.cumulative_net_by_month)):
-            lh.add_value_to_index(self.cumulative_net_by_month, month, result.cumulative_net_by_month[month])
+        self.ftes_by_month = add_by_month(self.ftes_by_month, result.ftes_by_month)
+        self.sales_by_month = add_by_month(self.sales_by_month, result.sales_by_month)
+        self.consumable_sales_by_month = add_by_month(self.consumable_sales_by_month, result.consumable_sales_by_month)
+        self.cumulative_net_by_month = add_by_month(self.cumulative_net_by_month, result.cumulative_net_by_month)
+
+# A zeroed buffer of month values, filled one month at a time (indexing it is as fast as a list, and numpy can use it without a copy)
+def month_buffer(months):
+    return array.array('d', bytes(8 * months))
+
+# Pad an array of month values with zero months, up to the given number of months
+def grow(values, months):
+    if len(values) >= months:
+        return values
+    return np.concatenate((values, np.zeros(months - len(values))))
+
+# Add an array of month values to another, padding the shorter one with zero months (reuses the first array when it is long enough)
+def add_by_month(a, b):
+    a = grow(a, len(b))
+    a[:len(b)] += b
+    return a
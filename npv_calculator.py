@@ -1,4 +1,4 @@
-import list_helpers as lh
+import numpy as np # linear algebra library
 import financial_helpers as fh
 import npv_calculation_result as ncr
 
@@ -7,9 +7,20 @@ class NpvCalculator:
     # Calculate the NPV of a product
     def calculate_product_npv(self, product_variables_snapshot, company_constants):
 
-        # this is what we will calculate and return 
+        # this is what we will calculate and return, with a buffer for each monthly series (one value per mix month)
         npv_calculation_result = ncr.NpvCalculationResult()
-        unit_monthly_sales_history = []
+        mix_months = round(product_variables_snapshot.years_mix_delay * 12) + round(product_variables_snapshot.total_years() * 12) + 1
+        ftes_by_month = ncr.month_buffer(mix_months)
+        sales_by_month = ncr.month_buffer(mix_months)
+        consumable_sales_by_month = ncr.month_buffer(mix_months)
+        cumulative_net_by_month = ncr.month_buffer(mix_months)
+        units_sold_before = ncr.month_buffer(round(product_variables_snapshot.total_years() * 12) + 2) # the running total of unit sales before each month, for the consumables
+        consumable_window = round(product_variables_snapshot.years_of_consumable_sales * 12)
+
+        # the present value factors for each mix month
+        development_cost_factors = fh.fvpv_factors(company_constants.development_cost_trend / 12, company_constants.market_return / 12, mix_months).tolist()
+        product_cost_factors = fh.fvpv_factors(company_constants.product_cost_trend / 12, company_constants.market_return / 12, mix_months).tolist()
+        product_price_factors = fh.fvpv_factors(company_constants.product_price_trend / 12, company_constants.market_return / 12, mix_months).tolist()
 
         # loop through all the months
         for month in range(round(product_variables_snapshot.total_years() * 12) + 1):
@@ -19,8 +30,9 @@ class NpvCalculator:
             development_ftes_this_month = product_variables_snapshot.development_ftes_this_mix_month(mix_month)
             development_cost_this_month = development_ftes_this_month * company_constants.yearly_development_fte_cost_pv / 12
 
-            # consumables
-            units_needing_consumables_this_month = sum(unit_monthly_sales_history[-round(product_variables_snapshot.years_of_consumable_sales * 12):])
+            # consumables (the units sold during the preceding window of months, where a window of zero months keeps the whole history)
+            window_start = max(month - consumable_window, 0) if consumable_window > 0 else 0
+            units_needing_consumables_this_month = units_sold_before[month] - units_sold_before[window_start]
             consumable_sales_this_month = units_needing_consumables_this_month * product_variables_snapshot.yearly_unit_consumable_sales / 12
             consumable_cost_of_goods_this_month = consumable_sales_this_month * (1 - product_variables_snapshot.consumable_margin)
 
@@ -30,13 +42,13 @@ class NpvCalculator:
             sales_this_month = unit_sales_this_month * product_variables_snapshot.unit_price_pv + consumable_sales_this_month
 
             # tracking for consumables
-            lh.add_value_to_index(unit_monthly_sales_history, month, unit_sales_this_month)
+            units_sold_before[month + 1] = units_sold_before[month] + unit_sales_this_month
 
             # compute the present value of everything
-            development_cost_this_month_pv = fh.fvpv(development_cost_this_month, company_constants.development_cost_trend / 12, company_constants.market_return / 12, mix_month)
-            consumable_sales_this_month_pv = fh.fvpv(consumable_sales_this_month, company_constants.product_price_trend / 12, company_constants.market_return / 12, mix_month)
-            cost_of_goods_this_month_pv = fh.fvpv(cost_of_goods_this_month, company_constants.product_cost_trend / 12, company_constants.market_return / 12, mix_month)
-            sales_this_month_pv = fh.fvpv(sales_this_month, company_constants.product_price_trend / 12, company_constants.market_return / 12, mix_month)
+            development_cost_this_month_pv = development_cost_this_month * development_cost_factors[mix_month]
+            consumable_sales_this_month_pv = consumable_sales_this_month * product_price_factors[mix_month]
+            cost_of_goods_this_month_pv = cost_of_goods_this_month * product_cost_factors[mix_month]
+            sales_this_month_pv = sales_this_month * product_price_factors[mix_month]
 
             # compute the SGA for this month
             sga_this_month_pv = sales_this_month_pv * product_variables_snapshot.sga_factor
@@ -48,9 +60,13 @@ class NpvCalculator:
             npv_calculation_result.cost_of_goods += cost_of_goods_this_month_pv
             npv_calculation_result.sga += sga_this_month_pv
             npv_calculation_result.unit_sales += unit_sales_this_month
-            npv_calculation_result.record_ftes(mix_month, development_ftes_this_month)
-            npv_calculation_result.record_sales(mix_month, sales_this_month_pv + consumable_sales_this_month_pv)
-            npv_calculation_result.record_consumable_sales(mix_month, consumable_sales_this_month_pv)
-            npv_calculation_result.record_cumulative_net_by_month(mix_month, npv_calculation_result.net())
+            ftes_by_month[mix_month] = development_ftes_this_month
+            sales_by_month[mix_month] = sales_this_month_pv + consumable_sales_this_month_pv
+            consumable_sales_by_month[mix_month] = consumable_sales_this_month_pv
+            cumulative_net_by_month[mix_month] = npv_calculation_result.net()
 
+        npv_calculation_result.ftes_by_month = np.frombuffer(ftes_by_month)
+        npv_calculation_result.sales_by_month = np.frombuffer(sales_by_month)
+        npv_calculation_result.consumable_sales_by_month = np.frombuffer(consumable_sales_by_month)
+        npv_calculation_result.cumulative_net_by_month = np.frombuffer(cumulative_net_by_month)
         return npv_calculation_result
@@ -0,0 +1,149 @@
+import collections
+import numpy as np # linear algebra library
+import mix_calculator as mc
+import npv_batch_calculator as nbc
+import npv_batch_result as nbr
+import product_variables_snapshot as pvs
+import scenario_calculator as sc
+import stage_profiler as sp
+
+# How many partial mixes (prefixes of a candidate ordering) to keep, least recently used first out
+# Each one holds the allocated FTEs of every simulation, so this bounds the memory of the search
+MEMO_PREFIXES = 500
+
+# The shared simulations of one product, with the NPV of each simulation memoized by its months of mix delay
+# The NPV of a simulation only depends on where it starts, so once the search has tried a start it never calculates it again
+class PortfolioProduct:
+    def __init__(self, product_variables_ranges, uniforms):
+        self.scenario_product = sc.ScenarioProduct(product_variables_ranges, uniforms)
+        self.type = product_variables_ranges.type
+        self.ftes_profiles = mc.FtesProfiles([s.ftes_by_month for s in self.scenario_product.product_variables_snapshots])
+        self.npvs = np.full((len(uniforms), 0), np.nan) # simulation x months mix delay
+
+    # The NPV and the allocated FTEs (simulation x mix month) of each simulation, started at the given years mix delays
+    def calculate(self, years_mix_delays, company_constants):
+        snapshots = self.scenario_product.product_variables_snapshots
+        values = self.scenario_product.values
+        months_mix_delay = np.rint(years_mix_delays * 12).astype(int)
+        if months_mix_delay.max() >= self.npvs.shape[1]:
+            self.npvs = np.concatenate((self.npvs, np.full((len(self.npvs), months_mix_delay.max() + 1 - self.npvs.shape[1]), np.nan)), axis=1)
+        rows = np.arange(len(snapshots))
+        missing = np.flatnonzero(np.isnan(self.npvs[rows, months_mix_delay]))
+        if len(missing) > 0:
+            with sp.stage('product_npv'):
+                for row in missing.tolist():
+                    snapshots[row].years_mix_delay = float(years_mix_delays[row])
+                self.npvs[missing, months_mix_delay[missing]] = nbc.NpvBatchCalculator().calculate_product_npv([snapshots[row] for row in missing.tolist()], company_constants).net()
+
+        # the development FTEs of NpvBatchCalculator.calculate_product_npv (the profile, cut off at the end of the product and moved to its start)
+        total_years = sc.years_before_sales(values, years_mix_delays) + values['years_of_sales_growth'] + values['years_of_sales_maturity'] + values['years_of_sales_decline'] + values['years_of_consumable_sales']
+        months = np.rint(total_years * 12).astype(int) + 1
+        development_ftes = self.ftes_profiles.new * (np.arange(self.ftes_profiles.new.shape[1]) < months[:, np.newaxis])
+        ftes_by_month = nbc.shift(development_ftes, months_mix_delay[:, np.newaxis], (months_mix_delay + months).max())
+        return self.npvs[rows, months_mix_delay], ftes_by_month
+
+# A candidate portfolio: the groups it keeps, in order, with the score and the NPV of each simulation
+class PortfolioCandidate:
+    def __init__(self, order, score, npvs_millions):
+        self.order = order # indexes into PortfolioOptimizer.groups
+        self.score = score
+        self.npvs_millions = npvs_millions
+
+# Search the orderings and subsets of a product mix for the best expected NPV (or NPV percentile) under the maximum development FTEs
+# A product moves and is excluded together with the markets that follow it (a group), since the markets start from its sales.
+# Every candidate is scored on the same sampled snapshots (common random numbers), and the scheduling state after each prefix of a candidate
+# is memoized, so a candidate that shares its first products with an earlier one only schedules and calculates the rest.
+# The search is a best-improvement local search from the workbook order, over excluding or including a group and swapping two neighbouring groups
+class PortfolioOptimizer:
+    def __init__(self, company_constants, mix_variables_ranges, simulations = 200, seed = None, objective = 'mean', memo_prefixes = MEMO_PREFIXES):
+        self.company_constants = company_constants
+        self.mix_variables_ranges = mix_variables_ranges
+        self.simulations = simulations
+        self.objective = objective # 'mean', or the NPV percentile (0 to 100) to maximize
+        self.memo_prefixes = memo_prefixes
+        self.groups = groups(mix_variables_ranges)
+        random_generator = np.random.default_rng(seed)
+        self.products = [PortfolioProduct(product_variables_ranges, random_generator.random((simulations, len(pvs.VARIABLES)))) for product_variables_ranges in mix_variables_ranges]
+        self.memo = collections.OrderedDict() # product prefix -> (allocated FTEs, minimum years mix delays, NPVs)
+        self.evaluations = 0
+        self.scheduled_products = 0 # how many products the evaluations scheduled (the rest came from memoized prefixes)
+
+    # the score of the NPVs of a candidate
+    def score(self, npvs_millions):
+        if self.objective == 'mean':
+            return float(np.mean(npvs_millions))
+        return float(np.percentile(npvs_millions, self.objective))
+
+    # Score an ordering of groups
+    def evaluate(self, order):
+        products = [product for group in order for product in self.groups[group]]
+        self.evaluations += 1
+
+        # start from the longest memoized prefix
+        start = len(products)
+        while start > 0 and tuple(products[:start]) not in self.memo:
+            start -= 1
+        if start > 0:
+            self.memo.move_to_end(tuple(products[:start]))
+            allocated_ftes_by_month, minimum_years_mix_delays, npvs = self.memo[tuple(products[:start])]
+        else:
+            allocated_ftes_by_month, minimum_years_mix_delays, npvs = np.zeros((self.simulations, 0)), np.zeros(self.simulations), np.zeros(self.simulations)
+
+        # schedule and calculate the rest, one product at a time
+        for length in range(start + 1, len(products) + 1):
+            portfolio_product = self.products[products[length - 1]]
+            if( portfolio_product.type == "Product"):
+                minimum_years_mix_delays = np.zeros(self.simulations)
+            with sp.stage('scheduling'):
+                years_mix_delays = mc.MixCalculator().calculate_years_mix_delays(self.company_constants.maximum_development_ftes, minimum_years_mix_delays, allocated_ftes_by_month, portfolio_product.ftes_profiles)
+            product_npvs, ftes_by_month = portfolio_product.calculate(years_mix_delays, self.company_constants)
+            self.scheduled_products += 1
+            allocated_ftes_by_month = nbr.add_by_month(allocated_ftes_by_month, ftes_by_month)
+            minimum_years_mix_delays = sc.years_before_sales(portfolio_product.scenario_product.values, years_mix_delays)
+            npvs = npvs + product_npvs
+            self.memo[tuple(products[:length])] = (allocated_ftes_by_month, minimum_years_mix_delays, npvs)
+            if len(self.memo) > self.memo_prefixes:
+                self.memo.popitem(last=False)
+
+        npvs_millions = npvs / 1000000
+        return PortfolioCandidate(list(order), self.score(npvs_millions), npvs_millions)
+
+    # The orderings one move away from an ordering: each group excluded or included (at its workbook position among the kept groups),
+    # and each pair of neighbouring groups swapped
+    def neighbours(self, order):
+        for position in range(len(order)):
+            yield order[:position] + order[position + 1:]
+        for group in range(len(self.groups)):
+            if group not in order:
+                position = len([kept for kept in order if kept < group])
+                yield order[:position] + [group] + order[position:]
+        for position in range(len(order) - 1):
+            yield order[:position] + [order[position + 1], order[position]] + order[position + 2:]
+
+    # Improve on the workbook order until no move helps or the evaluations run out, returning the best candidate
+    def optimize(self, maximum_evaluations = 2000):
+        best = self.evaluate(list(range(len(self.groups))))
+        improved = True
+        while improved and self.evaluations < maximum_evaluations:
+            improved = False
+            for order in self.neighbours(best.order):
+                if self.evaluations >= maximum_evaluations:
+                    break
+                candidate = self.evaluate(order)
+                if candidate.score > best.score:
+                    best = candidate
+                    improved = True
+        return best
+
+    # The product ranges of a candidate, in its order
+    def mix_variables_ranges_of(self, candidate):
+        return [self.mix_variables_ranges[product] for group in candidate.order for product in self.groups[group]]
+
+# Split a mix into groups of a product and the markets that follow it (a leading market is a group of its own)
+def groups(mix_variables_ranges):
+    groups = []
+    for product, product_variables_ranges in enumerate(mix_variables_ranges):
+        if product_variables_ranges.type == "Product" or len(groups) == 0:
+            groups.append([])
+        groups[-1].append(product)
+    return groups
@@ -1,25 +1,205 @@
 import os
-import tempfile
-import sys
+import json
+import argparse
 import company_constants as cc
 import product_variable_ranges as pvr
+import simulation_settings as ss
 import monte_carlo_calculator as mcc
-import monte_carlo_plotter as mcp
-import excel_helpers as xh
-
-# Check if there are any command line arguments
-if len(sys.argv) == 2:
-    excel_file_path = sys.argv[1]
-    plot_file_path = os.path.join(tempfile.gettempdir(), 'ppm.png')
-    plot_file_path = ""
-    company_constants, mix_variables_ranges = xh.ExcelHelpers().read_excel_data(excel_file_path)
-else:
-    excel_file_path = ""
-    plot_file_path = ""
-    company_constants = cc.CompanyConstants()
-    product1 = pvr.ProductVariablesRanges()
-    mix_variables_ranges = [product1]
-
-# Run the Monte Carlo simulation
-monte_carlo_results = mcc.MonteCarloCalculator().calculate(company_constants, mix_variables_ranges)
-mcp.MonteCarloPlotter().plot(monte_carlo_results, plot_file_path)
\ No newline at end of file
+import convergence_checker as cvc
+import stage_profiler as sp
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo NPV analysis of a product portfolio')
+    parser.add_argument('excel_file_path', nargs='?', default='', help='The workbook describing the company constants and the product mix')
+    parser.add_argument('--simulations', type=int, default=4000, help='How many random snapshots of the mix to evaluate')
+    parser.add_argument('--plot-file', default='', help='Save the plot to this image file instead of showing it')
+    parser.add_argument('--no-plot', action='store_true', help='Print a summary instead of plotting (skips loading the plotting library)')
+    parser.add_argument('--workers', type=int, default=1, help='How many processes run simulations in parallel')
+    parser.add_argument('--seed', type=int, default=None, help='The seed of the random generator, for reproducible runs')
+    parser.add_argument('--tornado', choices=['deterministic', 'random'], default='deterministic', help='Evaluate each tornado variable at its low and high value, or re-simulate it randomly')
+    parser.add_argument('--tornado-per-product', action='store_true', help='Also show the sensitivity to each variable of each product (deterministic tornado)')
+    parser.add_argument('--sobol', type=int, default=0, help='Also compute Sobol sensitivity indices from this many base samples')
+    parser.add_argument('--tolerance', type=float, default=None, help='Add simulations until the mean NPV and its P10/P90 are known within this many $ millions (95%% confidence)')
+    parser.add_argument('--maximum-simulations', type=int, default=100000, help='The most simulations to run with a tolerance')
+    parser.add_argument('--save-results', default='', help='Save the results, including the monthly series of every simulation, to this directory')
+    parser.add_argument('--load-results', default='', help='Plot results saved to this directory instead of running the simulation')
+    parser.add_argument('--profile', default='', help='Write the time, calls and memory of each stage to this JSON file (- prints it); stages that run in worker processes are not recorded')
+    parser.add_argument('--scenario', default='', help='Compare an edited copy of the workbook against it, with the same random draws, instead of plotting')
+    parser.add_argument('--what-if', default='', help='Fit a surrogate model to a run of the workbook and answer an edited copy of it from the model (or by full simulation, if the edit leaves the ranges of the run)')
+    parser.add_argument('--optimize', default='', help='Search the order and selection of the products for the best mean NPV (mean) or NPV percentile (for example p10), instead of plotting')
+    parser.add_argument('--optimize-evaluations', type=int, default=2000, help='The most candidate portfolios to score when optimizing')
+    parser.add_argument('--batch', default='', help='Value every workbook in this directory (or matching this glob pattern) in parallel, and write a summary table')
+    parser.add_argument('--summary-file', default='ppm_summary.csv', help='The CSV file of the batch summary (one row of key metrics per workbook)')
+    parser.add_argument('--plot-directory', default='', help='Also save the plot of each workbook of the batch to this directory')
+    parser.add_argument('--sampling', choices=['random', 'latin_hypercube', 'sobol'], default='random', help='The sampling design of the simulations (the stratified and quasi-random designs need fewer simulations for the same accuracy)')
+    parser.add_argument('--antithetic', action='store_true', help='Pair every simulation with one drawn at the opposite quantiles of every variable (random sampling)')
+    parser.add_argument('--control-variates', action='store_true', help='Correct the NPV estimates by how far the sampled variables are from their known means')
+    parser.add_argument('--serve', action='store_true', help='Run a local valuation service, answering JSON requests over HTTP with warm workbooks and workers')
+    parser.add_argument('--port', type=int, default=None, help='The localhost port of the valuation service (valuation_service.DEFAULT_PORT if not given)')
+    parser.add_argument('--socket', default='', help='Serve on this Unix socket instead of a port')
+    parser.add_argument('--no-cache', action='store_true', help='Parse every workbook instead of reading the cache of parsed workbooks')
+    parser.add_argument('--streaming', action='store_true', help='Summarize the results in constant memory (for very many simulations)')
+    parser.add_argument('--monthly-percentiles', action='store_true', help='Plot the P10 to P90 band of the monthly FTEs, sales and cumulative net')
+    args = parser.parse_args()
+    if args.antithetic and args.sampling != 'random':
+        parser.error('--antithetic pairs random samples (the sampling designs are already balanced)')
+    if (args.antithetic or args.control_variates) and args.streaming:
+        parser.error('--antithetic and --control-variates reweight every simulation, which --streaming does not keep')
+    if args.streaming and args.save_results != "":
+        parser.error('--streaming keeps no per-simulation values for --save-results to store')
+
+    # Turn the workbook cache off here and in the worker processes, which inherit the environment
+    if args.no_cache:
+        import excel_helpers as xh
+        os.environ[xh.NO_CACHE_VARIABLE] = '1'
+
+    if args.profile != "":
+        sp.enable()
+
+    # Run the valuation service until interrupted
+    if args.serve:
+        import asyncio
+        import valuation_service as vs
+        if args.port is None:
+            args.port = vs.DEFAULT_PORT
+        print(f'Serving valuations on {args.socket or f"http://127.0.0.1:{args.port}"} (POST /valuations, GET /status)')
+        try:
+            asyncio.run(vs.ValuationService(args.workers).serve(port = args.port, socket_path = args.socket))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Value a batch of workbooks (the plots are optional, and rendered by their own process)
+    if args.batch != "":
+        import batch_runner as br
+        workbook_paths = br.workbook_paths(args.batch)
+        if len(workbook_paths) == 0:
+            parser.error(f'no workbooks match {args.batch}')
+        simulation_settings = ss.SimulationSettings(simulations = args.simulations, seed = args.seed, tornado_mode = args.tornado, tolerance = args.tolerance, maximum_simulations = args.maximum_simulations, sampling = args.sampling, monthly_percentiles = args.monthly_percentiles)
+        rows = br.BatchRunner(simulation_settings, args.workers, args.plot_directory).run(workbook_paths, args.summary_file, lambda row: print(f"{row['workbook']}: {row['error'] or 'done'}"))
+        print(f'Valued {len([row for row in rows if row["error"] == ""])} of {len(rows)} workbooks, summary in {args.summary_file}')
+        return
+
+    # Check if a workbook was given (the workbook library is only loaded then)
+    if args.excel_file_path != "" and args.load_results == "":
+        import excel_helpers as xh
+        excel_file_path = args.excel_file_path
+        with sp.stage('read_workbook'):
+            company_constants, mix_variables_ranges = xh.ExcelHelpers().read_excel_data(excel_file_path)
+    else:
+        excel_file_path = ""
+        company_constants = cc.CompanyConstants()
+        product1 = pvr.ProductVariablesRanges()
+        mix_variables_ranges = [product1]
+
+    # Compare an edited workbook against the baseline (the products before the first edit keep their cached results)
+    if args.scenario != "":
+        if excel_file_path == "":
+            parser.error('a scenario is compared against a baseline workbook')
+        import scenario_calculator as sc
+        scenario_company_constants, scenario_mix_variables_ranges = xh.ExcelHelpers().read_excel_data(args.scenario)
+        if vars(scenario_company_constants) != vars(company_constants):
+            parser.error('the scenario workbook has to keep the company constants of the baseline')
+        scenario_calculator = sc.ScenarioCalculator(company_constants, mix_variables_ranges, args.simulations, args.seed)
+        try:
+            scenario_result = scenario_calculator.evaluate(scenario_mix_variables_ranges)
+        except ValueError as error:
+            parser.error(str(error))
+        print_scenario_summary(scenario_result, mix_variables_ranges)
+        return
+
+    # Answer an edited workbook from a surrogate model of a run of the baseline
+    if args.what_if != "":
+        if excel_file_path == "":
+            parser.error('a what-if query is answered from a run of a baseline workbook')
+        import surrogate_model as sm
+        what_if_company_constants, what_if_mix_variables_ranges = xh.ExcelHelpers().read_excel_data(args.what_if)
+        if vars(what_if_company_constants) != vars(company_constants):
+            parser.error('the what-if workbook has to keep the company constants of the baseline')
+        simulation_settings = ss.SimulationSettings(simulations = args.simulations, seed = args.seed, workers = args.workers, streaming = True, sampling = args.sampling, keep_samples = True)
+        monte_carlo_results = mcc.MonteCarloCalculator().calculate(company_constants, mix_variables_ranges, simulation_settings)
+        surrogate_model = sm.from_results(company_constants, mix_variables_ranges, monte_carlo_results)
+        print(f'Surrogate fit error ($ millions): {surrogate_model.rmse_millions:.3f} (R squared {surrogate_model.r_squared:.4f})')
+        try:
+            scenario_result = surrogate_model.what_if(what_if_mix_variables_ranges)
+        except ValueError as error:
+            parser.error(str(error))
+        if sum(scenario_result.recomputed_simulations) > 0:
+            print('The edit leaves the ranges of the run, so it was answered by full simulation')
+        else:
+            print('Answered by the surrogate model')
+        print_scenario_summary(scenario_result, mix_variables_ranges)
+        return
+
+    # Search for a better order and selection of the products
+    if args.optimize != "":
+        try:
+            objective = 'mean' if args.optimize == 'mean' else float(args.optimize.removeprefix('p'))
+        except ValueError:
+            parser.error('the objective is mean or a percentile such as p10')
+        import portfolio_optimizer as po
+        portfolio_optimizer = po.PortfolioOptimizer(company_constants, mix_variables_ranges, args.simulations, args.seed, objective)
+        baseline = portfolio_optimizer.evaluate(list(range(len(portfolio_optimizer.groups))))
+        best = portfolio_optimizer.optimize(args.optimize_evaluations)
+        print(f'Candidates scored: {portfolio_optimizer.evaluations}')
+        print(f'Workbook order {args.optimize} NPV ($ millions): {baseline.score:.3f}')
+        print(f'Best {args.optimize} NPV ($ millions): {best.score:.3f}')
+        print('Best order: ' + ', '.join(str(product_variables_ranges.name) for product_variables_ranges in portfolio_optimizer.mix_variables_ranges_of(best)))
+        return
+
+    # Run the Monte Carlo simulation (or load the results of an earlier run)
+    if args.load_results != "" or args.save_results != "":
+        import results_store as rs
+    if args.load_results != "":
+        with sp.stage('load_results'):
+            monte_carlo_results = rs.ResultsStore().load(args.load_results)
+    else:
+        simulation_settings = ss.SimulationSettings(simulations = args.simulations, seed = args.seed, workers = args.workers, tornado_mode = args.tornado, tornado_per_product = args.tornado_per_product, sobol_simulations = args.sobol, streaming = args.streaming, tolerance = args.tolerance, maximum_simulations = args.maximum_simulations, keep_monthly_series = args.save_results != "", sampling = args.sampling, monthly_percentiles = args.monthly_percentiles, antithetic = args.antithetic, control_variates = args.control_variates)
+        with sp.stage('monte_carlo'):
+            monte_carlo_results = mcc.MonteCarloCalculator().calculate(company_constants, mix_variables_ranges, simulation_settings)
+    if args.save_results != "":
+        with sp.stage('save_results'):
+            rs.ResultsStore().save(monte_carlo_results, args.save_results)
+
+    if args.no_plot:
+        print_summary(monte_carlo_results)
+    else:
+        # Plot the results (the plotting library is only loaded here, with a non-interactive backend when saving to a file)
+        with sp.stage('plotting'):
+            if args.plot_file != "":
+                import matplotlib
+                matplotlib.use('Agg')
+            import monte_carlo_plotter as mcp
+            mcp.MonteCarloPlotter().plot(monte_carlo_results, args.plot_file)
+
+    # Report the stage profile
+    if args.profile != "":
+        profiler = sp.disable()
+        if args.profile == "-":
+            print(json.dumps(profiler.report(), indent=2))
+        else:
+            profiler.write_json(args.profile)
+
+# Print the key results
+def print_summary(monte_carlo_results):
+    npvs_millions = monte_carlo_results.simulation_tracker.npvs_millions
+    print(f'Simulations: {monte_carlo_results.simulations}')
+    print(f'Mean NPV ($ millions): {cvc.mean(npvs_millions):.3f}')
+    print(f'P10 / P90 NPV ($ millions): {cvc.quantile(npvs_millions, 0.1):.3f} / {cvc.quantile(npvs_millions, 0.9):.3f}')
+    if len(monte_carlo_results.resolution_limited) > 0:
+        print(f'The precision of {" / ".join(monte_carlo_results.resolution_limited)} is limited by the streaming quantile sketch (run without --streaming for a finer tolerance)')
+    if len(monte_carlo_results.npv_estimates) > 0:
+        print('Variance reduced NPV estimates ($ millions): ' + ', '.join(f'{name} {value:.3f}' for name, value in monte_carlo_results.npv_estimates.items()))
+        print('Effective simulations: ' + ', '.join(f'{name} {value:.0f}' for name, value in monte_carlo_results.effective_simulations.items()))
+
+# Print the paired NPV differences of a scenario
+def print_scenario_summary(scenario_result, mix_variables_ranges):
+    print(f'Simulations: {len(scenario_result.scenario_npvs_millions)}')
+    print(f'Mean NPV change ($ millions): {scenario_result.mean_difference():.3f} +/- {1.96 * scenario_result.standard_error():.3f}')
+    print(f'P10 / P50 / P90 NPV change ($ millions): {scenario_result.percentile(10):.3f} / {scenario_result.percentile(50):.3f} / {scenario_result.percentile(90):.3f}')
+    print(f'Probability of improvement: {scenario_result.probability_of_improvement():.1%}')
+    print('Recomputed products: ' + ', '.join(f'{mix_variables_ranges[product].name or product} ({scenario_result.recomputed_simulations[product]} simulations)' for product in scenario_result.recomputed_products()))
+
+# The guard keeps worker processes from running the analysis again when they import this module
+if __name__ == '__main__':
+    main()
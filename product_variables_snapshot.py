@@ -1,58 +1,73 @@
+import array
+import numpy as np # linear algebra library
 from tornado_enum import Tornado
 import triangle as t
 import financial_helpers as fh
 
+# The variables drawn for each snapshot (in drawing order), and the tornado analysis that varies them (None if they always vary)
+VARIABLES = [
+    ('development_ftes', Tornado.Dev_Ftes),
+    ('years_of_development_growth', None),
+    ('years_of_development_maturity', Tornado.Dev_Years),
+    ('years_of_development_decline', None),
+    ('maintenance_ftes', Tornado.Maint_Ftes),
+    ('years_of_maintenance', None),
+    ('years_of_pilot', None),
+    ('years_of_sales_growth', None),
+    ('years_of_sales_maturity', Tornado.Sales_Years),
+    ('years_of_sales_decline', None),
+    ('unit_cost_pv', Tornado.Unit_Cost),
+    ('unit_margin', Tornado.Margin),
+    ('sga_factor', None),
+    ('yearly_unit_sales', Tornado.Yearly_Sales),
+    ('yearly_unit_consumable_sales', None),
+    ('years_of_consumable_sales', None),
+    ('consumable_margin', None)]
+
+# During a tornado analysis, every tornado variable except the one being analyzed is pinned to its likely value
+def pinned(tornado, variable_tornado):
+    return variable_tornado is not None and tornado != Tornado.OFF and tornado != variable_tornado
+
+# The months of a phase lasting the given years (0, 1, 2, ...)
+def months(years):
+    return np.arange(max(round(years * 12), 0), dtype=float)
+
+# Join the monthly values of the phases into a compact profile (a single zero month if there are none)
+def profile(phases):
+    values = np.concatenate(phases)
+    return array.array('d', values.tobytes() if len(values) > 0 else bytes(8))
+
 class ProductVariablesSnapshot:
-    def __init__(self, product_variables_ranges, tornado = Tornado.OFF):
+    __slots__ = ['years_mix_delay', 'name', 'type', 'unit_price_pv', 'ftes_by_month', 'unit_sales_by_month'] + [name for name, variable_tornado in VARIABLES]
+
+    def __init__(self, product_variables_ranges, tornado = Tornado.OFF, values = None):
         
         # convert various ranges to actual values using a triangular distribution (or use the likely value if a tornado sensitivity analysis is being performed)
+        # or take the values from a batch of presampled values, if given
         self.years_mix_delay = 0
         self.name = product_variables_ranges.name
-        self.type = product_variables_ranges.type        
-        self.development_ftes = t.triangle(product_variables_ranges.development_ftes, tornado != Tornado.OFF and tornado != Tornado.Dev_Ftes)
-        self.years_of_development_growth = t.triangle(product_variables_ranges.years_of_development_growth)
-        self.years_of_development_maturity = t.triangle(product_variables_ranges.years_of_development_maturity, tornado != Tornado.OFF and tornado != Tornado.Dev_Years)
-        self.years_of_development_decline = t.triangle(product_variables_ranges.years_of_development_decline)
-        self.maintenance_ftes = t.triangle(product_variables_ranges.maintenance_ftes, tornado != Tornado.OFF and tornado != Tornado.Maint_Ftes)
-        self.years_of_maintenance = t.triangle(product_variables_ranges.years_of_maintenance)
-        self.years_of_pilot = t.triangle(product_variables_ranges.years_of_pilot)
-        self.years_of_sales_growth = t.triangle(product_variables_ranges.years_of_sales_growth)
-        self.years_of_sales_maturity = t.triangle(product_variables_ranges.years_of_sales_maturity, tornado != Tornado.OFF and tornado != Tornado.Sales_Years)
-        self.years_of_sales_decline = t.triangle(product_variables_ranges.years_of_sales_decline)
-        self.unit_cost_pv = t.triangle(product_variables_ranges.unit_cost_pv, tornado != Tornado.OFF and tornado != Tornado.Unit_Cost)
-        self.unit_margin = t.triangle(product_variables_ranges.unit_margin, tornado != Tornado.OFF and tornado != Tornado.Margin)
-        self.sga_factor = t.triangle(product_variables_ranges.sga_factor)
-        self.yearly_unit_sales = t.triangle(product_variables_ranges.yearly_unit_sales, tornado != Tornado.OFF and tornado != Tornado.Yearly_Sales)
-        self.yearly_unit_consumable_sales = t.triangle(product_variables_ranges.yearly_unit_consumable_sales)
-        self.years_of_consumable_sales = t.triangle(product_variables_ranges.years_of_consumable_sales)
-        self.consumable_margin = t.triangle(product_variables_ranges.consumable_margin)
+        self.type = product_variables_ranges.type
+        for name, variable_tornado in VARIABLES:
+            if values is None:
+                setattr(self, name, t.triangle(getattr(product_variables_ranges, name), pinned(tornado, variable_tornado)))
+            else:
+                setattr(self, name, float(values[name]))
 
         # compute the unit price
         self.unit_price_pv = self.unit_cost_pv * fh.cost_factor(self.unit_margin)
         
         # precalculate the development full time equivalents for each month
-        self.ftes_by_month = []
-        for month in range (round(self.years_of_development_growth * 12)):
-            self.ftes_by_month.append(self.development_ftes * month / (self.years_of_development_growth * 12))
-        for month in range (round(self.years_of_development_maturity * 12)):
-            self.ftes_by_month.append(self.development_ftes)
-        for month in range (round(self.years_of_development_decline * 12)):
-            self.ftes_by_month.append(self.development_ftes * (1 - month / (self.years_of_development_decline * 12)))
-        for month in range (round(self.years_of_maintenance * 12)):
-            self.ftes_by_month.append(self.maintenance_ftes)
-        if (len(self.ftes_by_month) == 0):
-            self.ftes_by_month.append(0)
+        self.ftes_by_month = profile([
+            self.development_ftes * months(self.years_of_development_growth) / (self.years_of_development_growth * 12),
+            np.full(len(months(self.years_of_development_maturity)), self.development_ftes, dtype=float),
+            self.development_ftes * (1 - months(self.years_of_development_decline) / (self.years_of_development_decline * 12)),
+            np.full(len(months(self.years_of_maintenance)), self.maintenance_ftes, dtype=float)])
 
         # precalculate the unit sales for a given month
-        self.unit_sales_by_month = []
-        for month in range (round(self.years_of_sales_growth * 12)):
-            self.unit_sales_by_month.append(self.yearly_unit_sales * month / (self.years_of_sales_growth * 12) / 12)
-        for month in range (round(self.years_of_sales_maturity * 12)):
-            self.unit_sales_by_month.append(self.yearly_unit_sales / 12)
-        for month in range (round(self.years_of_sales_decline * 12)):
-            self.unit_sales_by_month.append(self.yearly_unit_sales * (1 - month / (self.years_of_sales_decline * 12)) / 12)
-        if (len(self.unit_sales_by_month) == 0):
-            self.unit_sales_by_month.append(0)
+        self.unit_sales_by_month = profile([
+            self.yearly_unit_sales * months(self.years_of_sales_growth) / (self.years_of_sales_growth * 12) / 12,
+            np.full(len(months(self.years_of_sales_maturity)), self.yearly_unit_sales / 12, dtype=float),
+            self.yearly_unit_sales * (1 - months(self.years_of_sales_decline) / (self.years_of_sales_decline * 12)) / 12])
 
     # compute the delay before sales begin
     def years_before_sales(self):
@@ -0,0 +1,98 @@
+import os
+import json
+import numpy as np # linear algebra library
+import monte_carlo_results as mcr
+import tornado_tracker as tt
+import sobol_index as si
+from tornado_enum import Tornado
+
+# The per-simulation metrics and monthly series of the simulation tracker, each stored as its own .npy file
+METRICS = ['npvs_millions', 'development_costs_millions', 'unit_sales', 'sales_millions', 'consumable_sales_millions', 'ros', 'roi', 'years_to_break_even', 'years_to_achieve_10pct_ros']
+MONTHLY_SERIES = ['ftes_by_month', 'sales_by_month', 'consumable_sales_by_month']
+SIMULATION_MONTHLY_SERIES = ['sales_by_simulation_month', 'cumulative_net_by_simulation_month']
+# The monthly quantile sketches of a run with monthly percentiles, each stored as the .npy files of its counts and ended arrays
+MONTHLY_SKETCHES = ['ftes_by_month_sketch', 'sales_by_month_sketch', 'cumulative_net_by_month_sketch']
+METADATA_FILE_NAME = 'results.json'
+VERSION = 3 # earlier versions are still read, with what they did not store left at its default
+
+# Save the (normalized) results of a run to a directory of .npy files, one column per file, and reload them memory-mapped
+# so a run can be plotted or analyzed again without recomputing it or reading it all into memory
+class ResultsStore:
+    def save(self, monte_carlo_results, directory):
+        simulation_tracker = monte_carlo_results.simulation_tracker
+        if simulation_tracker.streaming:
+            raise ValueError('streaming results keep no per-simulation values to store')
+        os.makedirs(directory, exist_ok=True)
+        for name in METRICS + MONTHLY_SERIES:
+            np.save(os.path.join(directory, f'{name}.npy'), np.asarray(getattr(simulation_tracker, name), dtype=float))
+
+        # the monthly series of each simulation are padded with zero months into a simulation x month array, written one row at a time
+        for name in SIMULATION_MONTHLY_SERIES:
+            serieses = getattr(simulation_tracker, name)
+            months = max([len(series) for series in serieses], default=0)
+            array = np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=float, shape=(len(serieses), months))
+            for simulation, series in enumerate(serieses):
+                array[simulation, :len(series)] = series
+            array.flush()
+            del array
+
+        if simulation_tracker.monthly_percentiles:
+            for name in MONTHLY_SKETCHES:
+                monthly_quantile_sketch = getattr(simulation_tracker, name)
+                monthly_quantile_sketch.flush()
+                np.save(os.path.join(directory, f'{name}_counts.npy'), monthly_quantile_sketch.counts)
+                np.save(os.path.join(directory, f'{name}_ended.npy'), monthly_quantile_sketch.ended)
+
+        metadata = {
+            'version': VERSION,
+            'simulations': monte_carlo_results.simulations,
+            'precision': monte_carlo_results.precision,
+            'converged': monte_carlo_results.converged,
+            'monthly_percentiles': simulation_tracker.monthly_percentiles,
+            'resolution_limited': monte_carlo_results.resolution_limited,
+            'npv_estimates': monte_carlo_results.npv_estimates,
+            'effective_simulations': monte_carlo_results.effective_simulations,
+            'tornado_trackers': [[tornado_tracker.tornado.name, tornado_tracker.name, tornado_tracker.min_value, tornado_tracker.max_value] for tornado_tracker in monte_carlo_results.tornado_trackers],
+            'sobol_indices': [[sobol_index.name, sobol_index.first_order, sobol_index.total_order] for sobol_index in monte_carlo_results.sobol_indices]}
+        with open(os.path.join(directory, METADATA_FILE_NAME), 'w') as file:
+            json.dump(metadata, file, indent=2)
+
+    # reload saved results, with every metric and series memory-mapped (read-only)
+    def load(self, directory):
+        with open(os.path.join(directory, METADATA_FILE_NAME)) as file:
+            metadata = json.load(file)
+        if not 1 <= metadata['version'] <= VERSION:
+            raise ValueError(f"results version {metadata['version']} cannot be read (expected {VERSION} or earlier)")
+
+        monte_carlo_results = mcr.MonteCarloResults(monthly_percentiles = metadata.get('monthly_percentiles', False))
+        simulation_tracker = monte_carlo_results.simulation_tracker
+        for name in METRICS + MONTHLY_SERIES + SIMULATION_MONTHLY_SERIES:
+            setattr(simulation_tracker, name, load_array(os.path.join(directory, f'{name}.npy')))
+        # the sketches are small, and are read into memory so they can still be merged into
+        if simulation_tracker.monthly_percentiles:
+            for name in MONTHLY_SKETCHES:
+                monthly_quantile_sketch = getattr(simulation_tracker, name)
+                monthly_quantile_sketch.counts = np.load(os.path.join(directory, f'{name}_counts.npy'))
+                monthly_quantile_sketch.ended = np.load(os.path.join(directory, f'{name}_ended.npy'))
+        simulation_tracker.simulations = len(simulation_tracker.npvs_millions)
+        simulation_tracker.keep_monthly_series = len(simulation_tracker.sales_by_simulation_month) > 0
+
+        monte_carlo_results.simulations = metadata['simulations']
+        monte_carlo_results.precision = metadata['precision']
+        monte_carlo_results.converged = metadata['converged']
+        monte_carlo_results.resolution_limited = metadata.get('resolution_limited', [])
+        monte_carlo_results.npv_estimates = metadata.get('npv_estimates', {})
+        monte_carlo_results.effective_simulations = metadata.get('effective_simulations', {})
+        monte_carlo_results.tornado_trackers = []
+        for tornado, name, min_value, max_value in metadata['tornado_trackers']:
+            tornado_tracker = tt.TornadoTracker(Tornado[tornado], name)
+            tornado_tracker.min_value = min_value
+            tornado_tracker.max_value = max_value
+            monte_carlo_results.tornado_trackers.append(tornado_tracker)
+        monte_carlo_results.sobol_indices = [si.SobolIndex(name, first_order, total_order) for name, first_order, total_order in metadata['sobol_indices']]
+        return monte_carlo_results
+
+# Memory-map a saved array (empty arrays cannot be mapped, so they are read)
+def load_array(file_path):
+    array = np.load(file_path, mmap_mode='r')
+    return array if array.size > 0 else np.load(file_path)
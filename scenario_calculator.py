@@ -0,0 +1,95 @@
+import numpy as np # linear algebra library
+import mix_calculator as mc
+import npv_batch_calculator as nbc
+import npv_batch_result as nbr
+import product_variables_snapshot as pvs
+import scenario_result as sr
+import stage_profiler as sp
+import triangle_sampler as ts
+
+# The cached simulations of one product of the mix: its snapshots, their years mix delays and their NPV results
+class ScenarioProduct:
+    def __init__(self, product_variables_ranges, uniforms):
+        self.product_variables_ranges = product_variables_ranges
+        self.values = ts.uniform_variables(product_variables_ranges, uniforms)
+        self.product_variables_snapshots = [pvs.ProductVariablesSnapshot(product_variables_ranges, values = {name: samples[i] for name, samples in self.values.items()}) for i in range(len(uniforms))]
+        self.years_mix_delays = None
+        self.npv_batch_result = None
+
+    # the same simulations with new delays and results (the snapshots are shared, so their delays are only set right before a calculation)
+    def rescheduled(self, years_mix_delays, npv_batch_result):
+        product = ScenarioProduct.__new__(ScenarioProduct)
+        product.product_variables_ranges = self.product_variables_ranges
+        product.values = self.values
+        product.product_variables_snapshots = self.product_variables_snapshots
+        product.years_mix_delays = years_mix_delays
+        product.npv_batch_result = npv_batch_result
+        return product
+
+    def years_before_sales(self):
+        return years_before_sales(self.values, self.years_mix_delays)
+
+# Compare edits of a product mix against a baseline with common random numbers
+# Every product gets its own uniform numbers (one column per variable), drawn once, so an edited range maps the same draws to new values.
+# The baseline caches each product's snapshots, delays and NPV results; a scenario recomputes the edited products, and for the products after them,
+# only the simulations whose years mix delay shifts (the rest keep their cached results)
+class ScenarioCalculator:
+    def __init__(self, company_constants, mix_variables_ranges, simulations = 1000, seed = None):
+        self.company_constants = company_constants
+        random_generator = np.random.default_rng(seed)
+        self.uniforms = [random_generator.random((simulations, len(pvs.VARIABLES))) for product_variables_ranges in mix_variables_ranges]
+        self.products, recomputed_simulations = self.calculate_products(mix_variables_ranges, [None] * len(mix_variables_ranges))
+        self.npvs_millions = total(self.products).net() / 1000000
+
+    # Calculate the NPVs of an edited mix (the same products, in the same order) with the draws of the baseline
+    def evaluate(self, mix_variables_ranges):
+        if len(mix_variables_ranges) != len(self.products):
+            raise ValueError(f'a scenario has to keep the {len(self.products)} products of the baseline (it has {len(mix_variables_ranges)})')
+        products, recomputed_simulations = self.calculate_products(mix_variables_ranges, self.products)
+        return sr.ScenarioResult(self.npvs_millions, total(products).net() / 1000000, recomputed_simulations)
+
+    # Schedule and calculate each product, reusing the cached products up to the first edit
+    def calculate_products(self, mix_variables_ranges, cached_products):
+        simulations = len(self.uniforms[0]) if len(self.uniforms) > 0 else 0
+        products = []
+        recomputed_simulations = []
+        mix_result = nbr.NpvBatchResult(simulations)
+        minimum_years_mix_delays = np.zeros(simulations)
+        rescheduling = False # set from the first edited product on, since every later product sees a different allocation
+        for product, (product_variables_ranges, cached_product) in enumerate(zip(mix_variables_ranges, cached_products)):
+            edited = cached_product is None or vars(cached_product.product_variables_ranges) != vars(product_variables_ranges)
+            if not edited and not rescheduling:
+                scenario_product = cached_product
+                rows = []
+            else:
+                rescheduling = True
+                new_product = ScenarioProduct(product_variables_ranges, self.uniforms[product]) if edited else cached_product
+                snapshots = new_product.product_variables_snapshots
+                if( product_variables_ranges.type == "Product"):
+                    minimum_years_mix_delays = np.zeros(simulations)
+                with sp.stage('scheduling'):
+                    years_mix_delays = mc.MixCalculator().calculate_years_mix_delays(self.company_constants.maximum_development_ftes, minimum_years_mix_delays, mix_result.ftes_by_month, [s.ftes_by_month for s in snapshots])
+                rows = np.arange(simulations) if edited else np.flatnonzero(years_mix_delays != cached_product.years_mix_delays)
+                with sp.stage('product_npv'):
+                    for row in rows.tolist():
+                        snapshots[row].years_mix_delay = float(years_mix_delays[row])
+                    npv_batch_result = cached_product.npv_batch_result if len(rows) == 0 else nbc.NpvBatchCalculator().calculate_product_npv([snapshots[row] for row in rows.tolist()], self.company_constants)
+                    if not edited and len(rows) > 0:
+                        npv_batch_result = cached_product.npv_batch_result.replace(rows, npv_batch_result)
+                scenario_product = new_product.rescheduled(years_mix_delays, npv_batch_result)
+            mix_result.add(scenario_product.npv_batch_result)
+            minimum_years_mix_delays = scenario_product.years_before_sales()
+            products.append(scenario_product)
+            recomputed_simulations.append(len(rows))
+        return products, recomputed_simulations
+
+# The delay before sales begin (ProductVariablesSnapshot.years_before_sales, for every simulation at once)
+def years_before_sales(values, years_mix_delays):
+    return years_mix_delays + values['years_of_development_growth'] + values['years_of_development_maturity'] + values['years_of_development_decline'] + values['years_of_pilot']
+
+# The mix result of the products
+def total(products):
+    mix_result = nbr.NpvBatchResult(len(products[0].years_mix_delays) if len(products) > 0 else 0)
+    for product in products:
+        mix_result.add(product.npv_batch_result)
+    return mix_result
@@ -0,0 +1,32 @@
+import numpy as np # linear algebra library
+
+# The NPVs of a scenario and of its baseline, simulation by simulation (both use the same random draws, so the differences are paired)
+class ScenarioResult:
+    def __init__(self, baseline_npvs_millions, scenario_npvs_millions, recomputed_simulations):
+        self.baseline_npvs_millions = baseline_npvs_millions
+        self.scenario_npvs_millions = scenario_npvs_millions
+        self.recomputed_simulations = recomputed_simulations # how many simulations of each product were recomputed
+
+    # the scenario NPV minus the baseline NPV of each simulation ($ millions)
+    def differences_millions(self):
+        return self.scenario_npvs_millions - self.baseline_npvs_millions
+
+    def mean_difference(self):
+        return float(np.mean(self.differences_millions()))
+
+    # the standard error of the mean difference (much smaller than the spread of either NPV when the scenario is a small edit)
+    def standard_error(self):
+        differences = self.differences_millions()
+        return float(np.std(differences, ddof=1) / np.sqrt(len(differences))) if len(differences) > 1 else 0.0
+
+    # the given percentile (0 to 100) of the differences
+    def percentile(self, percentile):
+        return float(np.percentile(self.differences_millions(), percentile))
+
+    # the fraction of simulations where the scenario beats the baseline
+    def probability_of_improvement(self):
+        return float(np.mean(self.differences_millions() > 0))
+
+    # the products with at least one recomputed simulation
+    def recomputed_products(self):
+        return [product for product, simulations in enumerate(self.recomputed_simulations) if simulations > 0]
@@ -0,0 +1,37 @@
+class SimulationSettings:
+    def __init__(self,
+                 simulations = 4000, # How many random snapshots of the mix to evaluate (the minimum when there is a tolerance)
+                 tornado_simulations = 100, # How many random snapshots to evaluate for each tornado variable (random tornado mode)
+                 seed = None, # The seed of the random generator (None for a different result every run)
+                 workers = 1, # How many processes run simulations in parallel (1 runs them in this process)
+                 streaming = False, # Summarize each metric in constant memory instead of keeping every simulated value
+                 tolerance = None, # Keep adding simulations until the 95% confidence half-widths of the mean NPV and NPV percentiles are this small ($ millions)
+                 tolerance_percentiles = (10, 90), # The NPV percentiles that have to meet the tolerance
+                 maximum_simulations = 100000, # The most simulations to run when there is a tolerance
+                 tornado_mode = 'deterministic', # 'deterministic' evaluates each tornado variable at its low and high value, 'random' re-simulates it
+                 tornado_per_product = False, # Also vary each tornado variable in one product at a time (deterministic tornado mode)
+                 sobol_simulations = 0, # The base sample size of the Sobol sensitivity indices (0 skips them), which take (varying variables + 2) times as many evaluations
+                 keep_monthly_series = False, # Keep the monthly sales and cumulative net of every simulation (to save them with the results)
+                 sampling = 'random', # The sampling design of the simulations: 'random', 'latin_hypercube' (stratified) or 'sobol' (scrambled quasi-random)
+                 monthly_percentiles = False, # Estimate the percentiles of the FTEs, sales and cumulative net of every month (for fan charts), in memory that does not grow with the simulations
+                 keep_samples = False, # Keep the sampled variables and the NPV of every simulation (to fit a surrogate_model)
+                 antithetic = False, # Pair every simulation with one drawn at the opposite quantiles of every variable (random sampling)
+                 control_variates = False): # Reweight the simulations so the sampled variables match their known means, for more precise NPV estimates
+
+        self.simulations = simulations
+        self.tornado_simulations = tornado_simulations
+        self.seed = seed
+        self.workers = workers
+        self.streaming = streaming
+        self.tolerance = tolerance
+        self.tolerance_percentiles = tolerance_percentiles
+        self.maximum_simulations = maximum_simulations
+        self.tornado_mode = tornado_mode
+        self.tornado_per_product = tornado_per_product
+        self.sobol_simulations = sobol_simulations
+        self.keep_monthly_series = keep_monthly_series
+        self.sampling = sampling
+        self.monthly_percentiles = monthly_percentiles
+        self.keep_samples = keep_samples
+        self.antithetic = antithetic
+        self.control_variates = control_variates
@@ -1,21 +1,44 @@
 import math
+import numpy as np # linear algebra library
 import list_helpers as lh
+import streaming_statistic as ss
 
 class SimulationTracker:
-    def __init__(self):
+    # In streaming mode, each metric is summarized by a StreamingStatistic (in constant memory) instead of a list of every value
+    # The monthly sales and cumulative net of each simulation are only kept when requested (for saving them with results_store)
+    # With monthly percentiles, the FTEs, sales and cumulative net of each month are also summarized by a MonthlyQuantileSketch (for fan charts)
+    # With kept samples, the sampled variables and NPV of each simulation are kept too, in the same order (to fit a surrogate model)
+    def __init__(self, streaming = False, keep_monthly_series = False, monthly_percentiles = False, keep_samples = False):
+        self.streaming = streaming
+        self.keep_monthly_series = keep_monthly_series
+        self.monthly_percentiles = monthly_percentiles
+        self.keep_samples = keep_samples
         self.simulations = 0
-        self.npvs_millions = []
-        self.development_costs_millions = []
-        self.unit_sales = []
-        self.sales_millions = []
-        self.consumable_sales_millions = []
-        self.ros = []
-        self.roi = []
+        self.npvs_millions = self.metric()
+        self.development_costs_millions = self.metric()
+        self.unit_sales = self.metric()
+        self.sales_millions = self.metric()
+        self.consumable_sales_millions = self.metric()
+        self.ros = self.metric()
+        self.roi = self.metric()
         self.ftes_by_month = []
         self.sales_by_month = []
         self.consumable_sales_by_month = []
-        self.years_to_break_even = []
-        self.years_to_achieve_10pct_ros = []
+        self.years_to_break_even = self.metric(missing = -1)
+        self.years_to_achieve_10pct_ros = self.metric(missing = -1)
+        self.sales_by_simulation_month = [] # one array of monthly sales per simulation (if kept)
+        self.cumulative_net_by_simulation_month = [] # one array of monthly cumulative net per simulation (if kept)
+        self.samples = [] # one simulation x variable array of the varying variables (see triangle_sampler.mix_matrix) per batch (if kept)
+        self.samples_npvs_millions = [] # one array of the NPVs of the same simulations per batch (if kept)
+        self.controls = [] # one simulation x control array of the control variates (see variance_reducer) per batch (with variance reduction)
+        self.controls_npvs_millions = [] # one array of the NPVs of the same simulations per batch (with variance reduction)
+        self.ftes_by_month_sketch = ss.MonthlyQuantileSketch() if monthly_percentiles else None
+        self.sales_by_month_sketch = ss.MonthlyQuantileSketch() if monthly_percentiles else None
+        self.cumulative_net_by_month_sketch = ss.MonthlyQuantileSketch(carry_last = True) if monthly_percentiles else None # the net stays at its last value once a simulation ends
+
+    # a new list, or streaming statistic, for a metric (where a missing value marks a simulation that never got there)
+    def metric(self, missing = None):
+        return ss.StreamingStatistic(missing) if self.streaming else []
     
     def add(self, result):
         self.simulations += 1
@@ -26,20 +49,26 @@ class SimulationTracker:
         self.consumable_sales_millions.append(result.consumable_sales / 1000000)
         self.ros.append(result.ros() * 100)
         self.roi.append(result.roi() * 100)
-        for month in range(len(result.ftes_by_month)):
-            lh.add_value_to_index(self.ftes_by_month, month, result.ftes_by_month[month])
-        for month in range(len(result.sales_by_month)):
-            lh.add_value_to_index(self.sales_by_month, month, result.sales_by_month[month])
-        for month in range(len(result.consumable_sales_by_month)):
-            lh.add_value_to_index(self.consumable_sales_by_month, month, result.consumable_sales_by_month[month])
+        lh.add_values(self.ftes_by_month, result.ftes_by_month)
+        lh.add_values(self.sales_by_month, result.sales_by_month)
+        lh.add_values(self.consumable_sales_by_month, result.consumable_sales_by_month)
+        if self.keep_monthly_series:
+            self.sales_by_simulation_month.append(result.sales_by_month)
+            self.cumulative_net_by_simulation_month.append(result.cumulative_net_by_month)
+        if self.monthly_percentiles:
+            self.ftes_by_month_sketch.add(result.ftes_by_month)
+            self.sales_by_month_sketch.add(result.sales_by_month)
+            self.cumulative_net_by_month_sketch.add(result.cumulative_net_by_month)
 
         # record the number of months to break even
         months_to_break_even = -12
         months_to_achive_10pct_ros = -12
         cumulative_sales = 0
-        for month in range(len(result.cumulative_net_by_month)):
-            cumulative_net = result.cumulative_net_by_month[month]
-            sales = result.sales_by_month[month]
+        cumulative_net_by_month = np.asarray(result.cumulative_net_by_month).tolist() # Python floats are faster to loop over than numpy scalars
+        sales_by_month = np.asarray(result.sales_by_month).tolist()
+        for month in range(len(cumulative_net_by_month)):
+            cumulative_net = cumulative_net_by_month[month]
+            sales = sales_by_month[month]
             cumulative_sales += sales
             cumulative_ros = cumulative_net / cumulative_sales if cumulative_sales != 0 else 0
             if cumulative_net > 0 and months_to_break_even < 0:
@@ -51,6 +80,81 @@ class SimulationTracker:
         self.years_to_break_even.append(months_to_break_even / 12)
         self.years_to_achieve_10pct_ros.append(months_to_achive_10pct_ros / 12)
     
+    # add a batch of simulations (an NpvBatchResult), with the same metrics as adding each simulation
+    def add_batch(self, result):
+        simulations = result.simulations()
+        self.simulations += simulations
+        self.extend_metric(self.npvs_millions, result.net() / 1000000)
+        self.extend_metric(self.development_costs_millions, result.development_cost / 1000000)
+        self.extend_metric(self.unit_sales, result.unit_sales)
+        self.extend_metric(self.sales_millions, result.sales / 1000000)
+        self.extend_metric(self.consumable_sales_millions, result.consumable_sales / 1000000)
+        self.extend_metric(self.ros, result.ros() * 100)
+        self.extend_metric(self.roi, result.roi() * 100)
+        lh.add_values(self.ftes_by_month, result.ftes_by_month.sum(axis=0))
+        lh.add_values(self.sales_by_month, result.sales_by_month.sum(axis=0))
+        lh.add_values(self.consumable_sales_by_month, result.consumable_sales_by_month.sum(axis=0))
+        if self.keep_monthly_series or self.monthly_percentiles:
+            for simulation, months in enumerate(result.months.tolist()):
+                sales_by_month = result.sales_by_month[simulation, :months]
+                cumulative_net_by_month = result.cumulative_net_by_month[simulation, :months]
+                if self.keep_monthly_series:
+                    self.sales_by_simulation_month.append(sales_by_month)
+                    self.cumulative_net_by_simulation_month.append(cumulative_net_by_month)
+                if self.monthly_percentiles:
+                    self.ftes_by_month_sketch.add(result.ftes_by_month[simulation, :months])
+                    self.sales_by_month_sketch.add(sales_by_month)
+                    self.cumulative_net_by_month_sketch.add(cumulative_net_by_month)
+
+        # record the number of months to break even, and to reach a 10% cumulative ROS (the first month of each, over the months of each simulation)
+        in_series = np.arange(result.cumulative_net_by_month.shape[1]) < result.months[:, np.newaxis]
+        cumulative_net_by_month = result.cumulative_net_by_month
+        cumulative_sales_by_month = np.cumsum(result.sales_by_month[:, :cumulative_net_by_month.shape[1]], axis=1)
+        cumulative_ros_by_month = np.divide(cumulative_net_by_month, cumulative_sales_by_month, out=np.zeros_like(cumulative_net_by_month), where=cumulative_sales_by_month != 0)
+        self.extend_metric(self.years_to_break_even, first_month(in_series & (cumulative_net_by_month > 0)) / 12)
+        self.extend_metric(self.years_to_achieve_10pct_ros, first_month(in_series & (cumulative_ros_by_month >= 0.1)) / 12)
+
+    # keep the sampled variables and the NPVs ($ millions) of a batch of simulations
+    def add_samples(self, samples, npvs_millions):
+        if self.keep_samples:
+            self.samples.append(samples)
+            self.samples_npvs_millions.append(npvs_millions)
+
+    # keep the control variates and the NPVs ($ millions) of a batch of simulations, in order (the simulations of an antithetic pair are adjacent)
+    def add_controls(self, controls, npvs_millions):
+        self.controls.append(controls)
+        self.controls_npvs_millions.append(npvs_millions)
+
+    # add an array of values to a list, or streaming statistic
+    def extend_metric(self, metric, values):
+        metric.extend(values if self.streaming else values.tolist())
+
+    # merge the simulations of another (not yet normalized) tracker into this one
+    def merge(self, simulation_tracker):
+        self.simulations += simulation_tracker.simulations
+        self.npvs_millions.extend(simulation_tracker.npvs_millions)
+        self.development_costs_millions.extend(simulation_tracker.development_costs_millions)
+        self.unit_sales.extend(simulation_tracker.unit_sales)
+        self.sales_millions.extend(simulation_tracker.sales_millions)
+        self.consumable_sales_millions.extend(simulation_tracker.consumable_sales_millions)
+        self.ros.extend(simulation_tracker.ros)
+        self.roi.extend(simulation_tracker.roi)
+        lh.add_values(self.ftes_by_month, simulation_tracker.ftes_by_month)
+        lh.add_values(self.sales_by_month, simulation_tracker.sales_by_month)
+        lh.add_values(self.consumable_sales_by_month, simulation_tracker.consumable_sales_by_month)
+        self.years_to_break_even.extend(simulation_tracker.years_to_break_even)
+        self.years_to_achieve_10pct_ros.extend(simulation_tracker.years_to_achieve_10pct_ros)
+        self.sales_by_simulation_month.extend(simulation_tracker.sales_by_simulation_month)
+        self.cumulative_net_by_simulation_month.extend(simulation_tracker.cumulative_net_by_simulation_month)
+        self.samples.extend(simulation_tracker.samples)
+        self.samples_npvs_millions.extend(simulation_tracker.samples_npvs_millions)
+        self.controls.extend(simulation_tracker.controls)
+        self.controls_npvs_millions.extend(simulation_tracker.controls_npvs_millions)
+        if self.monthly_percentiles:
+            self.ftes_by_month_sketch.merge(simulation_tracker.ftes_by_month_sketch)
+            self.sales_by_month_sketch.merge(simulation_tracker.sales_by_month_sketch)
+            self.cumulative_net_by_month_sketch.merge(simulation_tracker.cumulative_net_by_month_sketch)
+
     def normalize(self):
         if self.simulations > 0:
             # normalize FTEs by dividing each value by the number of simulations
@@ -65,9 +169,17 @@ class SimulationTracker:
             for month in range(len(self.consumable_sales_by_month)):
                 self.consumable_sales_by_month[month] /= self.simulations
             
-            max_years = math.ceil(max(self.years_to_break_even))
-            self.years_to_break_even = [max_years if value < 0 else value for value in self.years_to_break_even]
-            self.years_to_achieve_10pct_ros = [max_years if value < 0 else value for value in self.years_to_achieve_10pct_ros]
-
-
+            if self.streaming:
+                max_years = math.ceil(max(self.years_to_break_even.max(), -1))
+                self.years_to_break_even.fill_missing(max_years)
+                self.years_to_achieve_10pct_ros.fill_missing(max_years)
+            else:
+                max_years = math.ceil(max(self.years_to_break_even))
+                self.years_to_break_even = [max_years if value < 0 else value for value in self.years_to_break_even]
+                self.years_to_achieve_10pct_ros = [max_years if value < 0 else value for value in self.years_to_achieve_10pct_ros]
 
+# The first month each simulation (row) meets a condition, or -12 if it never does
+def first_month(condition_by_month):
+    if condition_by_month.shape[1] == 0:
+        return np.full(len(condition_by_month), -12)
+    return np.where(condition_by_month.any(axis=1), np.argmax(condition_by_month, axis=1), -12)
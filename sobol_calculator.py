@@ -0,0 +1,56 @@
+import numpy as np # linear algebra library
+import sobol_index as si
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+import product_variables_snapshot as pvs
+import triangle_sampler as ts
+
+# The sample matrices are evaluated in batches of this many rows
+BATCH_EVALUATIONS = 500
+
+# Compute first-order and total-order Sobol indices of the NPV with the Saltelli scheme
+# Two independent matrices of uniform numbers, A and B, are drawn once. For each variable i, the matrix AB_i is A with the columns of variable i taken from B,
+# so the analysis takes (variables + 2) x simulations evaluations. Each variable is varied in every product at once (a group index)
+class SobolCalculator:
+    def calculate(self, company_constants, mix_variables_ranges, simulations, seed = None, executor = None):
+        mix_samples, randoms = ts.fixed_mix(mix_variables_ranges, 0)
+        names = [name for name, variable_tornado in pvs.VARIABLES if any(random_name == name for product, random_name, a in randoms)]
+        if simulations < 2 or len(names) == 0:
+            return []
+
+        # build the sample matrices, one row per evaluation and one column per varying variable of each product
+        random_generator = np.random.default_rng(seed)
+        matrix_a = random_generator.random((simulations, len(randoms)))
+        matrix_b = random_generator.random((simulations, len(randoms)))
+        matrices = [matrix_a, matrix_b]
+        for name in names:
+            matrix_ab = matrix_a.copy()
+            columns = [column for column, (product, random_name, a) in enumerate(randoms) if random_name == name]
+            matrix_ab[:, columns] = matrix_b[:, columns]
+            matrices.append(matrix_ab)
+        uniforms = np.concatenate(matrices)
+
+        # evaluate them in batches
+        tasks = [(company_constants, mix_variables_ranges, uniforms[start:start + BATCH_EVALUATIONS]) for start in range(0, len(uniforms), BATCH_EVALUATIONS)]
+        npvs_millions = np.concatenate(list(map(calculate_npvs, tasks) if executor is None else executor.map(calculate_npvs, tasks)))
+        npvs_millions = npvs_millions.reshape(len(matrices), simulations)
+
+        # estimate the indices (Saltelli 2010 for the first order, Jansen for the total order), centering the NPVs to keep the estimates stable
+        npvs_millions -= npvs_millions[:2].mean()
+        npvs_a, npvs_b = npvs_millions[0], npvs_millions[1]
+        variance = npvs_millions[:2].var()
+        sobol_indices = []
+        for name, npvs_ab in zip(names, npvs_millions[2:]):
+            sobol_index = si.SobolIndex(name.replace('_', ' ').capitalize())
+            if variance > 0:
+                sobol_index.first_order = float(np.mean(npvs_b * (npvs_ab - npvs_a)) / variance)
+                sobol_index.total_order = float(np.mean((npvs_a - npvs_ab) ** 2) / 2 / variance)
+            sobol_indices.append(sobol_index)
+        return sobol_indices
+
+# Compute the NPVs ($ millions) of a batch of rows of a sample matrix
+def calculate_npvs(task):
+    company_constants, mix_variables_ranges, uniforms = task
+    mix_samples = ts.uniform_mix(mix_variables_ranges, uniforms)
+    mix_variables_snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(len(uniforms))]
+    return mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants).net() / 1000000
@@ -0,0 +1,6 @@
+# The variance-based sensitivity of the NPV to one variable (varied in every product of the mix)
+class SobolIndex:
+    def __init__(self, name, first_order = 0, total_order = 0):
+        self.name = name
+        self.first_order = first_order # the share of the NPV variance caused by the variable alone
+        self.total_order = total_order # the share of the NPV variance caused by the variable, including its interactions with other variables
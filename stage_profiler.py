@@ -0,0 +1,95 @@
+import json
+import time
+import tracemalloc
+import contextlib
+
+# The profiler that records the stages, or None when profiling is off (a stage is then an empty context, so the overhead is near zero)
+PROFILER = None
+
+# Wall time, call count and memory of one stage
+class StageStatistics:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_bytes = 0 # the most memory traced above the memory at the start of a call
+        self.allocated_bytes = 0 # the memory traced at the end of the calls less the memory at their start (what the stage kept)
+
+# Record how long each stage of a run takes, how often it runs and, with tracemalloc, how much memory it uses
+# Stages can be nested: the time and memory of an inner stage count toward the outer stage too
+class StageProfiler:
+    def __init__(self, trace_memory = True):
+        self.trace_memory = trace_memory
+        self.started_tracing = False # whether enable started tracemalloc (tracing that was already running is left running)
+        self.stages = {}
+        self.frames = [] # the stages in progress: [name, start time, traced memory at the start, peak traced memory so far]
+        self.start_time = time.perf_counter()
+
+    def enter(self, name):
+        current = 0
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self.frames) > 0:
+                self.frames[-1][3] = max(self.frames[-1][3], peak)
+            tracemalloc.reset_peak()
+        self.frames.append([name, time.perf_counter(), current, current])
+
+    def exit(self):
+        name, start_time, start_memory, peak = self.frames.pop()
+        stage_statistics = self.stages.setdefault(name, StageStatistics())
+        stage_statistics.calls += 1
+        stage_statistics.seconds += time.perf_counter() - start_time
+        if self.trace_memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, traced_peak)
+            stage_statistics.peak_bytes = max(stage_statistics.peak_bytes, peak - start_memory)
+            stage_statistics.allocated_bytes += current - start_memory
+            if len(self.frames) > 0:
+                self.frames[-1][3] = max(self.frames[-1][3], peak)
+
+    # the statistics of every stage, as a dictionary that converts to JSON
+    def report(self):
+        return {
+            'total_seconds': time.perf_counter() - self.start_time,
+            'trace_memory': self.trace_memory,
+            'stages': {name: vars(stage_statistics) for name, stage_statistics in self.stages.items()}}
+
+    def write_json(self, file_path):
+        with open(file_path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+class Stage:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.profiler.exit()
+
+NULL_STAGE = contextlib.nullcontext()
+
+# Time a stage: with stage_profiler.stage('name'): ...
+def stage(name):
+    if PROFILER is None:
+        return NULL_STAGE
+    return Stage(PROFILER, name)
+
+# Start profiling the stages of this process
+def enable(trace_memory = True):
+    global PROFILER
+    PROFILER = StageProfiler(trace_memory)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        PROFILER.started_tracing = True
+    return PROFILER
+
+# Stop profiling, returning the profiler with the statistics
+def disable():
+    global PROFILER
+    profiler = PROFILER
+    PROFILER = None
+    if profiler is not None and profiler.started_tracing:
+        tracemalloc.stop()
+    return profiler
@@ -0,0 +1,246 @@
+import math
+import numpy as np # linear algebra library
+
+# How many values a streaming statistic buffers before adding them
+BUFFER_VALUES = 1024
+
+# A fixed-bin histogram with logarithmically spaced bins (one set for positive and one for negative values), used as a mergeable quantile sketch
+# Every value lands in a bin whose representative value is within the relative accuracy of it, so quantiles are too
+class QuantileSketch:
+    def __init__(self, relative_accuracy = 0.01, smallest_magnitude = 1e-6, largest_magnitude = 1e12):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.smallest_magnitude = smallest_magnitude
+        bins = math.ceil(math.log(largest_magnitude / smallest_magnitude, self.gamma)) + 1
+        self.positive_counts = np.zeros(bins, dtype=np.int64)
+        self.negative_counts = np.zeros(bins, dtype=np.int64)
+        self.zero_count = 0 # values smaller in magnitude than the smallest magnitude
+
+    def count(self):
+        return int(self.positive_counts.sum() + self.negative_counts.sum() + self.zero_count)
+
+    # add an array of values
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        magnitudes = np.abs(values)
+        small = magnitudes < self.smallest_magnitude
+        self.zero_count += int(small.sum())
+        bins = self.bin(magnitudes[~small])
+        positive = values[~small] > 0
+        self.positive_counts += np.bincount(bins[positive], minlength=len(self.positive_counts))
+        self.negative_counts += np.bincount(bins[~positive], minlength=len(self.negative_counts))
+
+    # add many copies of the same value
+    def add_repeated(self, value, count):
+        if abs(value) < self.smallest_magnitude:
+            self.zero_count += count
+        elif value > 0:
+            self.positive_counts[self.bin(np.array([value]))[0]] += count
+        else:
+            self.negative_counts[self.bin(np.array([-value]))[0]] += count
+
+    def merge(self, quantile_sketch):
+        self.positive_counts += quantile_sketch.positive_counts
+        self.negative_counts += quantile_sketch.negative_counts
+        self.zero_count += quantile_sketch.zero_count
+
+    # the bin of each magnitude (magnitudes in (smallest * gamma^(bin - 1), smallest * gamma^bin] share a bin)
+    def bin(self, magnitudes):
+        bins = np.ceil(np.log(magnitudes / self.smallest_magnitude) / math.log(self.gamma)).astype(int)
+        return np.clip(bins, 0, len(self.positive_counts) - 1)
+
+    # the representative value and count of every bin, from the most negative to the most positive
+    def bins(self):
+        magnitudes = self.smallest_magnitude * self.gamma ** np.arange(len(self.positive_counts)) * 2 / (self.gamma + 1)
+        values = np.concatenate((-magnitudes[::-1], [0], magnitudes))
+        counts = np.concatenate((self.negative_counts[::-1], [self.zero_count], self.positive_counts))
+        return values, counts
+
+    # the width of the bin of a value (the finest difference the sketch can tell near it)
+    def bin_width(self, value):
+        if abs(value) < self.smallest_magnitude:
+            return 2 * self.smallest_magnitude
+        upper = self.smallest_magnitude * self.gamma ** self.bin(np.array([abs(value)]))[0]
+        return float(upper * (1 - 1 / self.gamma))
+
+    # the value below which the given fraction (0 to 1) of the values lie
+    def quantile(self, fraction):
+        values, counts = self.bins()
+        cumulative_counts = np.cumsum(counts)
+        if cumulative_counts[-1] == 0:
+            return float('nan')
+        rank = fraction * (cumulative_counts[-1] - 1)
+        return float(values[np.searchsorted(cumulative_counts, rank, side='right')])
+
+# Summary statistics of a stream of values in constant memory: online moments (Welford), exact extremes, and a quantile sketch
+# Values are buffered and added in batches. It has the append and extend methods of the list it replaces in the simulation tracker
+class StreamingStatistic:
+    def __init__(self, missing = None, relative_accuracy = 0.01):
+        self.missing = missing # a value that marks a missing result (counted, but kept out of the statistics until filled)
+        self.missing_count = 0
+        self.count = 0 # the values added so far (not counting the buffer)
+        self.running_mean = 0.0
+        self.running_m2 = 0.0 # the sum of squared differences from the mean
+        self.min_value = float('inf')
+        self.max_value = float('-inf')
+        self.quantile_sketch = QuantileSketch(relative_accuracy)
+        self.buffer = []
+
+    def __len__(self):
+        return self.count + len(self.buffer) + self.missing_count
+
+    def append(self, value):
+        if value == self.missing:
+            self.missing_count += 1
+            return
+        self.buffer.append(value)
+        if len(self.buffer) >= BUFFER_VALUES:
+            self.flush()
+
+    # add many values (an array at once), or merge another streaming statistic
+    def extend(self, values):
+        if isinstance(values, StreamingStatistic):
+            self.merge(values)
+        elif isinstance(values, np.ndarray):
+            missing = values == self.missing if self.missing is not None else np.zeros(len(values), dtype=bool)
+            self.missing_count += int(missing.sum())
+            self.flush()
+            values = values[~missing].astype(float)
+            if len(values) > 0:
+                self.combine(len(values), values.mean(), ((values - values.mean()) ** 2).sum(), values.min(), values.max())
+                self.quantile_sketch.add(values)
+        else:
+            for value in values:
+                self.append(value)
+
+    # add the buffered values, combining their moments with the running moments (Chan et al.)
+    def flush(self):
+        if len(self.buffer) == 0:
+            return
+        values = np.array(self.buffer, dtype=float)
+        self.buffer = []
+        self.combine(len(values), values.mean(), ((values - values.mean()) ** 2).sum(), values.min(), values.max())
+        self.quantile_sketch.add(values)
+
+    def combine(self, count, mean, m2, min_value, max_value):
+        total = self.count + count
+        delta = mean - self.running_mean
+        self.running_mean += delta * count / total
+        self.running_m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min_value = min(self.min_value, min_value)
+        self.max_value = max(self.max_value, max_value)
+
+    def merge(self, streaming_statistic):
+        self.flush()
+        streaming_statistic.flush()
+        self.missing_count += streaming_statistic.missing_count
+        if streaming_statistic.count > 0:
+            self.combine(streaming_statistic.count, streaming_statistic.running_mean, streaming_statistic.running_m2, streaming_statistic.min_value, streaming_statistic.max_value)
+            self.quantile_sketch.merge(streaming_statistic.quantile_sketch)
+
+    # replace the missing results with a value
+    def fill_missing(self, value):
+        self.flush()
+        if self.missing_count > 0:
+            self.combine(self.missing_count, value, 0.0, value, value)
+            self.quantile_sketch.add_repeated(value, self.missing_count)
+            self.missing_count = 0
+
+    def mean(self):
+        self.flush()
+        return self.running_mean if self.count > 0 else float('nan')
+
+    def variance(self):
+        self.flush()
+        return self.running_m2 / (self.count - 1) if self.count > 1 else 0
+
+    def standard_deviation(self):
+        return math.sqrt(self.variance())
+
+    def min(self):
+        self.flush()
+        return self.min_value
+
+    def max(self):
+        self.flush()
+        return self.max_value
+
+    # the value below which the given fraction (0 to 1) of the values lie, clamped to the exact extremes
+    def quantile(self, fraction):
+        self.flush()
+        return min(max(self.quantile_sketch.quantile(fraction), self.min_value), self.max_value)
+
+    # the finest difference the quantile of the given fraction can resolve (the width of its sketch bin)
+    def quantile_resolution(self, fraction):
+        return self.quantile_sketch.bin_width(self.quantile(fraction))
+
+    # the value and count of every occupied sketch bin, for plotting a weighted histogram
+    def histogram(self):
+        self.flush()
+        values, counts = self.quantile_sketch.bins()
+        occupied = counts > 0
+        return np.clip(values[occupied], self.min_value, self.max_value), counts[occupied]
+
+# A quantile sketch of every month of a monthly series (one row of sketch bins per month), in memory that grows with the months but not the simulations
+# A simulation shorter than the longest counts as zero in the months past its end, or as its last value for a cumulative series
+class MonthlyQuantileSketch:
+    def __init__(self, carry_last = False, relative_accuracy = 0.02):
+        self.carry_last = carry_last
+        self.quantile_sketch = QuantileSketch(relative_accuracy) # only used for its bins
+        self.width = 2 * len(self.quantile_sketch.positive_counts) + 1 # the bins of QuantileSketch.bins, from the most negative to the most positive
+        self.counts = np.zeros((0, self.width), dtype=np.int64) # the values of each month
+        self.ended = np.zeros((1, self.width), dtype=np.int64) # the values past the end of the simulations that ended at each month
+        self.buffer = []
+
+    def __len__(self):
+        self.flush()
+        return len(self.counts)
+
+    # add the monthly series of a simulation
+    def add(self, values):
+        self.buffer.append(np.asarray(values, dtype=float))
+        if len(self.buffer) >= BUFFER_VALUES:
+            self.flush()
+
+    # add the buffered series: each value goes to the bin of its month, and each series adds its value past the end at its length
+    def flush(self):
+        if len(self.buffer) == 0:
+            return
+        series, self.buffer = self.buffer, []
+        lengths = np.array([len(values) for values in series])
+        self.grow(lengths.max())
+        months = np.concatenate([np.arange(length) for length in lengths])
+        bins = self.bin(np.concatenate(series))
+        self.counts += np.bincount(months * self.width + bins, minlength=self.counts.size).reshape(self.counts.shape)
+        past_end = np.array([values[-1] if self.carry_last and len(values) > 0 else 0.0 for values in series])
+        self.ended += np.bincount(lengths * self.width + self.bin(past_end), minlength=self.ended.size).reshape(self.ended.shape)
+
+    # make room for the given number of months
+    def grow(self, months):
+        if months > len(self.counts):
+            self.counts = np.concatenate((self.counts, np.zeros((months - len(self.counts), self.width), dtype=np.int64)))
+            self.ended = np.concatenate((self.ended, np.zeros((months + 1 - len(self.ended), self.width), dtype=np.int64)))
+
+    # the bin of each value, in the order of QuantileSketch.bins
+    def bin(self, values):
+        bins = len(self.quantile_sketch.positive_counts)
+        magnitudes = np.abs(values)
+        small = magnitudes < self.quantile_sketch.smallest_magnitude
+        magnitude_bins = self.quantile_sketch.bin(np.where(small, 1.0, magnitudes))
+        return np.where(small, bins, np.where(values > 0, bins + 1 + magnitude_bins, bins - 1 - magnitude_bins))
+
+    def merge(self, monthly_quantile_sketch):
+        self.flush()
+        monthly_quantile_sketch.flush()
+        self.grow(len(monthly_quantile_sketch.counts))
+        self.counts[:len(monthly_quantile_sketch.counts)] += monthly_quantile_sketch.counts
+        self.ended[:len(monthly_quantile_sketch.ended)] += monthly_quantile_sketch.ended
+
+    # the value of each month below which the given fraction (0 to 1) of the simulations lie
+    def quantiles(self, fraction):
+        self.flush()
+        counts = self.counts + np.cumsum(self.ended, axis=0)[:len(self.counts)]
+        cumulative_counts = np.cumsum(counts, axis=1)
+        ranks = fraction * (cumulative_counts[:, -1:] - 1)
+        values, bin_counts = self.quantile_sketch.bins()
+        return values[np.argmax(cumulative_counts > ranks, axis=1)]
@@ -0,0 +1,143 @@
+import numpy as np # linear algebra library
+import product_variables_snapshot as pvs
+import scenario_result as sr
+import sobol_calculator as sbc
+import triangle_sampler as ts
+
+# How many of the variables with the largest linear effect on the NPV also get pairwise interaction terms
+INTERACTION_VARIABLES = 12
+
+# The ridge penalty of the fit, relative to the number of simulations (keeps the fit stable when variables are nearly collinear)
+RIDGE = 1e-4
+
+# The share of the simulations held out to measure the fit error (before the final fit on all of them)
+VALIDATION_FRACTION = 0.2
+
+# A fast response surface of the NPV against the sampled variables of a run (kept with the keep_samples setting), for instant what-if answers
+# The surface is a quadratic polynomial fit by ridge regression: every varying variable (scaled to -1 to 1 over its range) with its square,
+# and the pairwise products of the variables with the largest linear effect. A what-if query edits the ranges of the products: each simulation
+# keeps the quantiles of its draws (common random numbers), and the NPV moves by the change in the surface. A query that reaches outside the
+# ranges the surface was fit on is answered by a full simulation of the same draws instead
+class SurrogateModel:
+    def __init__(self, company_constants, mix_variables_ranges, samples, npvs_millions, ridge = RIDGE, seed = 0):
+        self.company_constants = company_constants
+        self.mix_variables_ranges = mix_variables_ranges
+        self.samples = samples
+        self.npvs_millions = npvs_millions
+        self.ridge = ridge
+        self.seed = seed
+        self.fixed_samples, self.randoms = ts.fixed_mix(mix_variables_ranges, 1)
+        self.low = np.array([float(a[0]) for product, name, a in self.randoms])
+        self.high = np.array([float(a[2]) for product, name, a in self.randoms])
+        self.interactions = []
+
+        # measure the fit error on held out simulations, then fit on all of them
+        rows = np.random.default_rng(seed).permutation(len(samples))
+        held_out = rows[:int(len(samples) * VALIDATION_FRACTION)]
+        fitted = rows[len(held_out):]
+        if len(held_out) > 0:
+            self.fit(samples[fitted], npvs_millions[fitted])
+            errors = self.predict(samples[held_out]) - npvs_millions[held_out]
+        else:
+            self.fit(samples, npvs_millions)
+            errors = self.predict(samples) - npvs_millions
+        self.rmse_millions = float(np.sqrt(np.mean(errors ** 2))) # the root mean square error of the predicted NPVs ($ millions)
+        variance = np.var(npvs_millions[held_out] if len(held_out) > 0 else npvs_millions)
+        self.r_squared = float(1 - np.mean(errors ** 2) / variance) if variance > 0 else 1.0 # the share of the NPV variance the surface explains
+        self.fit(samples, npvs_millions)
+        self.predicted_npvs_millions = self.predict(samples)
+        self.uniforms = np.empty_like(samples) # the quantile (0 to 1) of each sampled variable within its range
+        for column, (product, name, a) in enumerate(self.randoms):
+            self.uniforms[:, column] = ts.triangular_cdf(samples[:, column], *(float(x) for x in a))
+
+    # fit the coefficients, choosing the interacting variables by the size of their linear effect
+    def fit(self, samples, npvs_millions):
+        scaled = self.scale(samples)
+        linear = np.column_stack((np.ones(len(samples)), scaled))
+        effects = np.abs(ridge_regression(linear, npvs_millions, self.ridge)[1:])
+        top = np.argsort(-effects, kind='stable')[:INTERACTION_VARIABLES]
+        self.interactions = [(int(a), int(b)) for position, a in enumerate(top) for b in top[position + 1:]]
+        self.coefficients = ridge_regression(self.features(samples), npvs_millions, self.ridge)
+
+    # the variables scaled to -1 to 1 over their ranges
+    def scale(self, samples):
+        return 2 * (samples - self.low) / (self.high - self.low) - 1
+
+    # the polynomial terms of each simulation: a constant, the variables, their squares and the chosen interactions
+    def features(self, samples):
+        scaled = self.scale(samples)
+        interactions = [scaled[:, a] * scaled[:, b] for a, b in self.interactions]
+        return np.column_stack([np.ones(len(samples)), scaled, scaled ** 2] + interactions)
+
+    # the predicted NPVs ($ millions) of a simulation x variable array of samples
+    def predict(self, samples):
+        return self.features(samples) @ self.coefficients
+
+    # Whether the surface covers edited ranges: the products keep everything but their variables, and each variable stays within the range
+    # it was fit on (a variable that did not vary keeps its value)
+    def covers(self, mix_variables_ranges):
+        check_products(self.mix_variables_ranges, mix_variables_ranges)
+        names = [name for name, variable_tornado in pvs.VARIABLES]
+        for trained, edited in zip(self.mix_variables_ranges, mix_variables_ranges):
+            if {k: v for k, v in vars(trained).items() if k not in names} != {k: v for k, v in vars(edited).items() if k not in names}:
+                return False
+        trained_bounds = bounds(self.mix_variables_ranges)
+        for key, (low, high) in bounds(mix_variables_ranges).items():
+            trained_low, trained_high = trained_bounds[key]
+            if low < trained_low - 1e-9 * abs(trained_low) or high > trained_high + 1e-9 * abs(trained_high):
+                return False
+        return True
+
+    # Answer a what-if query (edited ranges of the same products), returning the NPVs of the run against the edited NPVs, simulation by simulation
+    # The surface answers when it covers the edit (no simulations are recomputed); otherwise every simulation is recomputed
+    def what_if(self, mix_variables_ranges):
+        if self.covers(mix_variables_ranges):
+            edited_samples = self.samples.copy()
+            edited_fixed_samples, edited_randoms = ts.fixed_mix(mix_variables_ranges, 1)
+            edited_ranges = {(product, name): a for product, name, a in edited_randoms}
+            for column, (product, name, a) in enumerate(self.randoms):
+                if (product, name) in edited_ranges and list(edited_ranges[(product, name)]) == list(a):
+                    continue # an unchanged range keeps its draws exactly
+                if (product, name) in edited_ranges:
+                    edited_samples[:, column] = ts.triangular_quantile(self.uniforms[:, column], *(float(x) for x in edited_ranges[(product, name)]))
+                else:
+                    edited_samples[:, column] = edited_fixed_samples[product][name][0]
+            npvs_millions = self.npvs_millions + (self.predict(edited_samples) - self.predicted_npvs_millions)
+            return sr.ScenarioResult(self.npvs_millions, npvs_millions, [0] * len(mix_variables_ranges))
+        return sr.ScenarioResult(self.npvs_millions, self.simulate(mix_variables_ranges), [len(self.samples)] * len(mix_variables_ranges))
+
+    # Value edited ranges with the full model, drawing each variable at the quantile of the run (a variable that did not vary in the run is drawn anew)
+    def simulate(self, mix_variables_ranges):
+        columns = {(product, name): column for column, (product, name, a) in enumerate(self.randoms)}
+        edited_fixed_samples, edited_randoms = ts.fixed_mix(mix_variables_ranges, 0)
+        edited_uniforms = np.random.default_rng(self.seed).random((len(self.samples), len(edited_randoms)))
+        for edited_column, (product, name, a) in enumerate(edited_randoms):
+            if (product, name) in columns:
+                edited_uniforms[:, edited_column] = self.uniforms[:, columns[(product, name)]]
+        tasks = [(self.company_constants, mix_variables_ranges, edited_uniforms[start:start + sbc.BATCH_EVALUATIONS]) for start in range(0, len(edited_uniforms), sbc.BATCH_EVALUATIONS)]
+        return np.concatenate([sbc.calculate_npvs(task) for task in tasks])
+
+# Fit a surrogate model to a run made with the keep_samples setting
+def from_results(company_constants, mix_variables_ranges, monte_carlo_results, ridge = RIDGE):
+    simulation_tracker = monte_carlo_results.simulation_tracker
+    if len(simulation_tracker.samples) == 0:
+        raise ValueError('a surrogate model is fit to a run that keeps its samples')
+    return SurrogateModel(company_constants, mix_variables_ranges, np.concatenate(simulation_tracker.samples), np.concatenate(simulation_tracker.samples_npvs_millions), ridge)
+
+# The ridge regression coefficients of the NPVs on the features (the first feature, the constant, is not penalized)
+def ridge_regression(features, npvs_millions, ridge):
+    penalty = np.full(features.shape[1], ridge * len(features))
+    penalty[0] = 0
+    return np.linalg.solve(features.T @ features + np.diag(penalty), features.T @ npvs_millions)
+
+# The lowest and highest value of each variable of each product, (product, name) -> (low, high)
+def bounds(mix_variables_ranges):
+    fixed_samples, randoms = ts.fixed_mix(mix_variables_ranges, 1)
+    variable_bounds = {(product, name): (float(values[0]), float(values[0])) for product, samples in enumerate(fixed_samples) for name, values in samples.items()}
+    variable_bounds.update({(product, name): (float(a[0]), float(a[2])) for product, name, a in randoms})
+    return variable_bounds
+
+# A what-if query edits the products of the run, it does not add or remove them
+def check_products(mix_variables_ranges, edited_mix_variables_ranges):
+    if len(edited_mix_variables_ranges) != len(mix_variables_ranges):
+        raise ValueError(f'the what-if query has {len(edited_mix_variables_ranges)} products, the run has {len(mix_variables_ranges)}')
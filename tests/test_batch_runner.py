@@ -0,0 +1,41 @@
+import csv
+import pytest
+import batch_runner as br
+import simulation_settings as ss
+from benchmarks import synthetic_portfolio as sp
+
+@pytest.fixture
+def workbook_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(br.xh, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    for name, products in [('a', 1), ('b', 3)]:
+        sp.write_workbook(sp.synthetic_company_constants(), sp.synthetic_mix(products), tmp_path / f'{name}.xlsx')
+    (tmp_path / 'c.xlsx').write_text('not a workbook')
+    (tmp_path / '~$a.xlsx').write_text('lock file')
+    return tmp_path
+
+def test_workbook_paths(workbook_directory):
+    assert [path.split('/')[-1] for path in br.workbook_paths(str(workbook_directory))] == ['a.xlsx', 'b.xlsx', 'c.xlsx']
+    assert [path.split('/')[-1] for path in br.workbook_paths(str(workbook_directory / '[ab].xlsx'))] == ['a.xlsx', 'b.xlsx']
+
+def test_batch_summary_does_not_depend_on_workers(workbook_directory):
+    simulation_settings = ss.SimulationSettings(simulations=20, seed=1)
+    workbook_paths = br.workbook_paths(str(workbook_directory))
+    serial = br.BatchRunner(simulation_settings).run(workbook_paths, str(workbook_directory / 'summary.csv'))
+    parallel = br.BatchRunner(simulation_settings, workers=2).run(workbook_paths)
+    assert serial == parallel
+    assert [row['error'] for row in serial[:2]] == ['', '']
+    assert serial[0]['simulations'] == 20 and serial[0]['p10_npv_millions'] <= serial[0]['p50_npv_millions'] <= serial[0]['p90_npv_millions']
+    assert serial[2]['error'] != ''
+    with open(workbook_directory / 'summary.csv', newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['workbook'] for row in rows] == workbook_paths
+    assert float(rows[1]['mean_npv_millions']) == pytest.approx(serial[1]['mean_npv_millions'])
+
+def test_batch_summary_records_a_failed_plot(workbook_directory):
+    simulation_settings = ss.SimulationSettings(simulations=20, seed=1)
+    (workbook_directory / 'plots' / 'a.png').mkdir(parents=True) # the plot of a cannot be saved over a directory
+    rows = br.BatchRunner(simulation_settings, plot_directory=str(workbook_directory / 'plots')).run(br.workbook_paths(str(workbook_directory / '[ab].xlsx')), str(workbook_directory / 'summary.csv'))
+    assert rows[0]['error'].startswith('plot ') and rows[1]['error'] == ''
+    assert (workbook_directory / 'plots' / 'b.png').exists()
+    with open(workbook_directory / 'summary.csv', newline='') as file:
+        assert [row['error'] for row in csv.DictReader(file)] == [rows[0]['error'], '']
@@ -0,0 +1,66 @@
+import pytest
+from openpyxl import Workbook
+import excel_helpers as xh
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    company_constants_sheet = workbook.active
+    company_constants_sheet.title = 'Company Constants'
+    for row, value in enumerate([0.05, 150000, 12, 0.03, 0.02, 0.01], start=2):
+        company_constants_sheet.cell(row=row, column=2, value=value)
+
+    products_sheet = workbook.create_sheet('Products')
+    for row in [
+            ['Widget'], ['Development FTEs', 3, 5, 8], ['Unit Cost', 800, 1000, 1400], ['Yearly Unit Sales', 50, 100, 150], ['Consumable Margin', 0.5, 0.6, 0.7],
+            [None],
+            ['Gadget'], ['Development FTEs', 1, 2, 3],
+            [None],
+            ['Widget Export'], ['Unit Cost', 900, 1100, 1500], ['Consumable Margin', 0.1, 0.2, 0.3]]:
+        products_sheet.append(row)
+
+    mix_sheet = workbook.create_sheet('Mix')
+    for row in [['Sheet', 'Name', 'Type', 'Exclude'], ['Products', 'Widget', 'Product'], ['Products', 'Widget Export', 'Market'], ['Products', 'Missing', 'Product'],
+                ['Products', 'Gadget', 'Product', 'x'], [None], ['Products', 'Gadget', 'Product']]:
+        mix_sheet.append(row)
+
+    path = tmp_path / 'mix.xlsx'
+    workbook.save(path)
+    return path
+
+def test_read_excel_data(workbook_path):
+    company_constants, mix_variables_ranges = xh.ExcelHelpers().read_excel_data(workbook_path, use_cache = False)
+    assert company_constants.market_return == 0.05
+    assert company_constants.product_price_trend == 0.01
+    assert [(x.name, x.type) for x in mix_variables_ranges] == [('Widget', 'Product'), ('Widget Export', 'Market')]
+    widget, widget_export = mix_variables_ranges
+    assert widget.development_ftes == [3, 5, 8]
+    assert widget.unit_cost_pv == [800, 1000, 1400]
+    assert widget.unit_margin == [0, 0, 0] # labels after the blank row belong to the next product
+    assert widget.consumable_margin == [0.5, 0.6, 0.7]
+    assert widget_export.unit_cost_pv == [900, 1100, 1500]
+    assert widget_export.yearly_unit_sales == [50, 100, 150] # inherited from the product
+
+def test_read_excel_data_uses_the_cache(monkeypatch, tmp_path, workbook_path):
+    monkeypatch.setattr(xh, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    company_constants, mix_variables_ranges = xh.ExcelHelpers().read_excel_data(workbook_path)
+    def parse_excel_data(self, file_path):
+        raise AssertionError('the workbook should come from the cache')
+    monkeypatch.setattr(xh.ExcelHelpers, 'parse_excel_data', parse_excel_data)
+    cached_company_constants, cached_mix_variables_ranges = xh.ExcelHelpers().read_excel_data(workbook_path)
+    assert vars(cached_company_constants) == vars(company_constants)
+    assert [vars(x) for x in cached_mix_variables_ranges] == [vars(x) for x in mix_variables_ranges]
+
+def test_read_excel_data_skips_a_cache_others_can_write(monkeypatch, tmp_path, workbook_path):
+    cache_directory = tmp_path / 'cache'
+    cache_directory.mkdir()
+    cache_directory.chmod(0o777)
+    monkeypatch.setattr(xh, 'CACHE_DIRECTORY', str(cache_directory))
+    xh.ExcelHelpers().read_excel_data(workbook_path)
+    assert list(cache_directory.iterdir()) == []
+
+def test_read_excel_data_can_turn_the_cache_off(monkeypatch, tmp_path, workbook_path):
+    monkeypatch.setattr(xh, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    monkeypatch.setenv(xh.NO_CACHE_VARIABLE, '1')
+    xh.ExcelHelpers().read_excel_data(workbook_path)
+    assert list((tmp_path / 'cache').glob('*.json')) == []
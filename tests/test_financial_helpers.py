@@ -1,5 +1,5 @@
 import pytest
-from financial_helpers import pv, fv, cost_factor
+from financial_helpers import pv, fv, fvpv, fvpv_factors, cost_factor
 
 def test_pv():
     assert pv(1000, 0.05, 10) == pytest.approx(613.91, 0.01)
@@ -14,4 +14,11 @@ def test_fv():
 def test_cost_factor():
     assert cost_factor(0.2) == pytest.approx(1.25, 0.01)
     assert cost_factor(0.3) == pytest.approx(1.4286, 0.01)
-    assert cost_factor(0.1) == pytest.approx(1.1111, 0.01)
\ No newline at end of file
+    assert cost_factor(0.1) == pytest.approx(1.1111, 0.01)
+
+def test_fvpv_factors():
+    factors = fvpv_factors(0.02, 0.05, 30)
+    assert len(factors) >= 30
+    for period in [0, 1, 12, 29]:
+        assert factors[period] == pytest.approx(fvpv(1, 0.02, 0.05, period))
+    assert fvpv_factors(0.02, 0.05, 30) is factors
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from mix_calculator import MixCalculator
+import company_constants as cc
+import mix_variable_snapshot as mvs
+import product_variable_ranges as pvr
+import triangle_sampler as ts
+
+# The month by month search that calculate_years_mix_delay replaced
+def reference_years_mix_delay(maximum_development_ftes, minimum_years_mix_delay, allocated_ftes_by_month, new_ftes_by_month):
+    months_mix_delay = round(minimum_years_mix_delay * 12)
+    maximum_development_ftes = max(maximum_development_ftes, max(new_ftes_by_month))
+    allocated_ftes_by_month = allocated_ftes_by_month + [0] * len(new_ftes_by_month)
+    while(True):
+        overallocated = False
+        for month in range(len(new_ftes_by_month)):
+            if allocated_ftes_by_month[month + months_mix_delay] + new_ftes_by_month[month] > maximum_development_ftes:
+                overallocated = True
+                break
+        if not overallocated:
+            return months_mix_delay / 12
+        months_mix_delay += 1
+
+def test_calculate_years_mix_delay_matches_reference():
+    random = np.random.default_rng(3)
+    for trial in range(200):
+        allocated_ftes_by_month = list(random.uniform(0, 6, random.integers(1, 300)) * (random.uniform(size=1) < 0.9))
+        new_ftes_by_month = list(random.uniform(0, 5, random.integers(1, 60)))
+        minimum_years_mix_delay = random.integers(0, min(24, len(allocated_ftes_by_month)) + 1) / 12
+        maximum_development_ftes = random.uniform(3, 10)
+        expected = reference_years_mix_delay(maximum_development_ftes, minimum_years_mix_delay, list(allocated_ftes_by_month), new_ftes_by_month)
+        assert MixCalculator().calculate_years_mix_delay(maximum_development_ftes, minimum_years_mix_delay, np.array(allocated_ftes_by_month), new_ftes_by_month) == expected
+        assert MixCalculator().calculate_years_mix_delay(maximum_development_ftes, minimum_years_mix_delay, allocated_ftes_by_month, new_ftes_by_month) == expected
+
+def test_calculate_years_mix_delay_leaves_the_allocation():
+    allocated_ftes_by_month = [4, 4, 4]
+    assert MixCalculator().calculate_years_mix_delay(6, 0, allocated_ftes_by_month, [3, 3]) == pytest.approx(3 / 12)
+    assert allocated_ftes_by_month == [4, 4, 4]
+
+def test_calculate_years_mix_delays_matches_scalar():
+    random = np.random.default_rng(4)
+    simulations = 100
+    allocated_ftes_by_month = random.uniform(0, 6, (simulations, 200)) * (random.uniform(size=(simulations, 200)) < 0.9)
+    allocated_ftes_by_month[:, 150:] = 0
+    new_ftes_by_month = [list(np.round(random.uniform(0, 5, random.integers(1, 60)))) for simulation in range(simulations)]
+    minimum_years_mix_delays = random.integers(0, 24, simulations) / 12
+    actual = MixCalculator().calculate_years_mix_delays(4.5, minimum_years_mix_delays, allocated_ftes_by_month, new_ftes_by_month)
+    for simulation in range(simulations):
+        expected = reference_years_mix_delay(4.5, minimum_years_mix_delays[simulation], list(allocated_ftes_by_month[simulation]), new_ftes_by_month[simulation])
+        assert actual[simulation] == expected
+
+def test_calculate_mix_npv_batch_matches_scalar():
+    mix_variables_ranges = [
+        pvr.ProductVariablesRanges(type="Product", years_of_development_growth=[0.5, 1, 1.5], years_of_development_maturity=[0.5, 1, 1.5], development_ftes=[3, 5, 8], years_of_pilot=[0, 0.5, 1],
+                                   years_of_sales_maturity=[1, 2, 3], unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[50, 100, 150]),
+        pvr.ProductVariablesRanges(type="Market", years_of_sales_maturity=[1, 2, 3], unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[20, 30, 40]),
+        pvr.ProductVariablesRanges(type="Product", years_of_development_maturity=[0.5, 1, 2], development_ftes=[2, 4, 6], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[500, 600, 700], unit_margin=[0.3, 0.4, 0.5], yearly_unit_sales=[100, 200, 300])]
+    company_constants = cc.CompanyConstants(market_return=0.05, maximum_development_ftes=8)
+    mix_samples = ts.TriangleSampler(5).sample_mix(mix_variables_ranges, 40)
+    snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(40)]
+    batch = MixCalculator().calculate_mix_npv_batch(snapshots, company_constants)
+    for i in range(40):
+        expected = MixCalculator().calculate_mix_npv(mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i), company_constants)
+        assert [s.years_mix_delay for s in snapshots[i].mix_variables_snapshots] == [s.years_mix_delay for s in expected_snapshots(mix_variables_ranges, mix_samples, i, company_constants)]
+        assert batch.net()[i] == pytest.approx(expected.net())
+        assert batch.result(i).cumulative_net_by_month == pytest.approx(expected.cumulative_net_by_month)
+
+def expected_snapshots(mix_variables_ranges, mix_samples, simulation, company_constants):
+    mix_variables_snapshot = mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = simulation)
+    MixCalculator().calculate_mix_npv(mix_variables_snapshot, company_constants)
+    return mix_variables_snapshot.mix_variables_snapshots
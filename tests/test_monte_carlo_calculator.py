@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+import monte_carlo_calculator as mcc
+import company_constants as cc
+import product_variable_ranges as pvr
+import simulation_settings as ss
+
+@pytest.fixture
+def mix_variables_ranges():
+    return [
+        pvr.ProductVariablesRanges(type="Product", years_of_development_maturity=[0.5, 1, 1.5], development_ftes=[3, 5, 8], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[50, 100, 150]),
+        pvr.ProductVariablesRanges(type="Product", years_of_development_maturity=[0.5, 1, 2], development_ftes=[2, 4, 6], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[500, 600, 700], unit_margin=[0.3, 0.4, 0.5], yearly_unit_sales=[100, 200, 300])]
+
+def calculate(mix_variables_ranges, workers, seed = 7):
+    simulation_settings = ss.SimulationSettings(simulations=50, tornado_simulations=10, seed=seed, workers=workers, tornado_mode='random')
+    return mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, simulation_settings)
+
+def test_results_do_not_depend_on_workers(monkeypatch, mix_variables_ranges):
+    monkeypatch.setattr(mcc, 'CHUNK_SIMULATIONS', 15)
+    serial = calculate(mix_variables_ranges, 1)
+    parallel = calculate(mix_variables_ranges, 3)
+    assert serial.simulation_tracker.simulations == 50
+    assert serial.simulation_tracker.npvs_millions == parallel.simulation_tracker.npvs_millions
+    assert serial.simulation_tracker.years_to_break_even == parallel.simulation_tracker.years_to_break_even
+    assert serial.simulation_tracker.ftes_by_month == parallel.simulation_tracker.ftes_by_month
+    assert [(x.name, x.min_value, x.max_value) for x in serial.tornado_trackers] == [(x.name, x.min_value, x.max_value) for x in parallel.tornado_trackers]
+
+def test_seed_makes_runs_reproducible(mix_variables_ranges):
+    assert calculate(mix_variables_ranges, 1).simulation_tracker.npvs_millions == calculate(mix_variables_ranges, 1).simulation_tracker.npvs_millions
+    assert calculate(mix_variables_ranges, 1).simulation_tracker.npvs_millions != calculate(mix_variables_ranges, 1, 8).simulation_tracker.npvs_millions
+
+def test_streaming_matches_lists(mix_variables_ranges):
+    simulation_settings = ss.SimulationSettings(simulations=200, tornado_simulations=2, seed=3, streaming=True)
+    streaming = mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, simulation_settings).simulation_tracker
+    simulation_settings.streaming = False
+    lists = mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, simulation_settings).simulation_tracker
+    assert streaming.npvs_millions.mean() == pytest.approx(sum(lists.npvs_millions) / 200)
+    assert streaming.years_to_break_even.mean() == pytest.approx(sum(lists.years_to_break_even) / 200)
+    assert streaming.ros.max() == max(lists.ros)
+    assert streaming.ftes_by_month == lists.ftes_by_month
+
+def test_tolerance_stops_when_precise(monkeypatch, mix_variables_ranges):
+    monkeypatch.setattr(mcc, 'CHUNK_SIMULATIONS', 20)
+    def calculate_adaptive(tolerance, workers):
+        simulation_settings = ss.SimulationSettings(simulations=40, tornado_simulations=2, seed=5, workers=workers, tolerance=tolerance, maximum_simulations=400)
+        return mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, simulation_settings)
+    loose = calculate_adaptive(1000, 1)
+    assert loose.simulations == 40 and loose.converged
+    capped = calculate_adaptive(1e-9, 1)
+    assert capped.simulations == 400 and not capped.converged
+    middle = max(calculate_adaptive(None, 1).precision.values()) / 2
+    serial = calculate_adaptive(middle, 1)
+    parallel = calculate_adaptive(middle, 3)
+    assert 40 < serial.simulations < 400 and serial.converged
+    assert max(serial.precision.values()) <= middle
+    assert serial.simulation_tracker.npvs_millions == parallel.simulation_tracker.npvs_millions
+
+@pytest.mark.parametrize('sampling', ['latin_hypercube', 'sobol'])
+def test_sampling_designs_do_not_depend_on_workers(monkeypatch, mix_variables_ranges, sampling):
+    monkeypatch.setattr(mcc, 'CHUNK_SIMULATIONS', 15)
+    def calculate_design(workers):
+        simulation_settings = ss.SimulationSettings(simulations=50, seed=7, workers=workers, sampling=sampling)
+        return mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, simulation_settings).simulation_tracker
+    serial = calculate_design(1)
+    assert serial.npvs_millions == calculate_design(3).npvs_millions
+    assert serial.npvs_millions != calculate(mix_variables_ranges, 1).simulation_tracker.npvs_millions
+
+def test_monthly_percentiles_match_the_simulations(monkeypatch, mix_variables_ranges):
+    monkeypatch.setattr(mcc, 'CHUNK_SIMULATIONS', 30)
+    simulation_settings = ss.SimulationSettings(simulations=100, tornado_simulations=2, seed=3, workers=2, keep_monthly_series=True, monthly_percentiles=True)
+    simulation_tracker = mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, simulation_settings).simulation_tracker
+    sketch = simulation_tracker.ftes_by_month_sketch
+    assert len(sketch) == len(simulation_tracker.ftes_by_month)
+    assert all(sketch.quantiles(0.1) <= sketch.quantiles(0.9))
+    assert sketch.ended.sum() == 100
+    final_nets = [series[-1] for series in simulation_tracker.cumulative_net_by_simulation_month]
+    assert simulation_tracker.cumulative_net_by_month_sketch.quantiles(0.5)[-1] == pytest.approx(np.quantile(final_nets, 0.5, method='lower'), rel=0.03)
+
+@pytest.mark.parametrize('setting', [{'sampling': 'latin-hypercube'}, {'tornado_mode': 'determinstic'}])
+def test_unknown_modes_are_rejected(mix_variables_ranges, setting):
+    with pytest.raises(ValueError):
+        mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(), mix_variables_ranges, ss.SimulationSettings(simulations=10, **setting))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from npv_batch_calculator import NpvBatchCalculator
+from npv_calculator import NpvCalculator
+import company_constants as cc
+import product_variable_ranges as pvr
+import product_variables_snapshot as pvs
+
+@pytest.fixture
+def company_constants():
+    return cc.CompanyConstants(market_return=0.08, yearly_development_fte_cost_pv=150000, development_cost_trend=0.03, product_cost_trend=0.02, product_price_trend=0.025)
+
+@pytest.fixture
+def product_variables_ranges():
+    return pvr.ProductVariablesRanges(
+        years_of_development_growth=[0.5, 1, 1.5],
+        years_of_development_maturity=[1, 2, 3],
+        years_of_development_decline=[0.25, 0.5, 1],
+        years_of_pilot=[0, 0.5, 1],
+        years_of_sales_growth=[0.5, 1, 2],
+        years_of_sales_maturity=[2, 4, 6],
+        years_of_sales_decline=[1, 2, 3],
+        development_ftes=[3, 5, 8],
+        maintenance_ftes=[0.5, 1, 2],
+        years_of_maintenance=[1, 2, 3],
+        unit_cost_pv=[8000, 10000, 14000],
+        unit_margin=[0.4, 0.5, 0.6],
+        sga_factor=[0.1, 0.15, 0.2],
+        yearly_unit_sales=[50, 100, 150],
+        yearly_unit_consumable_sales=[1000, 2000, 3000],
+        years_of_consumable_sales=[3, 5, 7],
+        consumable_margin=[0.5, 0.6, 0.7])
+
+def test_calculate_product_npv_matches_scalar(company_constants, product_variables_ranges):
+    np.random.seed(1)
+    snapshots = [pvs.ProductVariablesSnapshot(product_variables_ranges) for i in range(50)]
+    for i, snapshot in enumerate(snapshots):
+        snapshot.years_mix_delay = (i % 7) / 12
+
+    batch = NpvBatchCalculator().calculate_product_npv(snapshots, company_constants)
+
+    for i, snapshot in enumerate(snapshots):
+        expected = NpvCalculator().calculate_product_npv(snapshot, company_constants)
+        actual = batch.result(i)
+        assert actual.development_cost == pytest.approx(expected.development_cost)
+        assert actual.sales == pytest.approx(expected.sales)
+        assert actual.consumable_sales == pytest.approx(expected.consumable_sales)
+        assert actual.cost_of_goods == pytest.approx(expected.cost_of_goods)
+        assert actual.sga == pytest.approx(expected.sga)
+        assert actual.unit_sales == pytest.approx(expected.unit_sales)
+        assert actual.ftes_by_month == pytest.approx(expected.ftes_by_month)
+        assert actual.sales_by_month == pytest.approx(expected.sales_by_month)
+        assert actual.consumable_sales_by_month == pytest.approx(expected.consumable_sales_by_month)
+        assert actual.cumulative_net_by_month == pytest.approx(expected.cumulative_net_by_month)
+
+def test_add_pads_months(company_constants, product_variables_ranges):
+    np.random.seed(2)
+    first = NpvBatchCalculator().calculate_product_npv([pvs.ProductVariablesSnapshot(product_variables_ranges) for i in range(3)], company_constants)
+    second = NpvBatchCalculator().calculate_product_npv([pvs.ProductVariablesSnapshot(product_variables_ranges) for i in range(3)], company_constants)
+    net = first.net() + second.net()
+    width = max(first.ftes_by_month.shape[1], second.ftes_by_month.shape[1])
+    first.add(second)
+    assert first.net() == pytest.approx(net)
+    assert first.ftes_by_month.shape == (3, width)
@@ -2,12 +2,15 @@ import pytest
 from npv_calculator import NpvCalculator
 import financial_helpers as fh
 import npv_calculation_result as ncr
+import company_constants as cc
+import product_variable_ranges as pvr
+import product_variables_snapshot as pvs
 
 class MockProductVariablesSnapshot:
     def total_years(self): return 1
     years_mix_delay = 0.5
-    def development_ftes_this_mix_month(self): return 1
-    def unit_sales_this_mix_month(self): return 10
+    def development_ftes_this_mix_month(self, month): return 1
+    def unit_sales_this_mix_month(self, month): return 10
     years_of_consumable_sales = 1
     unit_cost_pv = 100
     unit_price_pv = 150
@@ -46,4 +49,12 @@ def test_calculate_product_npv(npv_calculator, product_variables_snapshot, compa
     assert len(result.ftes_by_month) > 0
     assert len(result.sales_by_month) > 0
     assert len(result.consumable_sales_by_month) > 0
-    assert len(result.cumulative_net_by_month) > 0
\ No newline at end of file
+    assert len(result.cumulative_net_by_month) > 0
+
+def test_consumables_cover_the_preceding_window():
+    values = {name: 0 for name, tornado in pvs.VARIABLES}
+    values.update(years_of_sales_maturity = 1, yearly_unit_sales = 12, yearly_unit_consumable_sales = 12, years_of_consumable_sales = 0.5)
+    snapshot = pvs.ProductVariablesSnapshot(pvr.ProductVariablesRanges(), values = values)
+    result = NpvCalculator().calculate_product_npv(snapshot, cc.CompanyConstants())
+    assert result.unit_sales == pytest.approx(12)
+    assert result.consumable_sales_by_month[1:19] == pytest.approx([1, 2, 3, 4, 5, 6, 6, 6, 6, 6, 6, 6, 5, 4, 3, 2, 1, 0])
@@ -0,0 +1,51 @@
+import copy
+import numpy as np
+import pytest
+import portfolio_optimizer as po
+import company_constants as cc
+import product_variable_ranges as pvr
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+
+@pytest.fixture
+def mix_variables_ranges():
+    return [
+        pvr.ProductVariablesRanges(name="Loss", type="Product", years_of_development_maturity=[1, 2, 3], development_ftes=[4, 5, 6], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[100, 120, 140], unit_margin=[0.1, 0.2, 0.3], yearly_unit_sales=[5, 10, 15]),
+        pvr.ProductVariablesRanges(name="A", type="Product", years_of_development_maturity=[0.5, 1, 1.5], development_ftes=[3, 5, 8], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[50, 100, 150]),
+        pvr.ProductVariablesRanges(name="A market", type="Market", years_of_sales_maturity=[1, 2, 3], unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[20, 40, 60]),
+        pvr.ProductVariablesRanges(name="B", type="Product", years_of_development_maturity=[0.5, 1, 2], development_ftes=[2, 4, 6], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[500, 600, 700], unit_margin=[0.3, 0.4, 0.5], yearly_unit_sales=[100, 200, 300])]
+
+def test_markets_move_with_their_product(mix_variables_ranges):
+    assert po.groups(mix_variables_ranges) == [[0], [1, 2], [3]]
+
+def test_evaluate_matches_the_mix_calculator(mix_variables_ranges):
+    company_constants = cc.CompanyConstants(maximum_development_ftes=8)
+    portfolio_optimizer = po.PortfolioOptimizer(company_constants, mix_variables_ranges, 100, seed=1)
+    for order in [[0, 1, 2], [2, 1, 0], [1, 2], [1, 0, 2]]:
+        candidate = portfolio_optimizer.evaluate(order)
+        products = [portfolio_optimizer.products[product] for group in order for product in portfolio_optimizer.groups[group]]
+        mix_variables_snapshots = []
+        for i in range(100):
+            mix_variables_snapshot = mvs.MixVariablesSnapshot([])
+            mix_variables_snapshot.mix_variables_snapshots = [copy.copy(product.scenario_product.product_variables_snapshots[i]) for product in products]
+            mix_variables_snapshots.append(mix_variables_snapshot)
+        npvs_millions = mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants).net() / 1000000
+        assert candidate.npvs_millions == pytest.approx(npvs_millions, abs=1e-9)
+
+def test_shared_prefixes_are_not_scheduled_again(mix_variables_ranges):
+    portfolio_optimizer = po.PortfolioOptimizer(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, 50, seed=1)
+    portfolio_optimizer.evaluate([1, 2, 0])
+    portfolio_optimizer.evaluate([1, 2, 0])
+    portfolio_optimizer.evaluate([1, 0, 2])
+    assert portfolio_optimizer.scheduled_products == 4 + 0 + 2 # the second reuses everything, the third the product and market of group 1
+
+def test_optimize_drops_the_losing_product(mix_variables_ranges):
+    portfolio_optimizer = po.PortfolioOptimizer(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, 100, seed=1, objective=10)
+    baseline = portfolio_optimizer.evaluate([0, 1, 2])
+    best = portfolio_optimizer.optimize()
+    assert 0 not in best.order and best.score > baseline.score
+    assert best.score == pytest.approx(np.percentile(best.npvs_millions, 10))
+    assert [product_variables_ranges.name for product_variables_ranges in portfolio_optimizer.mix_variables_ranges_of(best)] in (["A", "A market", "B"], ["B", "A", "A market"])
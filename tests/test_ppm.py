@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+import subprocess
+
+# The wall time allowed for a small run that prints instead of plotting (including interpreter start-up), in seconds
+STARTUP_BUDGET_SECONDS = 5
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(*arguments):
+    return subprocess.run([sys.executable, *arguments], cwd=REPOSITORY_DIRECTORY, capture_output=True, text=True, check=True)
+
+# The libraries and modules a plain valuation does not need, so it does not import them
+UNUSED_MODULES = ['matplotlib', 'openpyxl', 'results_store', 'scenario_calculator', 'portfolio_optimizer', 'surrogate_model']
+
+def test_no_plot_run_skips_the_plotting_and_workbook_libraries():
+    script = f"import sys, ppm; sys.argv = ['ppm.py', '--no-plot', '--simulations', '10', '--seed', '1']; ppm.main(); print([name for name in {UNUSED_MODULES} if name in sys.modules])"
+    assert run_python('-c', script).stdout.splitlines()[-1] == '[]'
+
+def test_no_plot_run_is_within_the_startup_budget():
+    start = time.perf_counter()
+    output = run_python('ppm.py', '--no-plot', '--simulations', '10', '--seed', '1').stdout
+    assert time.perf_counter() - start < STARTUP_BUDGET_SECONDS
+    assert 'Mean NPV' in output
+
+def test_conflicting_options_are_rejected_before_running():
+    for arguments in [('--antithetic', '--sampling', 'sobol'), ('--control-variates', '--streaming'), ('--streaming', '--save-results', 'results')]:
+        result = subprocess.run([sys.executable, 'ppm.py', '--no-plot', *arguments], cwd=REPOSITORY_DIRECTORY, capture_output=True, text=True)
+        assert result.returncode == 2
+        assert 'Traceback' not in result.stderr
@@ -0,0 +1,20 @@
+import pytest
+import product_variables_snapshot as pvs
+import product_variable_ranges as pvr
+
+def test_profiles():
+    values = {name: 0 for name, tornado in pvs.VARIABLES}
+    values.update(development_ftes = 6, years_of_development_growth = 0.25, years_of_development_maturity = 0.5, years_of_development_decline = 0.25,
+                  maintenance_ftes = 1, years_of_maintenance = 1 / 6, yearly_unit_sales = 120, years_of_sales_growth = 0.25, years_of_sales_maturity = 1 / 6)
+    snapshot = pvs.ProductVariablesSnapshot(pvr.ProductVariablesRanges(), values = values)
+    assert list(snapshot.ftes_by_month) == pytest.approx([0, 2, 4, 6, 6, 6, 6, 6, 6, 6, 4, 2, 1, 1])
+    assert list(snapshot.unit_sales_by_month) == pytest.approx([0, 10 / 3, 20 / 3, 10, 10])
+    assert snapshot.development_ftes_this_mix_month(3) == 6
+    assert snapshot.development_ftes_this_mix_month(14) == 0
+
+def test_empty_profiles_have_one_month():
+    snapshot = pvs.ProductVariablesSnapshot(pvr.ProductVariablesRanges())
+    assert list(snapshot.ftes_by_month) == [0]
+    assert list(snapshot.unit_sales_by_month) == [0]
+    with pytest.raises(AttributeError):
+        snapshot.unknown_variable = 1 # snapshots have a fixed set of attributes
@@ -0,0 +1,69 @@
+import json
+import numpy as np
+import pytest
+import results_store as rs
+import monte_carlo_calculator as mcc
+import company_constants as cc
+import product_variable_ranges as pvr
+import simulation_settings as ss
+
+@pytest.fixture
+def monte_carlo_results():
+    mix_variables_ranges = [pvr.ProductVariablesRanges(type="Product", years_of_development_maturity=[0.5, 1, 1.5], development_ftes=[3, 5, 8], years_of_sales_maturity=[1, 2, 3],
+                                                       unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[50, 100, 150])]
+    simulation_settings = ss.SimulationSettings(simulations=40, seed=1, sobol_simulations=10, keep_monthly_series=True)
+    return mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(), mix_variables_ranges, simulation_settings)
+
+def test_save_and_load(tmp_path, monte_carlo_results):
+    rs.ResultsStore().save(monte_carlo_results, tmp_path)
+    loaded = rs.ResultsStore().load(tmp_path)
+    simulation_tracker = monte_carlo_results.simulation_tracker
+    loaded_tracker = loaded.simulation_tracker
+    assert isinstance(loaded_tracker.npvs_millions, np.memmap)
+    assert loaded_tracker.simulations == 40
+    for name in rs.METRICS + rs.MONTHLY_SERIES:
+        assert list(getattr(loaded_tracker, name)) == list(getattr(simulation_tracker, name))
+    assert loaded_tracker.cumulative_net_by_simulation_month.shape[0] == 40
+    for simulation in [0, 39]:
+        series = simulation_tracker.cumulative_net_by_simulation_month[simulation]
+        assert list(loaded_tracker.cumulative_net_by_simulation_month[simulation, :len(series)]) == list(series)
+    assert [(x.tornado, x.name, x.min_value, x.max_value) for x in loaded.tornado_trackers] == [(x.tornado, x.name, x.min_value, x.max_value) for x in monte_carlo_results.tornado_trackers]
+    assert [vars(x) for x in loaded.sobol_indices] == [vars(x) for x in monte_carlo_results.sobol_indices]
+    assert loaded.precision == monte_carlo_results.precision
+
+def test_save_and_load_monthly_percentiles(tmp_path):
+    simulation_settings = ss.SimulationSettings(simulations=30, seed=2, monthly_percentiles=True)
+    monte_carlo_results = mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(), [pvr.ProductVariablesRanges()], simulation_settings)
+    rs.ResultsStore().save(monte_carlo_results, tmp_path)
+    loaded_tracker = rs.ResultsStore().load(tmp_path).simulation_tracker
+    assert loaded_tracker.monthly_percentiles
+    for name in rs.MONTHLY_SKETCHES:
+        for fraction in [0.1, 0.5, 0.9]:
+            assert list(getattr(loaded_tracker, name).quantiles(fraction)) == list(getattr(monte_carlo_results.simulation_tracker, name).quantiles(fraction))
+
+def test_save_and_load_variance_reduced_estimates(tmp_path):
+    simulation_settings = ss.SimulationSettings(simulations=40, seed=3, control_variates=True)
+    monte_carlo_results = mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(), [pvr.ProductVariablesRanges()], simulation_settings)
+    monte_carlo_results.resolution_limited = ['P10']
+    rs.ResultsStore().save(monte_carlo_results, tmp_path)
+    loaded = rs.ResultsStore().load(tmp_path)
+    assert loaded.npv_estimates == monte_carlo_results.npv_estimates and 'Mean' in loaded.npv_estimates
+    assert loaded.effective_simulations == monte_carlo_results.effective_simulations
+    assert loaded.resolution_limited == ['P10']
+
+def test_load_version_1_results(tmp_path, monte_carlo_results):
+    rs.ResultsStore().save(monte_carlo_results, tmp_path)
+    with open(tmp_path / rs.METADATA_FILE_NAME) as file:
+        metadata = json.load(file)
+    for name in ['monthly_percentiles', 'resolution_limited', 'npv_estimates', 'effective_simulations']:
+        del metadata[name]
+    metadata['version'] = 1
+    with open(tmp_path / rs.METADATA_FILE_NAME, 'w') as file:
+        json.dump(metadata, file)
+    loaded = rs.ResultsStore().load(tmp_path)
+    assert loaded.simulations == 40 and loaded.npv_estimates == {} and loaded.resolution_limited == [] and not loaded.simulation_tracker.monthly_percentiles
+
+def test_streaming_results_cannot_be_saved(tmp_path):
+    monte_carlo_results = mcc.MonteCarloCalculator().calculate(cc.CompanyConstants(), [pvr.ProductVariablesRanges()], ss.SimulationSettings(simulations=5, streaming=True))
+    with pytest.raises(ValueError):
+        rs.ResultsStore().save(monte_carlo_results, tmp_path)
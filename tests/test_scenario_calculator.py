@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import copy
+import scenario_calculator as sc
+import company_constants as cc
+import product_variable_ranges as pvr
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+import triangle_sampler as ts
+
+@pytest.fixture
+def mix_variables_ranges():
+    return [
+        pvr.ProductVariablesRanges(name="A", type="Product", years_of_development_maturity=[0.5, 1, 1.5], development_ftes=[3, 5, 8], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[800, 1000, 1400], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[50, 100, 150]),
+        pvr.ProductVariablesRanges(name="B", type="Product", years_of_development_maturity=[0.5, 1, 2], development_ftes=[2, 4, 6], years_of_sales_maturity=[1, 2, 3],
+                                   unit_cost_pv=[500, 600, 700], unit_margin=[0.3, 0.4, 0.5], yearly_unit_sales=[100, 200, 300]),
+        pvr.ProductVariablesRanges(name="C", type="Product", years_of_development_maturity=[1, 1.5, 2], development_ftes=[1, 2, 3], years_of_sales_maturity=[2, 3, 4],
+                                   unit_cost_pv=[200, 300, 400], unit_margin=[0.2, 0.3, 0.4], yearly_unit_sales=[200, 300, 400])]
+
+def test_baseline_matches_the_mix_calculator(mix_variables_ranges):
+    company_constants = cc.CompanyConstants(maximum_development_ftes=8)
+    scenario_calculator = sc.ScenarioCalculator(company_constants, mix_variables_ranges, 100, seed=1)
+    mix_samples = [ts.uniform_variables(product_variables_ranges, uniforms) for product_variables_ranges, uniforms in zip(mix_variables_ranges, scenario_calculator.uniforms)]
+    mix_variables_snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(100)]
+    npvs_millions = mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants).net() / 1000000
+    assert np.array_equal(scenario_calculator.npvs_millions, npvs_millions)
+
+def test_unchanged_scenario_reuses_everything(mix_variables_ranges):
+    scenario_calculator = sc.ScenarioCalculator(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, 100, seed=1)
+    scenario_result = scenario_calculator.evaluate(copy.deepcopy(mix_variables_ranges))
+    assert scenario_result.recomputed_simulations == [0, 0, 0]
+    assert np.all(scenario_result.differences_millions() == 0)
+
+def test_edit_matches_a_full_recompute(mix_variables_ranges):
+    company_constants = cc.CompanyConstants(maximum_development_ftes=8)
+    scenario_calculator = sc.ScenarioCalculator(company_constants, mix_variables_ranges, 200, seed=1)
+    edited = copy.deepcopy(mix_variables_ranges)
+    edited[1].development_ftes = [3, 5, 7]
+    scenario_result = scenario_calculator.evaluate(edited)
+    assert np.array_equal(scenario_result.scenario_npvs_millions, sc.ScenarioCalculator(company_constants, edited, 200, seed=1).npvs_millions)
+    assert scenario_result.recomputed_simulations[0] == 0 and scenario_result.recomputed_simulations[1] == 200
+    assert 0 < scenario_result.recomputed_simulations[2] < 200 # only the simulations whose delay shifts
+    assert scenario_result.mean_difference() < 0 # more development cost, later sales
+    assert scenario_result.standard_error() < np.std(scenario_result.scenario_npvs_millions) / np.sqrt(200)
+
+    # the baseline is left as it was
+    assert np.array_equal(scenario_calculator.evaluate(mix_variables_ranges).differences_millions(), np.zeros(200))
+
+def test_scenario_keeps_the_products(mix_variables_ranges):
+    scenario_calculator = sc.ScenarioCalculator(cc.CompanyConstants(maximum_development_ftes=8), mix_variables_ranges, 10, seed=1)
+    with pytest.raises(ValueError):
+        scenario_calculator.evaluate(mix_variables_ranges[:2])
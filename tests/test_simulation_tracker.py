@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import simulation_tracker as st
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+import triangle_sampler as ts
+from benchmarks import synthetic_portfolio as sp
+
+@pytest.fixture
+def mix_result():
+    mix_variables_ranges = sp.synthetic_mix(5)
+    mix_samples = ts.TriangleSampler(1).sample_mix(mix_variables_ranges, 200)
+    mix_variables_snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(200)]
+    return mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, sp.synthetic_company_constants(30))
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_add_batch_matches_adding_each_simulation(mix_result, streaming):
+    one_by_one = st.SimulationTracker(streaming, keep_monthly_series = True)
+    for simulation in range(mix_result.simulations()):
+        one_by_one.add(mix_result.result(simulation))
+    batch = st.SimulationTracker(streaming, keep_monthly_series = True)
+    batch.add_batch(mix_result)
+    assert batch.simulations == one_by_one.simulations == 200
+    for name in ['npvs_millions', 'development_costs_millions', 'sales_millions', 'ros', 'roi', 'years_to_break_even', 'years_to_achieve_10pct_ros']:
+        if streaming:
+            assert getattr(batch, name).mean() == pytest.approx(getattr(one_by_one, name).mean())
+            assert len(getattr(batch, name)) == len(getattr(one_by_one, name))
+        else:
+            assert getattr(batch, name) == pytest.approx(getattr(one_by_one, name))
+    assert batch.sales_by_month == pytest.approx(one_by_one.sales_by_month)
+    assert np.concatenate(batch.cumulative_net_by_simulation_month) == pytest.approx(np.concatenate(one_by_one.cumulative_net_by_simulation_month))
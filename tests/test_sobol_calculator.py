@@ -0,0 +1,29 @@
+import pytest
+import sobol_calculator as sc
+import company_constants as cc
+import product_variable_ranges as pvr
+
+def product(**ranges):
+    fixed = dict(type="Product", years_of_development_maturity=1, development_ftes=4, years_of_sales_maturity=3, unit_cost_pv=1000, unit_margin=0.5, yearly_unit_sales=100)
+    return pvr.ProductVariablesRanges(**{**fixed, **ranges})
+
+def test_a_single_variable_explains_all_the_variance():
+    sobol_indices = sc.SobolCalculator().calculate(cc.CompanyConstants(), [product(sga_factor=[0.1, 0.2, 0.4])], 200, 1)
+    assert [sobol_index.name for sobol_index in sobol_indices] == ['Sga factor']
+    assert sobol_indices[0].first_order == pytest.approx(1, abs=0.05)
+    assert sobol_indices[0].total_order == pytest.approx(1, abs=0.05)
+
+def test_indices_rank_the_variables():
+    mix_variables_ranges = [product(yearly_unit_consumable_sales=[0, 1, 2], consumable_margin=0.5, years_of_consumable_sales=2),
+                            product(unit_margin=[0.3, 0.5, 0.6], yearly_unit_sales=[50, 100, 200])]
+    sobol_indices = sc.SobolCalculator().calculate(cc.CompanyConstants(), mix_variables_ranges, 1000, 2)
+    indices = {sobol_index.name: sobol_index for sobol_index in sobol_indices}
+    assert list(indices) == ['Unit margin', 'Yearly unit sales', 'Yearly unit consumable sales']
+    assert indices['Yearly unit consumable sales'].total_order < 0.05
+    # margin and sales multiply, so part of their variance comes from their interaction
+    for name in ['Unit margin', 'Yearly unit sales']:
+        assert 0.2 < indices[name].first_order < indices[name].total_order
+    assert sum(sobol_index.first_order for sobol_index in sobol_indices) < 1.05
+
+def test_fixed_mix_has_no_indices():
+    assert sc.SobolCalculator().calculate(cc.CompanyConstants(), [product()], 100, 1) == []
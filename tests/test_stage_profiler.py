@@ -0,0 +1,40 @@
+import tracemalloc
+import stage_profiler as sp
+
+def test_disabled_stages_do_nothing():
+    assert sp.PROFILER is None
+    assert sp.stage('anything') is sp.NULL_STAGE
+
+def test_nested_stages():
+    kept_by_outer = []
+    profiler = sp.enable()
+    try:
+        for i in range(3):
+            with sp.stage('outer'):
+                with sp.stage('inner'):
+                    kept = bytearray(1000000)
+                    del kept
+                kept_by_outer.append(bytearray(100000))
+    finally:
+        assert sp.disable() is profiler
+    report = profiler.report()
+    assert report['stages']['outer']['calls'] == 3
+    assert report['stages']['inner']['calls'] == 3
+    assert report['stages']['outer']['seconds'] >= report['stages']['inner']['seconds']
+    assert 1000000 <= report['stages']['inner']['peak_bytes'] < 1100000
+    assert report['stages']['inner']['allocated_bytes'] < 10000
+    assert report['stages']['outer']['peak_bytes'] >= 1000000 # the peak of the inner stage counts toward the outer stage
+    assert report['stages']['outer']['allocated_bytes'] >= 300000
+    assert sp.stage('outer') is sp.NULL_STAGE
+
+def test_tracing_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    try:
+        sp.enable()
+        sp.disable()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    sp.enable()
+    sp.disable()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from streaming_statistic import StreamingStatistic, MonthlyQuantileSketch
+import convergence_checker as cvc
+import simulation_tracker as st
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).normal(5, 20, 5000)
+
+def test_moments_and_quantiles(values):
+    streaming_statistic = StreamingStatistic()
+    streaming_statistic.extend(values)
+    assert len(streaming_statistic) == 5000
+    assert streaming_statistic.mean() == pytest.approx(values.mean())
+    assert streaming_statistic.variance() == pytest.approx(values.var(ddof=1))
+    assert streaming_statistic.min() == values.min()
+    assert streaming_statistic.max() == values.max()
+    for fraction in [0.1, 0.5, 0.9]:
+        assert streaming_statistic.quantile(fraction) == pytest.approx(np.quantile(values, fraction), rel=0.03)
+    values_by_bin, counts = streaming_statistic.histogram()
+    assert counts.sum() == 5000
+
+def test_merge_matches_single_stream(values):
+    whole = StreamingStatistic()
+    whole.extend(values)
+    first = StreamingStatistic()
+    first.extend(values[:1234])
+    second = StreamingStatistic()
+    second.extend(values[1234:])
+    first.merge(second)
+    assert first.mean() == pytest.approx(whole.mean())
+    assert first.variance() == pytest.approx(whole.variance())
+    assert np.array_equal(first.quantile_sketch.positive_counts, whole.quantile_sketch.positive_counts)
+    assert first.quantile(0.25) == whole.quantile(0.25)
+
+def test_fill_missing():
+    streaming_statistic = StreamingStatistic(missing = -1)
+    streaming_statistic.extend([1, 2, -1, 3, -1])
+    assert streaming_statistic.mean() == pytest.approx(2)
+    streaming_statistic.fill_missing(4)
+    assert len(streaming_statistic) == 5
+    assert streaming_statistic.mean() == pytest.approx(14 / 5)
+    assert streaming_statistic.max() == 4
+
+@pytest.mark.parametrize('carry_last', [False, True])
+def test_monthly_quantiles_pad_series_of_different_lengths(carry_last):
+    random_generator = np.random.default_rng(1)
+    serieses = [random_generator.normal(100, 30, random_generator.integers(5, 40)) for simulation in range(2000)]
+    first = MonthlyQuantileSketch(carry_last)
+    second = MonthlyQuantileSketch(carry_last)
+    for simulation, series in enumerate(serieses):
+        (first if simulation % 2 == 0 else second).add(series)
+    first.merge(second)
+    months = max(len(series) for series in serieses)
+    padded = np.array([np.concatenate((series, np.full(months - len(series), series[-1] if carry_last else 0))) for series in serieses])
+    assert len(first) == months
+    for fraction in [0.1, 0.5, 0.9]:
+        exact = np.quantile(padded, fraction, axis=0, method='lower')
+        assert first.quantiles(fraction) == pytest.approx(exact, rel=0.03, abs=1)
+
+def test_streaming_percentile_precision_is_floored_at_the_bin_width():
+    values = np.random.default_rng(0).normal(50, 0.5, 5000)
+    exact = st.SimulationTracker()
+    exact.npvs_millions.extend(values.tolist())
+    streaming = st.SimulationTracker(streaming = True)
+    streaming.npvs_millions.extend(values)
+    convergence_checker = cvc.ConvergenceChecker(0.1)
+    assert convergence_checker.converged(exact) and convergence_checker.resolution_limited(exact) == []
+    assert min(convergence_checker.precision(streaming)['P10'], convergence_checker.precision(streaming)['P90']) > 0.5 # about 2% of 50
+    assert not convergence_checker.converged(streaming) and convergence_checker.resolution_limited(streaming) == ['P10', 'P90']
@@ -0,0 +1,42 @@
+import copy
+import numpy as np
+import pytest
+import monte_carlo_calculator as mcc
+import simulation_settings as ss
+import surrogate_model as sm
+from benchmarks import synthetic_portfolio as sp
+
+@pytest.fixture(scope='module')
+def surrogate_model():
+    company_constants = sp.synthetic_company_constants(30)
+    mix_variables_ranges = sp.synthetic_mix(3)
+    simulation_settings = ss.SimulationSettings(simulations=1000, tornado_simulations=2, seed=1, workers=2, keep_samples=True)
+    monte_carlo_results = mcc.MonteCarloCalculator().calculate(company_constants, mix_variables_ranges, simulation_settings)
+    return sm.from_results(company_constants, mix_variables_ranges, monte_carlo_results)
+
+def test_samples_line_up_with_the_npvs(surrogate_model):
+    assert surrogate_model.samples.shape == (1000, len(surrogate_model.randoms))
+    assert surrogate_model.r_squared > 0.95
+    assert surrogate_model.rmse_millions < 0.2 * np.std(surrogate_model.npvs_millions)
+
+def test_what_if_inside_the_ranges_matches_full_simulation(surrogate_model):
+    edited = copy.deepcopy(surrogate_model.mix_variables_ranges)
+    low, likely, high = edited[0].unit_margin
+    edited[0].unit_margin = [low, (likely + high) / 2, high]
+    assert surrogate_model.covers(edited)
+    answer = surrogate_model.what_if(edited)
+    assert answer.recomputed_simulations == [0, 0, 0]
+    full = surrogate_model.simulate(edited)
+    assert answer.mean_difference() > 0
+    assert answer.mean_difference() == pytest.approx(np.mean(full - surrogate_model.npvs_millions), rel=0.1)
+
+def test_what_if_outside_the_ranges_falls_back_to_full_simulation(surrogate_model):
+    edited = copy.deepcopy(surrogate_model.mix_variables_ranges)
+    low, likely, high = edited[0].unit_margin
+    edited[0].unit_margin = [low, likely, high * 1.2]
+    assert not surrogate_model.covers(edited)
+    answer = surrogate_model.what_if(edited)
+    assert answer.recomputed_simulations == [1000, 1000, 1000]
+    assert np.array_equal(answer.scenario_npvs_millions, surrogate_model.simulate(edited))
+    with pytest.raises(ValueError):
+        surrogate_model.what_if(edited[:2])
@@ -0,0 +1,43 @@
+import pytest
+import tornado_calculator as tc
+import tornado_tracker as tt
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+import company_constants as cc
+import product_variable_ranges as pvr
+from tornado_enum import Tornado
+
+@pytest.fixture
+def mix_variables_ranges():
+    return [
+        pvr.ProductVariablesRanges(name="A", type="Product", development_ftes=[3, 5, 8], unit_cost_pv=[800, 1000, 1400], yearly_unit_sales=[50, 100, 150]),
+        pvr.ProductVariablesRanges(name="B", type="Product", development_ftes=[2, 4, 6], unit_cost_pv=[500, 600, 700], yearly_unit_sales=[100, 200, 300])]
+
+# the NPV of the mix with every variable at its likely value, except for the given values
+def npv_millions(mix_variables_ranges, company_constants, values):
+    mix_samples = tc.likely_mix(mix_variables_ranges, 1)
+    for (product, name), value in values.items():
+        mix_samples[product][name][0] = value
+    mix_variables_snapshot = mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples)
+    return mc.MixCalculator().calculate_mix_npv(mix_variables_snapshot, company_constants).net() / 1000000
+
+def test_low_and_high_values(mix_variables_ranges):
+    company_constants = cc.CompanyConstants(maximum_development_ftes=8)
+    tornado_trackers = [tt.TornadoTracker(Tornado.Dev_Ftes, 'Dev FTEs'), tt.TornadoTracker(Tornado.Yearly_Sales, 'Yearly Sales')]
+    product_trackers = tc.TornadoCalculator().calculate(company_constants, mix_variables_ranges, tornado_trackers, per_product = True)
+
+    low = npv_millions(mix_variables_ranges, company_constants, {(0, 'yearly_unit_sales'): 50, (1, 'yearly_unit_sales'): 100})
+    high = npv_millions(mix_variables_ranges, company_constants, {(0, 'yearly_unit_sales'): 150, (1, 'yearly_unit_sales'): 300})
+    assert (tornado_trackers[1].min_value, tornado_trackers[1].max_value) == pytest.approx((low, high))
+
+    assert [tornado_tracker.name for tornado_tracker in product_trackers] == ['A Dev FTEs', 'A Yearly Sales', 'B Dev FTEs', 'B Yearly Sales']
+    low = npv_millions(mix_variables_ranges, company_constants, {(1, 'development_ftes'): 2})
+    high = npv_millions(mix_variables_ranges, company_constants, {(1, 'development_ftes'): 6})
+    assert (product_trackers[2].min_value, product_trackers[2].max_value) == pytest.approx((min(low, high), max(low, high)))
+
+def test_fixed_variables_have_no_range(mix_variables_ranges):
+    tornado_trackers = [tt.TornadoTracker(Tornado.Maint_Ftes, 'Maint FTEs')]
+    mix_variables_ranges[0].maintenance_ftes = 1
+    mix_variables_ranges[1].maintenance_ftes = [2, 1, 3]
+    assert tc.TornadoCalculator().calculate(cc.CompanyConstants(), mix_variables_ranges, tornado_trackers) == []
+    assert tornado_trackers[0].range() == 0
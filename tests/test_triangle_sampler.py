@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from triangle_sampler import TriangleSampler
+import triangle_sampler as ts
+from tornado_enum import Tornado
+import product_variable_ranges as pvr
+
+@pytest.fixture
+def mix_variables_ranges():
+    return [
+        pvr.ProductVariablesRanges(development_ftes=[3, 5, 8], unit_margin=[0.4, 0.5, 0.6], yearly_unit_sales=[50, 100, 150], years_of_pilot=[1, 0.5, 2], sga_factor=0.15),
+        pvr.ProductVariablesRanges(development_ftes=[1, 2, 3], unit_margin=[0.3, 0.35, 0.5])]
+
+def test_sample_mix_is_reproducible(mix_variables_ranges):
+    first = TriangleSampler(42).sample_mix(mix_variables_ranges, 100)
+    second = TriangleSampler(42).sample_mix(mix_variables_ranges, 100)
+    for product in range(len(mix_variables_ranges)):
+        for name in first[product]:
+            assert np.array_equal(first[product][name], second[product][name])
+
+def test_sample_mix_ranges(mix_variables_ranges):
+    mix_samples = TriangleSampler(1).sample_mix(mix_variables_ranges, 1000)
+    assert len(mix_samples[0]['development_ftes']) == 1000
+    assert mix_samples[0]['development_ftes'].min() >= 3
+    assert mix_samples[0]['development_ftes'].max() <= 8
+    assert mix_samples[0]['development_ftes'].std() > 0
+    assert np.all(mix_samples[0]['years_of_pilot'] == 0.5) # invalid range gives the likely value
+    assert np.all(mix_samples[0]['sga_factor'] == 0.15) # single numbers are returned as is
+    assert np.all(mix_samples[1]['years_of_sales_growth'] == 0) # missing ranges are [0, 0, 0]
+
+def test_sample_mix_tornado_pins_other_variables(mix_variables_ranges):
+    mix_samples = TriangleSampler(1).sample_mix(mix_variables_ranges, 1000, Tornado.Margin)
+    assert np.all(mix_samples[0]['development_ftes'] == 5)
+    assert np.all(mix_samples[0]['yearly_unit_sales'] == 100)
+    assert mix_samples[0]['unit_margin'].std() > 0
+    assert mix_samples[1]['unit_margin'].std() > 0
+
+def test_uniform_mix_follows_the_triangle(mix_variables_ranges):
+    mix_samples, randoms = ts.fixed_mix(mix_variables_ranges, 0)
+    uniforms = np.random.default_rng(2).random((20000, len(randoms)))
+    mix_samples = ts.uniform_mix(mix_variables_ranges, uniforms)
+    assert np.all(mix_samples[0]['sga_factor'] == 0.15)
+    development_ftes = mix_samples[0]['development_ftes']
+    assert development_ftes.min() >= 3 and development_ftes.max() <= 8
+    assert development_ftes.mean() == pytest.approx((3 + 5 + 8) / 3, rel=0.01)
+    assert np.mean(development_ftes < 5) == pytest.approx((5 - 3) / (8 - 3), abs=0.01)
+
+@pytest.mark.parametrize('design', ts.DESIGNS)
+def test_design_blocks_make_up_the_design(design):
+    design_uniforms = ts.design_uniforms(design, 3, 5, 0, 100, 100)
+    blocks = np.concatenate([ts.design_uniforms(design, 3, 5, start, simulations, 100) for start, simulations in [(0, 30), (30, 50), (80, 20)]])
+    assert np.array_equal(design_uniforms, blocks)
+    assert design_uniforms.shape == (100, 5) and design_uniforms.min() >= 0 and design_uniforms.max() < 1
+
+def test_latin_hypercube_puts_one_row_in_each_stratum():
+    design_uniforms = ts.design_uniforms('latin_hypercube', 1, 4, 0, 50, 50)
+    for column in range(4):
+        assert np.array_equal(np.sort(np.floor(design_uniforms[:, column] * 50)), np.arange(50))
+
+def test_design_mix_follows_the_ranges(mix_variables_ranges):
+    mix_samples = ts.design_mix(mix_variables_ranges, 'sobol', 1, 0, 256, 256)
+    assert np.all(mix_samples[0]['sga_factor'] == 0.15)
+    assert mix_samples[0]['development_ftes'].mean() == pytest.approx((3 + 5 + 8) / 3, rel=0.002)
+    with pytest.raises(ValueError):
+        ts.design_uniforms('halton', 1, 4, 0, 50, 50)
@@ -0,0 +1,67 @@
+import json
+import asyncio
+import pytest
+import valuation_service as vs
+from benchmarks import synthetic_portfolio as sp
+
+# Settings a request cannot give
+INVALID_SETTINGS = [{'tornado_mode': 'foo'}, {'sampling': 'grid'}, {'simulations': True}, {'simulations': -5}, {'simulations': 2.5}, {'seed': '1'}, {'tolerance': 0}]
+
+@pytest.fixture
+def workbook_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(vs.xh, 'CACHE_DIRECTORY', str(tmp_path / 'cache'))
+    path = tmp_path / 'mix.xlsx'
+    sp.write_workbook(sp.synthetic_company_constants(), sp.synthetic_mix(2), path)
+    return str(path)
+
+def test_identical_requests_are_coalesced_and_cached(workbook_path, monkeypatch):
+    reads = []
+    read_excel_data = vs.xh.ExcelHelpers.read_excel_data
+    monkeypatch.setattr(vs.xh.ExcelHelpers, 'read_excel_data', lambda self, *arguments: reads.append(arguments) or read_excel_data(self, *arguments))
+    async def run():
+        service = vs.ValuationService()
+        try:
+            request = {'workbook': workbook_path, 'simulations': 20, 'seed': 1}
+            first, second = await asyncio.gather(service.value(request), service.value(dict(request)))
+            third = await service.value(dict(request))
+            other = await service.value({'workbook': workbook_path, 'simulations': 20, 'seed': 2})
+            return service, first, second, third, other
+        finally:
+            service.close()
+    service, first, second, third, other = asyncio.run(run())
+    assert first == second == third and first != other
+    assert first['simulations'] == 20 and first['p10_npv_millions'] <= first['p90_npv_millions']
+    assert (service.valuations, service.coalesced, service.cache_hits) == (2, 1, 1)
+    assert service.status()['cached_workbooks'] == 1 and len(reads) == 1
+
+def test_http_requests(workbook_path):
+    async def request(port, method, path, content = None):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = json.dumps(content).encode() if content is not None else b''
+        writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+        await writer.drain()
+        status_line, separator, response = (await reader.read()).partition(b'\r\n')
+        writer.close()
+        return int(status_line.split()[1]), json.loads(response.partition(b'\r\n\r\n')[2])
+
+    async def run():
+        service = vs.ValuationService()
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [await request(port, 'POST', '/valuations', {'workbook': workbook_path, 'simulations': 10, 'seed': 1}),
+                    await request(port, 'POST', '/valuations', {'workbook': workbook_path, 'iterations': 10}),
+                    await request(port, 'POST', '/valuations', {'workbook': workbook_path + '.missing'}),
+                    [await request(port, 'POST', '/valuations', {'workbook': workbook_path + '.missing', **setting}) for setting in INVALID_SETTINGS],
+                    await request(port, 'GET', '/valuations'),
+                    await request(port, 'GET', '/status')]
+        finally:
+            server.close()
+            service.close()
+    valuation, unknown, missing, invalid, wrong_method, status = asyncio.run(run())
+    assert valuation[0] == 200 and valuation[1]['simulations'] == 10 and len(valuation[1]['tornado']) > 0
+    assert unknown[0] == 400 and 'iterations' in unknown[1]['error']
+    assert missing[0] == 404
+    assert [status for status, content in invalid] == [400] * len(INVALID_SETTINGS) # the settings are checked before the workbook is read
+    assert wrong_method[0] == 405
+    assert status == (200, status[1]) and status[1]['valuations'] == 1
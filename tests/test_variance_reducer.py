@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import monte_carlo_calculator as mcc
+import simulation_settings as ss
+import simulation_tracker as st
+import variance_reducer as vr
+from benchmarks import synthetic_portfolio as sp
+
+@pytest.fixture
+def mix_variables_ranges():
+    return sp.synthetic_mix(3)
+
+def test_antithetic_draws_come_in_opposite_pairs(mix_variables_ranges):
+    uniforms = vr.VarianceReducer(mix_variables_ranges, 100, antithetic = True).uniforms(1, 4, 7)
+    assert uniforms.shape == (7, 4)
+    assert uniforms[0:6:2] + uniforms[1:6:2] == pytest.approx(np.ones((3, 4)))
+
+def test_control_variate_weights_match_the_known_means(mix_variables_ranges):
+    variance_reducer = vr.VarianceReducer(mix_variables_ranges, 1000, control_variates = True)
+    random_generator = np.random.default_rng(0)
+    controls = variance_reducer.means + random_generator.normal(0, 1, (1000, len(variance_reducer.means)))
+    npvs_millions = controls @ np.arange(len(variance_reducer.means)) + random_generator.normal(0, 0.1, 1000)
+    simulation_tracker = st.SimulationTracker()
+    simulation_tracker.add_controls(controls, npvs_millions)
+    estimate = variance_reducer.estimate(simulation_tracker, [10, 90])
+    assert estimate.mean() == pytest.approx(variance_reducer.means @ np.arange(len(variance_reducer.means)), abs=0.01)
+    assert estimate.effective_simulations['Mean'] > 100 * 1000
+
+def test_no_reduction_has_the_plain_estimates(mix_variables_ranges):
+    npvs_millions = np.random.default_rng(0).normal(10, 3, 500)
+    simulation_tracker = st.SimulationTracker()
+    simulation_tracker.add_controls(np.zeros((500, 0)), npvs_millions)
+    estimate = vr.VarianceReducer(mix_variables_ranges, 500).estimate(simulation_tracker, [10])
+    assert estimate.mean() == pytest.approx(np.mean(npvs_millions))
+    assert estimate.effective_simulations['Mean'] == pytest.approx(500)
+    assert estimate.quantile(0.1) == pytest.approx(np.quantile(npvs_millions, 0.1), abs=0.1)
+
+def test_variance_reduction_gains_effective_simulations(mix_variables_ranges):
+    simulation_settings = ss.SimulationSettings(simulations=1000, tornado_simulations=2, seed=2, workers=2, antithetic=True, control_variates=True)
+    monte_carlo_results = mcc.MonteCarloCalculator().calculate(sp.synthetic_company_constants(30), mix_variables_ranges, simulation_settings)
+    assert set(monte_carlo_results.npv_estimates) == {'Mean', 'P10', 'P90'}
+    assert monte_carlo_results.effective_simulations['Mean'] > 2 * monte_carlo_results.simulations
+    assert monte_carlo_results.npv_estimates['P10'] < monte_carlo_results.npv_estimates['Mean'] < monte_carlo_results.npv_estimates['P90']
+    simulation_settings.sampling = 'sobol'
+    with pytest.raises(ValueError):
+        mcc.MonteCarloCalculator().calculate(sp.synthetic_company_constants(30), mix_variables_ranges, simulation_settings)
+    simulation_settings.sampling = 'random'
+    simulation_settings.streaming = True
+    with pytest.raises(ValueError):
+        mcc.MonteCarloCalculator().calculate(sp.synthetic_company_constants(30), mix_variables_ranges, simulation_settings)
@@ -0,0 +1,66 @@
+import numpy as np # linear algebra library
+import tornado_tracker as tt
+import mix_calculator as mc
+import mix_variable_snapshot as mvs
+import product_variables_snapshot as pvs
+import triangle_sampler as ts
+
+# A deterministic one-at-a-time sensitivity analysis: each tornado variable is set to its low and then its high value,
+# with every other variable at its likely value, so each tracker sees exactly two NPVs
+class TornadoCalculator:
+
+    # Fill the tornado trackers (one per tornado variable, varied in every product at once)
+    # and, if requested, return extra trackers that vary each variable in one product at a time
+    def calculate(self, company_constants, mix_variables_ranges, tornado_trackers, per_product = False):
+        product_trackers = []
+        if per_product and len(mix_variables_ranges) > 1:
+            for product, product_variables_ranges in enumerate(mix_variables_ranges):
+                for tornado_tracker in tornado_trackers:
+                    product_trackers.append(tt.TornadoTracker(tornado_tracker.tornado, f'{product_variables_ranges.name or product + 1} {tornado_tracker.name}'))
+
+        # one evaluation for the low and one for the high value of every tracker: the varied products, the variable name and the bound
+        evaluations = []
+        for tornado_tracker in tornado_trackers:
+            evaluations.append((range(len(mix_variables_ranges)), variable_name(tornado_tracker.tornado)))
+        for index, tornado_tracker in enumerate(product_trackers):
+            evaluations.append(([index // len(tornado_trackers)], variable_name(tornado_tracker.tornado)))
+
+        # start every evaluation from the likely values, then set the varied variable to its low (even rows) or high (odd rows) value
+        mix_samples = likely_mix(mix_variables_ranges, 2 * len(evaluations))
+        for evaluation, (products, name) in enumerate(evaluations):
+            for product in products:
+                low, high = bounds(getattr(mix_variables_ranges[product], name))
+                mix_samples[product][name][2 * evaluation] = low
+                mix_samples[product][name][2 * evaluation + 1] = high
+
+        # evaluate them all in one batch
+        mix_variables_snapshots = [mvs.MixVariablesSnapshot(mix_variables_ranges, mix_samples = mix_samples, simulation = i) for i in range(2 * len(evaluations))]
+        npvs_millions = mc.MixCalculator().calculate_mix_npv_batch(mix_variables_snapshots, company_constants).net() / 1000000
+        for evaluation, tornado_tracker in enumerate(tornado_trackers + product_trackers):
+            tornado_tracker.add(float(npvs_millions[2 * evaluation]))
+            tornado_tracker.add(float(npvs_millions[2 * evaluation + 1]))
+
+        return product_trackers
+
+# The snapshot variable that a tornado analysis varies
+def variable_name(tornado):
+    return next(name for name, variable_tornado in pvs.VARIABLES if variable_tornado == tornado)
+
+# The likely value of every variable of every product, repeated for each evaluation (in the layout of TriangleSampler.sample_mix)
+def likely_mix(mix_variables_ranges, evaluations):
+    mix_samples = []
+    for product_variables_ranges in mix_variables_ranges:
+        product_samples = {}
+        for name, variable_tornado in pvs.VARIABLES:
+            a = getattr(product_variables_ranges, name)
+            product_samples[name] = np.full(evaluations, float(a if isinstance(a, (int, float)) else a[1]))
+        mix_samples.append(product_samples)
+    return mix_samples
+
+# The low and high value of a range, following the triangle.triangle rules (single numbers and invalid ranges never vary)
+def bounds(a):
+    if isinstance(a, (int, float)):
+        return a, a
+    if not ts.valid(a):
+        return a[1], a[1]
+    return a[0], a[2]
@@ -11,5 +11,10 @@ class TornadoTracker:
         if value > self.max_value:
             self.max_value = value
     
+    # merge the values seen by another tracker of the same variable
+    def merge(self, tornado_tracker):
+        self.min_value = min(self.min_value, tornado_tracker.min_value)
+        self.max_value = max(self.max_value, tornado_tracker.max_value)
+
     def range(self):
         return self.max_value - self.min_value
@@ -0,0 +1,114 @@
+import numpy as np # linear algebra library
+from tornado_enum import Tornado
+import product_variables_snapshot as pvs
+
+# Draw the snapshot variables of every product for every simulation at once, from a seeded random generator
+class TriangleSampler:
+    def __init__(self, seed = None):
+        self.random_generator = np.random.default_rng(seed)
+
+    # Return the variables of each product in the mix, as a list (one entry per product) of dictionaries of arrays (one value per simulation)
+    # Follows the triangle.triangle rules: single numbers and invalid ranges give the likely value, as do variables pinned by a tornado analysis
+    def sample_mix(self, mix_variables_ranges, simulations, tornado = Tornado.OFF):
+        mix_samples, randoms = fixed_mix(mix_variables_ranges, simulations, tornado)
+
+        # draw all the random variables in one pass (one column per variable)
+        if len(randoms) > 0:
+            low, likely, high = np.array([a for product, name, a in randoms], dtype=float).T
+            draws = self.random_generator.triangular(low, likely, high, (simulations, len(randoms)))
+            for column, (product, name, a) in enumerate(randoms):
+                mix_samples[product][name] = draws[:, column]
+
+        return mix_samples
+
+# The sampling designs of the simulations: independent pseudo-random draws, a stratified Latin hypercube, or a scrambled Sobol sequence
+DESIGNS = ['random', 'latin_hypercube', 'sobol']
+
+# Draw the variables of each product from rows start to start + simulations of a design with the given total of rows, in the layout of sample_mix
+# Every block of rows of a design comes from the same seed, so a run can be split into blocks (and across workers) without changing it
+def design_mix(mix_variables_ranges, design, seed, start, simulations, total):
+    randoms = fixed_mix(mix_variables_ranges, 0)[1]
+    return uniform_mix(mix_variables_ranges, design_uniforms(design, seed, len(randoms), start, simulations, total))
+
+# Rows start to start + simulations of a total x dimensions design of uniform numbers (0 to 1)
+def design_uniforms(design, seed, dimensions, start, simulations, total):
+    if design == 'latin_hypercube':
+        # each column puts exactly one row in each of the total equal strata, in a random order, at a random place within the stratum
+        random_generator = np.random.default_rng(seed)
+        strata = random_generator.permuted(np.tile(np.arange(total), (dimensions, 1)), axis=1).T
+        return (strata[start:start + simulations] + random_generator.random((total, dimensions))[start:start + simulations]) / total
+    if design == 'sobol':
+        from scipy.stats import qmc # loaded here so the other designs do not need scipy
+        import warnings
+        engine = qmc.Sobol(max(dimensions, 1), scramble=True, rng=int(np.random.default_rng(seed).integers(2 ** 63))) # an integer, since the engine spawns from a generator's seed
+        if start > 0:
+            engine.fast_forward(start)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning) # blocks of a sequence need not be powers of two
+            return engine.random(simulations)[:, :dimensions]
+    if design == 'random':
+        return np.random.default_rng(seed).random((total, dimensions))[start:start + simulations]
+    raise ValueError(f'unknown sampling design {design} (expected one of {", ".join(DESIGNS)})')
+
+# The variables of each product that do not vary (in the layout of sample_mix), and the (product, name, range) of the ones that do
+def fixed_mix(mix_variables_ranges, simulations, tornado = Tornado.OFF):
+    mix_samples = [{} for product_variables_ranges in mix_variables_ranges]
+    randoms = []
+    for product, product_variables_ranges in enumerate(mix_variables_ranges):
+        for name, variable_tornado in pvs.VARIABLES:
+            a = getattr(product_variables_ranges, name)
+            if isinstance(a, (int, float)):
+                mix_samples[product][name] = np.full(simulations, float(a))
+            elif not valid(a) or pvs.pinned(tornado, variable_tornado):
+                mix_samples[product][name] = np.full(simulations, float(a[1]))
+            else:
+                randoms.append((product, name, a))
+    return mix_samples, randoms
+
+# Map a simulation x variable array of uniform numbers (0 to 1) to the variables of each product, in the layout of sample_mix
+# There is one column for each of the varying variables returned by fixed_mix, in the same order
+def uniform_mix(mix_variables_ranges, uniforms, tornado = Tornado.OFF):
+    mix_samples, randoms = fixed_mix(mix_variables_ranges, len(uniforms), tornado)
+    if len(randoms) > 0:
+        low, likely, high = np.array([a for product, name, a in randoms], dtype=float).T
+        values = triangular_quantile(uniforms, low, likely, high)
+        for column, (product, name, a) in enumerate(randoms):
+            mix_samples[product][name] = values[:, column]
+    return mix_samples
+
+# Map a simulation x variable array of uniform numbers (0 to 1) to the variables of one product, with one column for every variable in
+# product_variables_snapshot.VARIABLES (whether it varies or not), so each variable keeps its column when a range is edited
+def uniform_variables(product_variables_ranges, uniforms):
+    values = {}
+    for column, (name, variable_tornado) in enumerate(pvs.VARIABLES):
+        a = getattr(product_variables_ranges, name)
+        if isinstance(a, (int, float)):
+            values[name] = np.full(len(uniforms), float(a))
+        elif not valid(a):
+            values[name] = np.full(len(uniforms), float(a[1]))
+        else:
+            values[name] = triangular_quantile(uniforms[:, column], *(float(x) for x in a))
+    return values
+
+# The inverse cumulative distribution of the triangular distribution (the value below which the given fraction of draws lie)
+def triangular_quantile(uniforms, low, likely, high):
+    split = (likely - low) / (high - low)
+    rising = low + np.sqrt(uniforms * (high - low) * (likely - low))
+    falling = high - np.sqrt((1 - uniforms) * (high - low) * (high - likely))
+    return np.where(uniforms < split, rising, falling)
+
+# The cumulative distribution of the triangular distribution (the fraction of draws below each value), the inverse of triangular_quantile
+def triangular_cdf(values, low, likely, high):
+    values = np.clip(values, low, high)
+    rising = (values - low) ** 2 / ((high - low) * (likely - low)) if likely > low else np.zeros_like(values)
+    falling = 1 - (high - values) ** 2 / ((high - low) * (high - likely)) if high > likely else np.ones_like(values)
+    return np.where(values < likely, rising, falling)
+
+# The varying variables of the products (the columns of fixed_mix), as a simulation x variable array, from the layout of sample_mix
+def mix_matrix(mix_variables_ranges, mix_samples, simulations):
+    mix_samples_fixed, randoms = fixed_mix(mix_variables_ranges, 0)
+    return np.column_stack([mix_samples[product][name] for product, name, a in randoms]) if len(randoms) > 0 else np.zeros((simulations, 0))
+
+# A range is valid if it is ordered and not empty (see triangle.triangle)
+def valid(a):
+    return not (a[0] > a[1] or a[1] > a[2] or a[0] >= a[2])
@@ -0,0 +1,218 @@
+import os
+import json
+import asyncio
+import multiprocessing
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import monte_carlo_calculator as mcc
+import simulation_settings as ss
+import batch_runner as br
+import excel_helpers as xh
+import triangle_sampler as ts
+
+# The port of the service on localhost, and how many results (and parsed workbooks) it keeps
+DEFAULT_PORT = 8765
+CACHE_RESULTS = 128
+CACHE_WORKBOOKS = 32
+
+# A setting that is a whole number of at least the minimum (JSON true and false are not numbers here)
+def whole_number(minimum):
+    def convert(value):
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+            raise ValueError(f'{value!r} is not a whole number of at least {minimum}')
+        return value
+    return convert
+
+# A setting that is a number greater than zero
+def positive_number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not value > 0:
+        raise ValueError(f'{value!r} is not a number greater than zero')
+    return float(value)
+
+# A setting that is one of the given names
+def one_of(names):
+    def convert(value):
+        if value not in names:
+            raise ValueError(f'{value!r} is not one of {", ".join(names)}')
+        return value
+    return convert
+
+# The simulation settings a request can give, with the functions that check them
+REQUEST_SETTINGS = {'simulations': whole_number(1), 'seed': whole_number(0), 'sampling': one_of(ts.DESIGNS), 'tolerance': positive_number,
+                    'maximum_simulations': whole_number(1), 'tornado_mode': one_of(mcc.TORNADO_MODES)}
+
+# A valuation request that cannot be answered (reported to the client with its HTTP status)
+class RequestError(Exception):
+    def __init__(self, message, status = 400):
+        super().__init__(message)
+        self.status = status
+
+# A long-running local valuation service, answering JSON requests over HTTP (on a TCP port or a Unix socket)
+# It keeps the parsed workbooks and a pool of worker processes warm between requests. Identical requests that arrive while one is
+# being valued share its result, and the results of seeded requests are cached (least recently used first out)
+#   POST /valuations {"workbook": "mix.xlsx", "simulations": 2000, "seed": 1} -> the summary of the run
+#   GET /status -> the counts of the service
+class ValuationService:
+    def __init__(self, workers = 1, cache_results = CACHE_RESULTS):
+        self.workers = workers
+        self.cache_results = cache_results
+        self.executor = None
+        self.workbooks = collections.OrderedDict() # (path, modification time, size) -> the future of (company constants, mix variables ranges)
+        self.results = collections.OrderedDict() # request key -> summary
+        self.in_flight = {} # request key -> the future of its summary
+        self.requests = 0
+        self.valuations = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    # Start the worker processes (and make them import the model, so the first request does not wait for it)
+    # They are spawned rather than forked, since forking a process that is running an event loop and reader threads can deadlock the child
+    async def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(self.executor, warm_up, worker) for worker in range(self.workers)])
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    # Serve HTTP on the host and port, or on a Unix socket if a path is given, until cancelled
+    async def serve(self, host = '127.0.0.1', port = DEFAULT_PORT, socket_path = ''):
+        await self.start()
+        try:
+            if socket_path != '':
+                server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            else:
+                server = await asyncio.start_server(self.handle, host, port)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    # Load a workbook, reusing the parsed models until the file changes
+    # The future of the models is cached as soon as the load starts, so identical requests that arrive during the load share it
+    async def load_workbook(self, workbook_path):
+        try:
+            status = os.stat(workbook_path)
+        except OSError as error:
+            raise RequestError(f'cannot read the workbook {workbook_path}: {error.strerror}', 404)
+        key = (os.path.abspath(workbook_path), status.st_mtime_ns, status.st_size)
+        if key not in self.workbooks:
+            self.workbooks[key] = asyncio.get_running_loop().run_in_executor(None, xh.ExcelHelpers().read_excel_data, workbook_path)
+            if len(self.workbooks) > CACHE_WORKBOOKS:
+                self.workbooks.popitem(last=False)
+        self.workbooks.move_to_end(key)
+        workbook = self.workbooks[key]
+        try:
+            return key, await asyncio.shield(workbook)
+        except Exception:
+            if self.workbooks.get(key) is workbook: # a workbook that failed to load is read again by the next request
+                del self.workbooks[key]
+            raise
+
+    # Value a request (a dictionary with the workbook and any of the REQUEST_SETTINGS), returning its summary
+    async def value(self, request):
+        self.requests += 1
+        if not isinstance(request, dict) or not isinstance(request.get('workbook'), str):
+            raise RequestError('a request is a JSON object with the path of a workbook')
+        unknown = sorted(set(request) - set(REQUEST_SETTINGS) - {'workbook'})
+        if len(unknown) > 0:
+            raise RequestError(f'unknown settings: {", ".join(unknown)}')
+        settings = {}
+        for name, value in request.items():
+            if name != 'workbook' and value is not None:
+                try:
+                    settings[name] = REQUEST_SETTINGS[name](value)
+                except ValueError as error:
+                    raise RequestError(f'invalid setting {name}: {error}')
+        workbook_key, (company_constants, mix_variables_ranges) = await self.load_workbook(request['workbook'])
+        await self.start()
+
+        key = (workbook_key, tuple(sorted(settings.items())))
+        if key in self.results:
+            self.cache_hits += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        if key in self.in_flight:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(self.in_flight[key])
+            except ValueError as error: # the settings of the request cannot be valued (see MonteCarloCalculator.calculate)
+                raise RequestError(str(error))
+
+        # nothing is awaited between the checks and registering the valuation, so an identical request always finds one or the other
+        self.valuations += 1
+        simulation_settings = ss.SimulationSettings(**settings)
+        simulation_settings.streaming = True
+        self.in_flight[key] = asyncio.get_running_loop().run_in_executor(self.executor, value_models, (request['workbook'], company_constants, mix_variables_ranges, simulation_settings))
+        try:
+            summary = await asyncio.shield(self.in_flight[key])
+        except ValueError as error: # the settings of the request cannot be valued (see MonteCarloCalculator.calculate)
+            raise RequestError(str(error))
+        finally:
+            del self.in_flight[key]
+        if 'seed' in settings: # unseeded runs differ every time, so they are not cached
+            self.results[key] = summary
+            if len(self.results) > self.cache_results:
+                self.results.popitem(last=False)
+        return summary
+
+    def status(self):
+        return {'requests': self.requests, 'valuations': self.valuations, 'cache_hits': self.cache_hits, 'coalesced': self.coalesced,
+                'cached_results': len(self.results), 'cached_workbooks': len(self.workbooks), 'in_flight': len(self.in_flight), 'workers': self.workers}
+
+    # Answer one HTTP request on a connection
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, path, version = (await reader.readline()).decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1').strip()
+                    if line == '':
+                        break
+                    name, separator, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+            except (ValueError, asyncio.IncompleteReadError):
+                return await respond(writer, 400, {'error': 'malformed HTTP request'})
+
+            if method == 'GET' and path == '/status':
+                return await respond(writer, 200, self.status())
+            if path != '/valuations':
+                return await respond(writer, 404, {'error': f'no such resource {path}'})
+            if method != 'POST':
+                return await respond(writer, 405, {'error': 'valuations are requested with POST'})
+            try:
+                return await respond(writer, 200, await self.value(json.loads(body or b'null')))
+            except json.JSONDecodeError as error:
+                return await respond(writer, 400, {'error': f'invalid JSON: {error}'})
+            except RequestError as error:
+                return await respond(writer, error.status, {'error': str(error)})
+            except Exception as error:
+                return await respond(writer, 500, {'error': f'{type(error).__name__}: {error}'})
+        finally:
+            writer.close()
+
+# Write a JSON response
+async def respond(writer, status, content):
+    body = json.dumps(content).encode()
+    reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+    writer.write(f'HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+
+# Start a worker (the model is imported with this module)
+def warm_up(worker):
+    return worker
+
+# Value parsed models in a worker, returning the summary of the run
+def value_models(task):
+    workbook_path, company_constants, mix_variables_ranges, simulation_settings = task
+    monte_carlo_results = mcc.MonteCarloCalculator().calculate(company_constants, mix_variables_ranges, simulation_settings)
+    summary = br.summary_row(workbook_path, monte_carlo_results)
+    del summary['error']
+    summary['converged'] = monte_carlo_results.converged
+    summary['tornado'] = [{'name': tornado_tracker.name, 'min_npv_millions': float(tornado_tracker.min_value), 'max_npv_millions': float(tornado_tracker.max_value)} for tornado_tracker in monte_carlo_results.tornado_trackers]
+    return summary
@@ -0,0 +1,83 @@
+import numpy as np # linear algebra library
+import product_variables_snapshot as pvs
+import triangle_sampler as ts
+
+# Each control variate needs at least this many simulations; with more varying variables than that, the controls are the sums of each
+# variable over the products instead of the variables themselves
+SIMULATIONS_PER_CONTROL = 20
+
+# Variance reduction of the NPV estimates: antithetic pairs of draws, and control variates
+# With antithetic draws, every simulation is paired with one drawn at the opposite quantiles (1 - u) of every variable, so the errors of the pair
+# partly cancel. The control variates are the sampled variables, whose means are known exactly (the mean of a triangular distribution is
+# (low + likely + high) / 3): the simulations are reweighted so the weighted means of the controls match their known means (regression
+# estimation), which moves the NPV mean and percentiles by however much the sample of variables happened to be off
+class VarianceReducer:
+    def __init__(self, mix_variables_ranges, simulations, antithetic = False, control_variates = False):
+        self.antithetic = antithetic
+        self.control_variates = control_variates
+        mix_samples, randoms = ts.fixed_mix(mix_variables_ranges, 0)
+        self.pooled = len(randoms) > simulations / SIMULATIONS_PER_CONTROL
+        if not control_variates:
+            self.columns = []
+        elif self.pooled:
+            self.columns = [[column for column, (product, random_name, a) in enumerate(randoms) if random_name == name] for name, variable_tornado in pvs.VARIABLES]
+            self.columns = [columns for columns in self.columns if len(columns) > 0]
+        else:
+            self.columns = [[column] for column in range(len(randoms))]
+        means = np.array([(float(a[0]) + float(a[1]) + float(a[2])) / 3 for product, name, a in randoms])
+        self.means = np.array([means[columns].sum() for columns in self.columns])
+
+    # the uniform numbers (0 to 1) of a chunk of simulations, each draw followed by its antithetic draw
+    def uniforms(self, seed, dimensions, simulations):
+        uniforms = np.random.default_rng(seed).random(((simulations + 1) // 2, dimensions))
+        return np.stack((uniforms, 1 - uniforms), axis=1).reshape(-1, dimensions)[:simulations]
+
+    # the control variates of a chunk of simulations, from its varying variables (see triangle_sampler.mix_matrix)
+    def controls(self, samples):
+        return np.column_stack([samples[:, columns].sum(axis=1) for columns in self.columns]) if len(self.columns) > 0 else np.zeros((len(samples), 0))
+
+    # The variance reduced estimates of the simulations of a tracker (kept in order by each chunk), with the percentiles (0 to 100) to estimate
+    def estimate(self, simulation_tracker, percentiles):
+        controls = np.concatenate(simulation_tracker.controls) if len(simulation_tracker.controls) > 0 else np.zeros((0, len(self.columns)))
+        npvs_millions = np.concatenate(simulation_tracker.controls_npvs_millions) if len(simulation_tracker.controls_npvs_millions) > 0 else np.zeros(0)
+        groups = np.concatenate([offset + np.arange(len(chunk)) // (2 if self.antithetic else 1) for offset, chunk in zip(np.cumsum([0] + [len(chunk) for chunk in simulation_tracker.controls[:-1]]), simulation_tracker.controls)]) if len(controls) > 0 else np.zeros(0, dtype=int)
+        return VarianceReducedEstimate(npvs_millions, controls, self.means, groups, percentiles)
+
+# The NPV estimates of reweighted simulations, with the effective simulations of each estimate (how many independent simulations without
+# variance reduction would give the same precision)
+class VarianceReducedEstimate:
+    def __init__(self, npvs_millions, controls, means, groups, percentiles):
+        self.simulations = len(npvs_millions)
+        self.centered_controls = controls - controls.mean(axis=0) if self.simulations > 0 else controls
+        self.groups = groups
+        self.coefficients_by_variance = np.linalg.pinv(self.centered_controls.T @ self.centered_controls / max(self.simulations, 1)) # the inverse covariance of the controls
+        shift = controls.mean(axis=0) - means if self.simulations > 0 else np.zeros(len(means))
+        weights = (1 - self.centered_controls @ (self.coefficients_by_variance @ shift)) / max(self.simulations, 1)
+        order = np.argsort(npvs_millions, kind='stable')
+        self.sorted_npvs_millions = npvs_millions[order]
+        self.cumulative_weights = np.maximum.accumulate(np.cumsum(weights[order])) if self.simulations > 0 else np.zeros(0)
+        self.mean_npv_millions = float(weights @ npvs_millions)
+        self.effective_simulations = {'Mean': self.effective(npvs_millions)}
+        for percentile in percentiles:
+            self.effective_simulations[f'P{percentile}'] = self.effective((npvs_millions <= self.quantile(percentile / 100)).astype(float))
+
+    # the value below which the given fraction (0 to 1) of the weight of the simulations lies
+    def quantile(self, fraction):
+        if self.simulations == 0:
+            return float('nan')
+        index = np.searchsorted(self.cumulative_weights, fraction * self.cumulative_weights[-1])
+        return float(self.sorted_npvs_millions[min(index, self.simulations - 1)])
+
+    def mean(self):
+        return self.mean_npv_millions
+
+    # How many independent simulations estimate the mean of the values as precisely: their variance over the variance of the estimate,
+    # which sums the residuals of the controls over each antithetic pair (the pairs are independent, the simulations of a pair are not)
+    def effective(self, values):
+        if self.simulations < 2:
+            return float(self.simulations)
+        centered = values - values.mean()
+        variance = np.mean(centered ** 2)
+        residuals = centered - self.centered_controls @ (self.coefficients_by_variance @ (self.centered_controls.T @ centered / self.simulations))
+        estimate_variance = np.sum(np.bincount(self.groups, weights=residuals) ** 2) / self.simulations ** 2
+        return float(variance / estimate_variance) if estimate_variance > 0 else float('inf')